@@ -30,19 +30,99 @@
 #
 # See toplevel COPYING for more information.
 
+import hashlib
+import os
+import shutil
+import tempfile
+from threading import Lock
+
 from emex.helpers.antennas.sectorhelper import SectorHelper
 from emex.helpers.antennas.defaulthelper import DefaultHelper
+from emex.utils import link_or_copy
 
 
 class AntennaBuilder:
+    """Builds antenna profile files.
+
+    When constructed with a cachedir, each distinct profile - keyed by
+    antenna type, parameters and placement - is generated once per
+    emexd process into cachedir and hardlinked (or reflinked, or
+    copied) into each configuration directory that uses it.
+    """
+    # (cachedir, profile key) -> generated profile file, shared by
+    # all builders in the process
+    _cache_files = {}
+
+    _cache_lock = Lock()
+
+    def __init__(self, cachedir=None):
+        self._cachedir = cachedir
+
+
+    @staticmethod
+    def profile_key(antennaprofile):
+        antenna = antennaprofile.antenna
+
+        params = tuple(sorted([(name,tuple(param.value))
+                               for name,param in antenna.params.items()]))
+
+        return (antenna.antennatype_name,
+                params,
+                antennaprofile.north,
+                antennaprofile.east,
+                antennaprofile.up)
+
+
     def build(self, antennaprofile, configdir):
+        if not self._cachedir:
+            return self._get_helper(antennaprofile).build(antennaprofile, configdir)
+
+        cachefile = self._get_cache_file(antennaprofile)
+
+        link_or_copy(cachefile, os.path.join(configdir, antennaprofile.file_name))
+
+        return antennaprofile.file_name
+
+
+    def _get_cache_file(self, antennaprofile):
+        cache_key = (self._cachedir, AntennaBuilder.profile_key(antennaprofile))
+
+        with AntennaBuilder._cache_lock:
+            cachefile = AntennaBuilder._cache_files.get(cache_key, None)
+
+            # regenerate files removed from under us
+            if cachefile and os.path.isfile(cachefile):
+                return cachefile
+
+            digest = hashlib.sha256(repr(cache_key[1]).encode()).hexdigest()
+
+            cachefile = os.path.join(self._cachedir, f'{digest}.xml')
+
+            # generate into a private directory and rename into
+            # place so a partial file is never linked
+            tmpdir = tempfile.mkdtemp(dir=self._cachedir)
+
+            try:
+                profile_file_name = \
+                    self._get_helper(antennaprofile).build(antennaprofile, tmpdir)
+
+                os.replace(os.path.join(tmpdir, profile_file_name), cachefile)
+            finally:
+                shutil.rmtree(tmpdir, ignore_errors=True)
+
+            AntennaBuilder._cache_files[cache_key] = cachefile
+
+            return cachefile
+
+
+    def _get_helper(self, antennaprofile):
         antennatype_name = antennaprofile.antenna.antennatype_name
 
         if antennatype_name == 'sector':
-            return SectorHelper().build(antennaprofile, configdir)
+            return SectorHelper()
         elif antennatype_name == 'ka_band_sector_horn':
-            return DefaultHelper().build(antennaprofile, configdir)
+            return DefaultHelper()
         elif antennatype_name == 'lhcp_maarten_baert_pagoda_2':
-            return DefaultHelper().build(antennaprofile, configdir)
+            return DefaultHelper()
         else:
             raise ValueError(f'Unknown antenna type "{antennatype_name}".')
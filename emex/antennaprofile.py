@@ -64,6 +64,11 @@ class AntennaProfile:
         return self._up
 
 
+    @property
+    def file_name(self):
+        return f'{self.name}_north{self.north}_east{self.east}_up{self.up}.xml'
+
+
     def __hash__(self):
         # two antenna are identical if they point are backed
         # by the same antenna profile file and they share
@@ -44,7 +44,9 @@ from emex.emoestate import EmoeState
 from emex.emexdclientmessagehandler import EmexdClientMessageHandler
 from emex.scenariorpcclient import ScenarioRpcClient
 from emex.eventsequencer import EventSequencer
-from emex.utils import sock_send_string,sock_recv_string
+from emex.compression import available_codecs
+from emex.transport import FrameReader,send_frame
+from emex.utils import load_monitor
 from emex.yamlscenariobuilder import YamlScenarioBuilder
 from emex.emexdmessages import (
     ServiceAccessor,
@@ -55,7 +57,6 @@ from emex.emexdmessages import (
     ListEmoesReplyEntry,
     EmoeStateTransitionEvent
 )
-from emex.monitors.emex import Emex
 
 
 eventstrs = {
@@ -120,13 +121,14 @@ class LoggedDict:
 
 
 class ScenarioThread(threading.Thread):
-    def __init__(self, emoe_name, emoe_endpoint, events, monitor=None):
+    def __init__(self, emoe_name, emoe_endpoint, events, monitor=None, output_path=None):
         super().__init__()
         self._emoe_name = emoe_name
         self._emoe_endpoint = emoe_endpoint
         self._events = events
         self._flows_df = []
         self._monitor = monitor
+        self._output_path = output_path
         self._log = f'scenario_thread: initialized'
         self._scenario_rpc = None
         self._interrupted = False
@@ -169,7 +171,8 @@ class ScenarioThread(threading.Thread):
                 break
 
             try:
-                ok,message,self._flows_df = self._scenario_rpc.send_event(eventdict)
+                ok,message,self._flows_df = \
+                    self._scenario_rpc.send_event(eventdict, sequencer.scheduled_time(eventtime))
 
             except Exception as e:
                 self._log = f'lport:{self._lport}, rport:{self._rport}, EXCEPTION {e}'
@@ -181,6 +184,9 @@ class ScenarioThread(threading.Thread):
 
             event_num += 1
 
+        if self._output_path:
+            self._scenario_rpc.event_timing.write(self._output_path)
+
         self._log = f'lport:{self._lport}, rport:{self._rport}, stopped'
 
 
@@ -245,7 +251,7 @@ class BatchRunner:
 
         self._trials = args.numtrials
 
-        self._message_handler = EmexdClientMessageHandler()
+        self._message_handler = EmexdClientMessageHandler(available_codecs())
 
         self._timer_endpoint = ('127.0.0.1', 47358)
         self._timer_listen_sock = None
@@ -285,6 +291,8 @@ class BatchRunner:
         self._epoll.register(self._timer_listen_sock.fileno(), select.POLLIN)
         self._epoll.register(self._emexd_sock.fileno(), select.POLLIN)
 
+        self._emexd_reader = FrameReader()
+
         self._socket_names = {
             self._emexd_sock.fileno():'emexd_sock',
             self._timer_listen_sock.fileno():'timer_listen_sock'
@@ -352,8 +360,9 @@ class BatchRunner:
                         logging.debug(f'stopping emoe {entry.emoe_name}')
                         runner.cleanup()
                         runner.join()
-                        sock_send_string(self._emexd_sock,
-                                         self._message_handler.build_stop_emoe_request_message(entry.handle))
+                        send_frame(self._emexd_sock,
+                                   self._message_handler.build_stop_emoe_request_message(entry.handle),
+                                   self._message_handler.compression_codec)
 
                 else:
                     logging.info(f'{num_entry:3} emoe:{entry.emoe_name} state:{entry.state.name}')
@@ -370,6 +379,8 @@ class BatchRunner:
 
                 logging.info(f'emoe {entry.emoe_name} endpoints emoe:{emoe_endpoint} otestpoint:{otestpoint_endpoint}')
 
+                output_path = None
+
                 if monitor and otestpoint_endpoint:
                     output_path = \
                         os.path.join(self._output_path_root, f'{entry.handle}.{entry.emoe_name}')
@@ -377,7 +388,7 @@ class BatchRunner:
 
                     monitor.run(output_path, otestpoint_endpoint)
 
-                runner = ScenarioThread(entry.emoe_name, emoe_endpoint, builder.events, monitor)
+                runner = ScenarioThread(entry.emoe_name, emoe_endpoint, builder.events, monitor, output_path)
                 runner.setDaemon(True)
                 runner.start()
 
@@ -502,10 +513,11 @@ class BatchRunner:
             # not enough cpus right now
             return
 
-        sock_send_string(self._emexd_sock,
-                         self._message_handler.build_start_emoe_request_message(emoe))
+        send_frame(self._emexd_sock,
+                   self._message_handler.build_start_emoe_request_message(emoe),
+                   self._message_handler.compression_codec)
 
-        monitor = Emex(emoe) if self._run_monitor else None
+        monitor = load_monitor('emex')(emoe) if self._run_monitor else None
 
         if not self._emoes_dict.has_key(emoe_name):
             logging.debug(f'adding1 {emoe_name} to emoes_dict')
@@ -548,7 +560,7 @@ class BatchRunner:
 
             elapsed_time += intervaltime_secs
 
-            sock_send_string(self._timer_write_sock, bytes(str(elapsed_time), 'utf-8'))
+            send_frame(self._timer_write_sock, bytes(str(elapsed_time), 'utf-8'))
 
 
     def _do_tests(self):
@@ -573,8 +585,9 @@ class BatchRunner:
         """
         try:
             # request models at start
-            sock_send_string(self._emexd_sock,
-                             self._message_handler.build_models_request_message())
+            send_frame(self._emexd_sock,
+                       self._message_handler.build_models_request_message(),
+                       self._message_handler.compression_codec)
 
             while not self._done_running:
                 events = self._epoll.poll()
@@ -592,74 +605,75 @@ class BatchRunner:
                         self._socket_names[conn] = f'timer_conn'
                         logging.debug(f'connect {fileno} {self._socket_names[conn]}')
                         self._timer_conn = conn
+                        self._timer_reader = FrameReader()
 
                     elif fileno == self._emexd_sock.fileno():
                         # receive message from emexd
                         logging.debug('receive emexd message')
 
-                        reply_str = sock_recv_string(self._emexd_sock)
+                        for reply_str in self._emexd_reader.recv(self._emexd_sock):
+                            reply = self._message_handler.parse_reply(reply_str)
 
-                        reply = self._message_handler.parse_reply(reply_str)
+                            if not reply:
+                                logging.error(f'Unknown, empty reply')
+                                return
 
-                        if not reply:
-                            logging.error(f'Unknown, empty reply')
-                            return
+                            if isinstance(reply, ListEmoesReply):
+                                logging.debug(f'rx listemoes {reply}')
 
-                        if isinstance(reply, ListEmoesReply):
-                            logging.debug(f'rx listemoes {reply}')
+                                # process emoes list, stop emoe and start others
+                                # send a request
+                                self.process_emoe_list(reply)
 
-                            # process emoes list, stop emoe and start others
-                            # send a request
-                            self.process_emoe_list(reply)
+                                # if all of the emoes have been started and there are no
+                                # more entries from emexd then it is time to quit
+                                if self.done_starting and not reply.emoe_entries:
+                                    self._done_running = True
+                                else:
+                                    # try to start the next emoe
+                                    self.start_next_emoe(reply)
 
-                            # if all of the emoes have been started and there are no
-                            # more entries from emexd then it is time to quit
-                            if self.done_starting and not reply.emoe_entries:
-                                self._done_running = True
-                            else:
-                                # try to start the next emoe
-                                self.start_next_emoe(reply)
+                            elif isinstance(reply, StartEmoeReply):
+                                logging.debug(f'StartEmoeReply {reply.emoe_name} {reply.result}')
 
-                        elif isinstance(reply, StartEmoeReply):
-                            logging.debug(f'StartEmoeReply {reply.emoe_name} {reply.result}')
+                                # check for failure
+                                if not reply.result:
+                                    logging.error(f'emoe "{reply.emoe_name}" failed to start with error "{reply.message}"')
+                                    self.remove_emoe(reply.emoe_name)
 
-                            # check for failure
-                            if not reply.result:
-                                logging.error(f'emoe "{reply.emoe_name}" failed to start with error "{reply.message}"')
-                                self.remove_emoe(reply.emoe_name)
-
-                                self.bump_index()
+                                    self.bump_index()
 
-                        elif isinstance(reply, StopEmoeReply):
-                            logging.debug(f'StopEmoeReplly {reply.emoe_name} {reply.result}')
+                            elif isinstance(reply, StopEmoeReply):
+                                logging.debug(f'StopEmoeReplly {reply.emoe_name} {reply.result}')
 
-                            self.remove_emoe(reply.emoe_name)
+                                self.remove_emoe(reply.emoe_name)
 
 
-                        elif isinstance(reply, EmoeStateTransitionEvent):
-                            # just report this, they'll only be seen if emexd state-messages
-                            # parameter is set to true, but we ignore them opting to
-                            # keep track of emoes by poling
-                            logging.debug(f'rx state transition {reply.emoe_name} {reply.state.name}')
+                            elif isinstance(reply, EmoeStateTransitionEvent):
+                                # just report this, they'll only be seen if emexd state-messages
+                                # parameter is set to true, but we ignore them opting to
+                                # keep track of emoes by poling
+                                logging.debug(f'rx state transition {reply.emoe_name} {reply.state.name}')
 
-                        elif isinstance(reply, tuple):
-                            logging.debug(f'tuple type {type(reply)}')
-                            self._antennatypes, self._platformtypes = reply
+                            elif isinstance(reply, tuple):
+                                logging.debug(f'tuple type {type(reply)}')
+                                self._antennatypes, self._platformtypes = reply
 
-                            if not self._ants_plats_ics:
-                                for builder in self._scenario_builders:
-                                    self._ants_plats_ics.append(
-                                        builder.build(self._platformtypes, self._antennatypes))
+                                if not self._ants_plats_ics:
+                                    for builder in self._scenario_builders:
+                                        self._ants_plats_ics.append(
+                                            builder.build(self._platformtypes, self._antennatypes))
 
 
                     elif fileno == self._timer_conn.fileno():
                         # receive timer
-                        message_str = sock_recv_string(self._timer_conn)
-                        logging.debug(f'timer={message_str}')
+                        for message_str in self._timer_reader.recv(self._timer_conn):
+                            logging.debug(f'timer={message_str}')
 
                         # update stuff
-                        sock_send_string(self._emexd_sock,
-                                         self._message_handler.build_list_emoes_request_message())
+                        send_frame(self._emexd_sock,
+                                   self._message_handler.build_list_emoes_request_message(),
+                                   self._message_handler.compression_codec)
 
 
                     elif event & select.EPOLLHUP:
@@ -0,0 +1,81 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+
+from emex.helpers.components.lte import PCIS
+from emex.platform import Platform
+
+
+# LTE UEs and ENBs require an EPC
+EPC_PLATFORMTYPE = 'h_lte.epc'
+
+# each ENB is assigned one of the LTE helper's PCIs
+MAX_ENBS = len(PCIS)
+
+
+def build_platforms(platformtypes, platformtype_names, count):
+    """Return count platforms for the benchmark scripts, drawn evenly
+    from platformtype_names, plus one EPC platform when the names
+    include LTE types but not the EPC itself. ENBs are capped at
+    MAX_ENBS, the remaining platforms are drawn from the other
+    names."""
+    enb_names = [name for name in platformtype_names if 'lte.enb' in name]
+
+    other_names = [name for name in platformtype_names if not name in enb_names]
+
+    if enb_names and not other_names and count > MAX_ENBS:
+        raise ValueError(f'{count} platforms of {",".join(enb_names)} exceed the '
+                         f'{MAX_ENBS} ENBs LTE can configure, add a non ENB platformtype')
+
+    platforms = []
+
+    num_enbs = 0
+
+    for i in range(1, count+1):
+        platformtype_name = platformtype_names[i % len(platformtype_names)]
+
+        if platformtype_name in enb_names:
+            if num_enbs < MAX_ENBS:
+                num_enbs += 1
+            else:
+                platformtype_name = other_names[i % len(other_names)]
+
+        # scr_lte.ue -> lteue-0001
+        prefix = platformtype_name.split('_')[-1].replace('.', '')
+
+        platforms.append(Platform(f'{prefix}-{i:04d}', platformtypes[platformtype_name]))
+
+    if any(['lte' in name for name in platformtype_names]) and \
+       not EPC_PLATFORMTYPE in platformtype_names:
+        platforms.append(Platform('lteepc-0001', platformtypes[EPC_PLATFORMTYPE]))
+
+    return platforms
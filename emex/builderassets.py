@@ -0,0 +1,243 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+import copy
+import logging
+import os
+import re
+from threading import Lock,local
+import time
+
+from lxml import etree
+from yaml import safe_load
+
+import emex.utils as utils
+
+
+class BuilderAssets:
+    """Static builder inputs - the etce steps files, the lxc container
+    configuration and init script and emex data resource paths - loaded
+    once and reused across builds.
+
+    Each entry records the modification times of the files and
+    directories it was loaded from and is reloaded when any of them
+    change. The time taken to load an entry is credited to the
+    calling thread each time the entry is reused; builds read this
+    back through the saved_time property.
+    """
+    def __init__(self):
+        self._lock = Lock()
+
+        # name -> (signature, value, load time)
+        self._entries = {}
+
+        # resource -> resolved path(s)
+        self._resource_paths = {}
+
+        self._resource_file_paths = {}
+
+        self._thread_state = local()
+
+
+    def warm(self):
+        """Load all entries ahead of the first build."""
+        start = time.monotonic()
+
+        self.steps_xml()
+
+        self.basenode_containertemplate()
+
+        logging.info(f'builder assets loaded in {time.monotonic() - start:.3f} seconds')
+
+
+    def reset_saved_time(self):
+        self._thread_state.saved_time = 0.0
+
+
+    @property
+    def saved_time(self):
+        return getattr(self._thread_state, 'saved_time', 0.0)
+
+
+    def resource_file_path(self, resource):
+        path = self._resource_file_paths.get(resource, None)
+
+        if not path or not os.path.isfile(path):
+            path = utils.get_emex_data_resource_file_path(resource)
+
+            self._resource_file_paths[resource] = path
+
+        return path
+
+
+    def resource_paths(self, resource):
+        paths = self._resource_paths.get(resource, None)
+
+        if paths is None or not all(map(os.path.exists, paths)):
+            paths = utils.get_emex_data_resource_paths(resource)
+
+            self._resource_paths[resource] = paths
+
+        return paths
+
+
+    def steps_xml(self):
+        """Return the serialized steps.xml built from all of the
+        steps*.yml files in the etce builder directories.
+        """
+        etce_builders_dirs = self.resource_paths('builders/etce')
+
+        def steps_files():
+            stepsfiles = []
+
+            for etce_builders_dir in etce_builders_dirs:
+                stepsfiles.extend([os.path.join(etce_builders_dir, f)
+                                   for f in sorted(os.listdir(etce_builders_dir))
+                                   if re.match(r'steps.*\.yml', f)])
+
+            return stepsfiles
+
+        return self._get('steps.xml',
+                         lambda: etce_builders_dirs + steps_files(),
+                         lambda: self._load_steps_xml(steps_files()))
+
+
+    def basenode_containertemplate(self):
+        """Return a copy of the lxcplan basenode containertemplate
+        element, ready to be appended to a containertemplates element.
+        """
+        initsh = self.resource_file_path('builders/etce/init.sh')
+
+        lxc_conf = self.resource_file_path('builders/etce/lxc.container.conf')
+
+        ct_elem = self._get('basenode',
+                            lambda: [initsh, lxc_conf],
+                            lambda: self._load_basenode_containertemplate(initsh, lxc_conf))
+
+        return copy.deepcopy(ct_elem)
+
+
+    def _get(self, name, input_paths, load):
+        with self._lock:
+            try:
+                signature = tuple([(path, os.stat(path).st_mtime_ns)
+                                   for path in input_paths()])
+            except OSError:
+                signature = None
+
+            entry = self._entries.get(name, None)
+
+            if signature and entry and entry[0] == signature:
+                _,value,load_time = entry
+
+                self._thread_state.saved_time = self.saved_time + load_time
+
+                return value
+
+            start = time.monotonic()
+
+            value = load()
+
+            load_time = time.monotonic() - start
+
+            logging.debug(f'builder asset "{name}" loaded in {load_time:.3f} seconds')
+
+            if signature:
+                self._entries[name] = (signature, value, load_time)
+
+            return value
+
+
+    def _load_steps_xml(self, stepsfiles):
+        steps_by_order = {}
+
+        for stepfile in stepsfiles:
+            with open(stepfile) as sfd:
+                steps = safe_load(sfd)
+
+            for step,step_dict in steps.items():
+                order = int(step_dict['order'])
+
+                if order in steps_by_order:
+                    logging.warning(f'step "{step}" in {stepfile} repeats order {order}')
+
+                steps_by_order[order] = {step: step_dict['wrappers']}
+
+        steps_elem = etree.Element('steps')
+
+        for order,steps in sorted(steps_by_order.items()):
+            for step,wrappers in steps.items():
+                step_elem = etree.SubElement(steps_elem, 'step')
+
+                step_elem.set('name', step)
+
+                for wrapper,args in wrappers.items():
+                    run_elem = etree.SubElement(step_elem, 'run')
+
+                    run_elem.set('wrapper', wrapper)
+
+                    if not args:
+                        continue
+
+                    for name,value in args.items():
+                        arg_elem = etree.SubElement(run_elem, 'arg')
+
+                        arg_elem.set('name', name)
+                        arg_elem.set('value', str(value))
+
+        return etree.tostring(steps_elem.getroottree(), pretty_print=True)
+
+
+    def _load_basenode_containertemplate(self, initsh, lxc_conf):
+        ct_elem = etree.Element('containertemplate')
+
+        ct_elem.set('name', 'basenode')
+
+        params_elem = etree.SubElement(ct_elem, 'parameters')
+
+        with open(lxc_conf, 'r') as lfd:
+            for line in lfd:
+                toks = line.strip().split('=')
+
+                if(len(toks) == 2):
+                    param_elem = etree.SubElement(params_elem, 'parameter')
+                    p,v = toks
+
+                    param_elem.set('name', p)
+                    param_elem.set('value', v)
+
+        initscript_elem = etree.SubElement(ct_elem, 'initscript')
+
+        with open(initsh) as ifd:
+            initscript_elem.text = ifd.read()
+
+        return ct_elem
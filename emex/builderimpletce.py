@@ -30,26 +30,108 @@
 #
 # See toplevel COPYING for more information.
 
-import copy
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
 from collections import defaultdict
 import logging
 from lxml import etree
+import multiprocessing
 import os
 import pprint
-import re
-
-from yaml import safe_load
+from threading import Lock
+import time
 
 from emex.antennabuilder import AntennaBuilder
+from emex.builderassets import BuilderAssets
+from emex.buildtimer import BuildTimer
+from emex.confighelper import ParamIndex
+from emex.configstore import ConfigStore
 from emex.containerruntime import ContainerRuntime,BridgeDevice
 from emex.eelformatter import EelFormatter
+from emex.initialconditionmatrix import InitialConditionMatrix
 from emex.templateutils import format_file,paramdict_to_namedtuple,TemplateError
 from emex.types import platformtypes,antennatypes,waveformtypes,gettype
 import emex.utils as utils
 import emex.emexd_pb2 as emexd_pb2
 
 
+# template file listings by template directory, along with the
+# modification times of the directories they were read from
+_template_files_cache = {}
+
+_template_files_lock = Lock()
+
+
+# write buffer size for the, potentially very large, initial
+# conditions EEL file
+EEL_WRITE_BUFFER_SIZE = 1 << 20
+
+
+def _template_files(templatedir):
+    """Return the (srcfile, filename) pairs for every file in
+    templatedir and its subdirectories, reusing the previous
+    listing while none of the directories have changed.
+    """
+    with _template_files_lock:
+        cached = _template_files_cache.get(templatedir, None)
+
+        if cached:
+            dir_mtimes,files = cached
+
+            try:
+                if all(os.stat(dirname).st_mtime_ns == mtime
+                       for dirname,mtime in dir_mtimes):
+                    return files
+            except OSError:
+                pass
+
+        dir_mtimes = []
+
+        files = []
+
+        for dirname,dirnames,filenames in os.walk(templatedir):
+            dirnames.sort()
+
+            dir_mtimes.append((dirname, os.stat(dirname).st_mtime_ns))
+
+            for filename in sorted(filenames):
+                files.append((os.path.join(dirname, filename), filename))
+
+        files = tuple(files)
+
+        _template_files_cache[templatedir] = (tuple(dir_mtimes), files)
+
+        return files
+
+
+def _render_component(render_job):
+    """Render the template files of one platform component and
+    return the list of template error messages. Runs in the render
+    pool worker processes, so it is a module level function.
+    """
+    template_files,fulloutdir,built_in_params = render_job
+
+    overlays = paramdict_to_namedtuple(built_in_params)
+
+    errors = []
+
+    for srcfile,filename in template_files:
+        dstfile = os.path.join(fulloutdir, filename)
+
+        try:
+            format_file(srcfile, dstfile, overlays)
+
+        except TemplateError as te:
+            errors.append(f'{te}')
+
+    return errors
+
+
 class BuilderImplEtce:
+    # render platform configurations in the process pool only
+    # when there are at least this many components
+    MIN_POOL_RENDER_JOBS = 16
+
     def __init__(self):
         self._platformtypes = platformtypes()
 
@@ -57,23 +139,39 @@ class BuilderImplEtce:
 
         self._antennatypes = antennatypes()
 
+        self._config_stores = {}
+
+        self._render_pool = None
+
+        self._render_pool_workers = 0
+
+        self._render_pool_lock = Lock()
+
+        self._assets = BuilderAssets()
+
+        self._assets.warm()
+
 
     @property
     def waveformtypes(self):
-        return copy.deepcopy(self._waveformtypes)
+        return dict(self._waveformtypes)
 
 
     @property
     def antennatypes(self):
-        return copy.deepcopy(self._antennatypes)
+        return dict(self._antennatypes)
 
 
     @property
     def platformtypes(self):
-        return copy.deepcopy(self._platformtypes)
+        return dict(self._platformtypes)
 
 
     def build_config(self, emoe_rt, emexd_config):
+        start = time.monotonic()
+
+        self._assets.reset_saved_time()
+
         os.makedirs(emoe_rt.workdir, mode=0o755)
 
         configdir = os.path.join(emoe_rt.workdir, 'config')
@@ -94,52 +192,162 @@ class BuilderImplEtce:
         lxcdir = os.path.join(emoe_rt.workdir, 'lxcroot')
         os.makedirs(lxcdir, mode=0o755)
 
+        timer = BuildTimer()
+
         # write test.xml
-        self._write_test_file(emoe_rt, configdir)
+        with timer.stage('test file'):
+            self._write_test_file(emoe_rt, configdir)
 
-        # write etce hostfile
-        self._write_host_file(emoe_rt, docdir)
+        # write lxcconfiguration, this also assigns the container
+        # runtime devices used by the platform configurations
+        with timer.stage('lxcplan'):
+            self._write_container_conf(emoe_rt, docdir)
+
+        # files that depend only on the emoe description and the
+        # template and builder inputs are rendered once into the
+        # config store and linked into the emoe directory. the
+        # stored stages are only timed when the store misses
+        config_store = self._get_config_store(emoe_rt)
+
+        with timer.stage('fingerprint'):
+            fingerprint = self._config_fingerprint(emoe_rt)
+
+        entrydir = config_store.get(
+            fingerprint,
+            lambda storeconfigdir: self._write_stored_configs(emoe_rt,
+                                                                     emexd_config,
+                                                                     storeconfigdir,
+                                                                     timer))
+
+        with timer.stage('materialize'):
+            config_store.materialize(entrydir, configdir)
+
+        # write emane node view file
+        with timer.stage('node view'):
+            self._write_node_view_conf(emoe_rt, localhostdir)
+
+        # write emex tag map file
+        with timer.stage('tag map'):
+            self._write_emex_tag_map(emoe_rt, localhostdir)
+
+        # write socat file
+        with timer.stage('socat'):
+            self._write_socat_mappings(emoe_rt, localhostdir)
+
+        # convey config information that needs to pass through to the container
+        self._write_emexd_config(docdir, emexd_config)
+
+        timer.write(os.path.join(emoe_rt.workdir, 'build_timing.csv'))
+
+        logging.info(f'build_config for emoe "{emoe_rt.emoe.name}" took '
+                     f'{time.monotonic() - start:.3f} seconds, builder asset '
+                     f'cache saved {self._assets.saved_time:.3f} seconds')
 
-        # write lxcconfiguration
-        self._write_container_conf(emoe_rt, docdir)
+        logging.debug(f'build_config stages: ' +
+                      ', '.join([f'{name}={seconds:.3f}' for name,seconds in timer.stages]))
+
+        return timer
+
+
+    def _write_stored_configs(self, emoe_rt, emexd_config, configdir, timer):
+        helperdir = os.path.join(configdir, 'helper-lxc')
+        os.makedirs(helperdir, mode=0o755)
+
+        docdir = os.path.join(configdir, 'doc')
+        os.makedirs(docdir, mode=0o755)
+
+        # write etce hostfile
+        with timer.stage('hostfile'):
+            self._write_host_file(emoe_rt, docdir)
 
         # write mgen port info
-        self._write_mgen_port_map(emoe_rt, docdir)
+        with timer.stage('mgen port map'):
+            self._write_mgen_port_map(emoe_rt, docdir)
 
         # write configuration directory for each platform component
-        self._write_platform_configs(emoe_rt, configdir, datadir)
+        with timer.stage('platform configs'):
+            timer.render_workers = \
+                self._write_platform_configs(emoe_rt,
+                                             configdir,
+                                             emexd_config.num_render_workers)
 
         # write antenna manifest file
-        built_antennas = self._write_antenna_files(emoe_rt, configdir)
+        with timer.stage('antennas'):
+            profile_ids = self._write_antenna_files(emoe_rt, configdir)
 
         # write nemid profileid map
-        self._write_nemid_profileid_map(emoe_rt, docdir, built_antennas)
+        with timer.stage('nemid map'):
+            self._write_nemid_profileid_map(emoe_rt, docdir, profile_ids)
 
         # steps.xml
-        self._write_steps_file(configdir)
+        with timer.stage('steps'):
+            self._write_steps_file(configdir)
 
         # write EEL file with initial conditions
-        self._write_emanephyinit_eel(emoe_rt, helperdir, built_antennas)
+        with timer.stage('eel'):
+            self._write_emanephyinit_eel(emoe_rt, helperdir, profile_ids)
 
         # write opentestpoint broker file
-        self._write_testpointbroker_conf(emoe_rt, helperdir)
+        with timer.stage('broker'):
+            self._write_testpointbroker_conf(emoe_rt, helperdir)
 
-        # write emane node view file
-        self._write_node_view_conf(emoe_rt, localhostdir)
 
-        # write emex tag map file
-        self._write_emex_tag_map(emoe_rt, localhostdir)
+    def _get_config_store(self, emoe_rt):
+        # keep the store on the same filesystem as the emoe
+        # directories so that entries can be hardlinked
+        storedir = os.path.join(os.path.dirname(emoe_rt.workdir), '.configstore')
 
-        # write socat file
-        self._write_socat_mappings(emoe_rt, localhostdir)
+        config_store = self._config_stores.get(storedir, None)
 
-        # convey config information that needs to pass through to the container
-        self._write_emexd_config(docdir, emexd_config)
+        if not config_store:
+            os.makedirs(storedir, mode=0o755, exist_ok=True)
+
+            config_store = ConfigStore(storedir)
+
+            self._config_stores[storedir] = config_store
+
+        return config_store
+
+
+    def _get_antenna_cachedir(self, emoe_rt):
+        # alongside the config store so profiles can be hardlinked
+        cachedir = os.path.join(os.path.dirname(emoe_rt.workdir), '.antennacache')
+
+        os.makedirs(cachedir, mode=0o755, exist_ok=True)
+
+        return cachedir
+
+
+    def _config_fingerprint(self, emoe_rt):
+        # the emoe name only appears in the per-run test.xml
+        emoe_proto = emexd_pb2.Emoe()
+
+        emoe_rt.emoe.to_protobuf(emoe_proto)
+
+        emoe_proto.name = ''
+
+        srcdir = os.path.dirname(os.path.abspath(__file__))
+
+        input_paths = \
+            self._assets.resource_paths('templates') + \
+            self._assets.resource_paths('builders') + \
+            self._assets.resource_paths('xml') + \
+            [os.path.join(srcdir, 'helpers')] + \
+            [os.path.join(srcdir, f'{module}.py')
+             for module in ('builderimpletce',
+                            'builderassets',
+                            'antennabuilder',
+                            'eelformatter',
+                            'initialconditionmatrix',
+                            'templateutils')]
+
+        return ConfigStore.fingerprint(emoe_proto.SerializeToString(deterministic=True),
+                                       input_paths)
 
 
     def _get_template_path(self, emex_type, value):
         if emex_type == 'waveform' or emex_type == 'host':
-            ret = utils.get_emex_data_resource_paths(f'templates/components/{value}')[0]
+            ret = self._assets.resource_paths(f'templates/components/{value}')[0]
 
             return ret
         else:
@@ -166,17 +374,18 @@ class BuilderImplEtce:
         test_elem_tree.write(test_file, pretty_print=True)
 
 
-    def _write_platform_configs(self,
-                                emoe_rt,
-                                configdir,
-                                datadir):
+    def _write_platform_configs(self, emoe_rt, configdir, num_workers=1):
+        """Render the configuration of every platform component and
+        return the number of processes that rendered them."""
         platform_helpers = utils.load_platform_helpers(emoe_rt.emoe.platforms)
 
         meta_params = defaultdict(lambda: {})
 
+        index = ParamIndex(emoe_rt.emoe.platforms)
+
         # combine helper meta params
         for helper in platform_helpers:
-            for plt_cmp,helper_params in helper().get_meta_params(emoe_rt).items():
+            for plt_cmp,helper_params in helper().get_meta_params(emoe_rt, index).items():
                 meta_params[plt_cmp].update(helper_params)
 
         for (plt_name,c_name),crt in emoe_rt.container_runtimes.items():
@@ -196,6 +405,8 @@ class BuilderImplEtce:
                 meta_params[(plt_name,c_name)].update(
                     {'emex.control_ipv4address': control_device.ipv4address})
 
+        render_jobs = []
+
         # sort platforms lexically by name so that the same emoe
         # will deterministically generate the same configuration.
         for plt in sorted(emoe_rt.emoe.platforms):
@@ -233,38 +444,120 @@ class BuilderImplEtce:
                     open(os.path.join(fulloutdir, 'mgenremote.flag'), 'w').close()
                     open(os.path.join(fulloutdir, 'mgenmonitor.flag'), 'w').close()
 
-                for dirname,_,filenames in os.walk(templatedir):
-                    for filename in filenames:
-                        srcfile = os.path.join(dirname, filename)
+                render_jobs.append((_template_files(templatedir),
+                                    fulloutdir,
+                                    built_in_params))
+
+        # render in a process pool for larger emoes. results, and any
+        # template errors, are returned in job order
+        results = None
+
+        if num_workers > 1 and len(render_jobs) >= BuilderImplEtce.MIN_POOL_RENDER_JOBS:
+            try:
+                results = list(self._get_render_pool(num_workers).map(
+                    _render_component,
+                    render_jobs,
+                    chunksize=max(1, len(render_jobs) // (4 * num_workers))))
+            except BrokenProcessPool as e:
+                logging.warning(f'template render pool failed, rendering '
+                                f'in process: {e}')
+
+                self._discard_render_pool()
+
+        if results is None:
+            results = map(_render_component, render_jobs)
+
+            num_workers = 1
+
+        for errors in results:
+            for error in errors:
+                logging.error(error)
+
+        return num_workers
+
+
+    def _get_render_pool(self, num_workers):
+        with self._render_pool_lock:
+            if not self._render_pool or not self._render_pool_workers == num_workers:
+                if self._render_pool:
+                    self._render_pool.shutdown(wait=False)
 
-                        dstfile = os.path.join(fulloutdir, filename)
-                        try:
-                            format_file(srcfile,
-                                        dstfile,
-                                        paramdict_to_namedtuple(built_in_params))
+                logging.info(f'starting template render pool with {num_workers} workers')
 
-                        except TemplateError as te:
-                            logging.error(f'{te}')
+                # emexd is multi-threaded and holds open sockets, start
+                # the workers from a fork server rather than forking it
+                self._render_pool = ProcessPoolExecutor(
+                    max_workers=num_workers,
+                    mp_context=multiprocessing.get_context('forkserver'))
+
+                self._render_pool_workers = num_workers
+
+            return self._render_pool
+
+
+    def _discard_render_pool(self):
+        with self._render_pool_lock:
+            if self._render_pool:
+                self._render_pool.shutdown(wait=False)
+
+            self._render_pool = None
+
+            self._render_pool_workers = 0
 
 
     def _write_antenna_files(self, emoe_rt, configdir):
-        builder = AntennaBuilder()
+        builder = AntennaBuilder(self._get_antenna_cachedir(emoe_rt))
+
+        # antennaprofile -> profile id
+        profile_ids = {}
+
+        manifest_file = os.path.join(configdir, 'antennaprofilemanifest.xml')
+
+        # write the manifest file, this includes case where there are no
+        # profiles
+        with etree.xmlfile(manifest_file) as xf:
+            xf.write_doctype(
+                '<!DOCTYPE profiles SYSTEM "file:///usr/share/emane/dtd/antennaprofile.dtd">')
 
-        built_antennas = []
+            with xf.element('profiles'):
+                xf.write('\n')
 
-        manifest_elem = etree.Element('profiles')
+                for profile_elem in self._antenna_profile_elems(emoe_rt,
+                                                                configdir,
+                                                                builder,
+                                                                profile_ids):
+                    xf.write(profile_elem, pretty_print=True)
+
+        return profile_ids
+
+
+    def _antenna_profile_elems(self, emoe_rt, configdir, builder, profile_ids):
+        # profile key -> profile id, antenna profiles with the same
+        # type, parameters and placement share one profile
+        key_ids = {}
 
         for (plt_name,c_name),antennaprofile in emoe_rt.emoe.antenna_assignments.items():
-            if antennaprofile in built_antennas:
+            if antennaprofile in profile_ids:
+                continue
+
+            profile_key = AntennaBuilder.profile_key(antennaprofile)
+
+            antennaid = key_ids.get(profile_key, None)
+
+            if antennaid:
+                profile_ids[antennaprofile] = antennaid
+
                 continue
 
             profilefile = builder.build(antennaprofile, configdir)
 
-            built_antennas.append(antennaprofile)
+            antennaid = len(key_ids) + 1
+
+            key_ids[profile_key] = antennaid
 
-            antennaid = built_antennas.index(antennaprofile) + 1
+            profile_ids[antennaprofile] = antennaid
 
-            profile_elem = etree.SubElement(manifest_elem, 'profile')
+            profile_elem = etree.Element('profile')
 
             profile_elem.set('id', str(antennaid))
 
@@ -275,18 +568,7 @@ class BuilderImplEtce:
             placement_elem.set('east', str(antennaprofile.east))
             placement_elem.set('up', str(antennaprofile.up))
 
-        # write the manifest file, this includes case where there are no
-        # profiles
-        manifest_elem_tree = manifest_elem.getroottree()
-
-        manifest_elem_tree.docinfo.system_url = \
-            'file:///usr/share/emane/dtd/antennaprofile.dtd'
-
-        manifest_file = os.path.join(configdir, 'antennaprofilemanifest.xml')
-
-        manifest_elem_tree.write(manifest_file, pretty_print=True)
-
-        return built_antennas
+            yield profile_elem
 
 
     def _write_host_file(self, emoe_rt, docdir):
@@ -403,50 +685,12 @@ class BuilderImplEtce:
 
 
     def _write_container_conf(self, emoe_rt, docdir):
-        initsh = utils.get_emex_data_resource_file_path(f'builders/etce/init.sh')
-
-        lxc_conf = utils.get_emex_data_resource_file_path(f'builders/etce/lxc.container.conf')
-
         net_groups = utils.group_components_by_label(emoe_rt.emoe.platforms, 'net')
 
         lxcplan_file = os.path.join(docdir, 'lxcplan.xml')
 
-        lxcplan_elem = etree.Element('lxcplan')
-
-        # container templates
-        cts_elem = etree.SubElement(lxcplan_elem, 'containertemplates')
-
-        ct_elem = etree.SubElement(cts_elem, 'containertemplate')
-
-        ct_elem.set('name', 'basenode')
-
-        params_elem = etree.SubElement(ct_elem, 'parameters')
-
-        for line in open(lxc_conf, 'r').readlines():
-            toks = line.strip().split('=')
-
-            if(len(toks) == 2):
-                param_elem = etree.SubElement(params_elem, 'parameter')
-                p,v = toks
-
-                param_elem.set('name', p)
-                param_elem.set('value', v)
-
-        initscript_elem = etree.SubElement(ct_elem, 'initscript')
-
-        initsh_lines = open(initsh).readlines()
-
-        initscript_elem.text = ''.join(initsh_lines)
-
-        # hosts
-        hosts_elem = etree.SubElement(lxcplan_elem, 'hosts')
-
-        host_elem =  etree.SubElement(hosts_elem, 'host')
-
-        host_elem.set('hostname', 'localhost')
-
         # kernel parameters
-        kernelparams_elem = etree.SubElement(host_elem, 'kernelparameters')
+        kernelparams_elem = etree.Element('kernelparameters')
 
         kernelparam_elem = etree.SubElement(kernelparams_elem, 'parameter')
 
@@ -454,7 +698,7 @@ class BuilderImplEtce:
         kernelparam_elem.set('value', '-1')
 
         # bridges
-        bridges_elem = etree.SubElement(host_elem, 'bridges')
+        bridges_elem = etree.Element('bridges')
 
         bridge_elem = etree.SubElement(bridges_elem, 'bridge')
         bridge_elem.set('name', 'backchan0')
@@ -468,44 +712,76 @@ class BuilderImplEtce:
         ipv4_elem = etree.SubElement(ipaddress_elem, 'ipv4')
         ipv4_elem.text='10.77.0.250/16'
 
-        # containers
-        containers_elem = etree.SubElement(host_elem, 'containers')
+        # the containers are streamed to the file one at a time so
+        # that memory use does not grow with the size of the emoe
+        with etree.xmlfile(lxcplan_file) as xf, xf.element('lxcplan'):
+            xf.write('\n')
 
-        # Add helper-lxc container
-        container_elem = etree.SubElement(containers_elem, 'container')
+            # container templates
+            with xf.element('containertemplates'):
+                xf.write('\n')
 
-        counter = 1
+                xf.write(self._assets.basenode_containertemplate(), pretty_print=True)
 
-        helper_subnetid = 0
+            xf.write('\n')
 
-        container_rt = emoe_rt.get_container_runtime('helper', 'lxc')
+            # hosts
+            with xf.element('hosts'):
+                xf.write('\n')
 
-        self._write_lxc_conf_block(container_elem,
-                                   container_rt,
-                                   'helper-lxc',
-                                   counter,
-                                   helper_subnetid,
-                                   1)  # first host id on helper subnet
+                with xf.element('host', {'hostname': 'localhost'}):
+                    xf.write('\n')
 
-        for subnetid,((wft,nl),group_tuples) in enumerate(net_groups.items(), start=helper_subnetid+1):
-            for hostid,(platform,component) in enumerate(group_tuples, start=1):
-                container_elem = etree.SubElement(containers_elem, 'container')
+                    xf.write(kernelparams_elem, pretty_print=True)
 
-                counter += 1
+                    xf.write(bridges_elem, pretty_print=True)
 
-                container_rt = emoe_rt.get_container_runtime(platform.name, component.name)
+                    # containers
+                    with xf.element('containers'):
+                        xf.write('\n')
 
-                self._write_lxc_conf_block(container_elem,
-                                           container_rt,
-                                           f'{platform.name}-{component.name}',
-                                           counter,
-                                           subnetid,
-                                           hostid)
+                        # Add helper-lxc container
+                        container_elem = etree.Element('container')
 
-        # write file
-        lxcplan_tree = lxcplan_elem.getroottree()
+                        counter = 1
+
+                        helper_subnetid = 0
 
-        lxcplan_tree.write(lxcplan_file, pretty_print=True)
+                        container_rt = emoe_rt.get_container_runtime('helper', 'lxc')
+
+                        self._write_lxc_conf_block(container_elem,
+                                                   container_rt,
+                                                   'helper-lxc',
+                                                   counter,
+                                                   helper_subnetid,
+                                                   1)  # first host id on helper subnet
+
+                        xf.write(container_elem, pretty_print=True)
+
+                        for subnetid,((wft,nl),group_tuples) in \
+                            enumerate(net_groups.items(), start=helper_subnetid+1):
+                            for hostid,(platform,component) in enumerate(group_tuples, start=1):
+                                container_elem = etree.Element('container')
+
+                                counter += 1
+
+                                container_rt = \
+                                    emoe_rt.get_container_runtime(platform.name, component.name)
+
+                                self._write_lxc_conf_block(container_elem,
+                                                           container_rt,
+                                                           f'{platform.name}-{component.name}',
+                                                           counter,
+                                                           subnetid,
+                                                           hostid)
+
+                                xf.write(container_elem, pretty_print=True)
+
+                    xf.write('\n')
+
+                xf.write('\n')
+
+            xf.write('\n')
 
 
     def _write_mgen_port_map(self, emoe_rt, docdir):
@@ -526,7 +802,7 @@ class BuilderImplEtce:
                 pmfd.write(f'{plt_name},{crt_hostname},{ipv4address},{device}\n')
 
 
-    def _write_nemid_profileid_map(self, emoe_rt, docdir, built_antennas):
+    def _write_nemid_profileid_map(self, emoe_rt, docdir, profile_ids):
         nemid_map_file = os.path.join(docdir, 'nemid_map.csv')
 
         antenna_assignments = emoe_rt.emoe.antenna_assignments
@@ -538,7 +814,7 @@ class BuilderImplEtce:
                 profileid = ''
 
                 if antennaprofile:
-                    profileid = built_antennas.index(antennaprofile) + 1
+                    profileid = profile_ids[antennaprofile]
 
                 nifd.write(f'{plt_name},{c_name},{nemid},{profileid}\n')
 
@@ -589,76 +865,44 @@ class BuilderImplEtce:
 
 
     def _write_steps_file(self, configdir):
-        etce_builders_dirs = utils.get_emex_data_resource_paths(f'builders/etce')
-
-        stepsfiles = []
-
-        for etce_builders_dir in etce_builders_dirs:
-            stepsfiles.extend([os.path.join(etce_builders_dir, f)
-                               for f in os.listdir(etce_builders_dir)
-                               if re.match(r'steps.*\.yml', f)])
-
-        steps_by_order = {}
-
-        for stepfile in stepsfiles:
-            steps = safe_load(open(stepfile))
-
-            for step,step_dict in steps.items():
-                order = int(step_dict['order'])
-
-                if order in steps_by_order:
-                    print('no good')
-
-                steps_by_order[order] = {step: step_dict['wrappers']}
-
-        steps_elem = etree.Element('steps')
-
-        for order,steps in sorted(steps_by_order.items()):
-            for step,wrappers in steps.items():
-                step_elem = etree.SubElement(steps_elem, 'step')
-
-                step_elem.set('name', step)
-
-                for wrapper,args in wrappers.items():
-                    run_elem = etree.SubElement(step_elem, 'run')
-
-                    run_elem.set('wrapper', wrapper)
+        steps_xml_file = os.path.join(configdir, 'steps.xml')
 
-                    if not args:
-                        continue
+        with open(steps_xml_file, 'wb') as sfd:
+            sfd.write(self._assets.steps_xml())
 
-                    for name,value in args.items():
-                        arg_elem = etree.SubElement(run_elem, 'arg')
 
-                        arg_elem.set('name', name)
-                        arg_elem.set('value', str(value))
+    def _write_emanephyinit_eel(self, emoe_rt, helperdir, profile_ids):
+        formatter = EelFormatter()
 
-        steps_elem_tree = steps_elem.getroottree()
+        eel_file = os.path.join(helperdir, 'emanephyinit.eel')
 
-        steps_xml_file = os.path.join(configdir, 'steps.xml')
+        emoe = emoe_rt.emoe
 
-        steps_elem_tree.write(steps_xml_file, pretty_print=True)
+        # only the platforms named by initial conditions need nemids
+        ic_platform_names = set()
 
+        for ic in emoe.initial_conditions:
+            ic_platform_names.add(ic.platform_name)
 
-    def _write_emanephyinit_eel(self, emoe_rt, helperdir, built_antennas):
-        formatter = EelFormatter()
+            ic_platform_names.update([pl.remote_platform for pl in ic.pathlosses])
 
-        eel_file = os.path.join(helperdir, 'emanephyinit.eel')
+        ic_matrix = InitialConditionMatrix(
+            {name:emoe.platform_by_name(name).nemids
+             for name in sorted(ic_platform_names) if emoe.platform_by_name(name)},
+            emoe.initial_conditions)
 
-        with open(eel_file, 'w+') as efd:
-            for ic in emoe_rt.emoe.initial_conditions:
-                plt = emoe_rt.emoe.platform_by_name(ic.platform_name)
+        # lines are generated and written through a large buffer rather
+        # than accumulated in memory
+        with open(eel_file, 'w+', buffering=EEL_WRITE_BUFFER_SIZE) as efd:
+            for nemid,pov in ic_matrix.povs():
+                efd.writelines(formatter.pov_to_str('-Inf', [nemid], pov))
 
-                if ic.pov:
-                    efd.writelines(
-                        formatter.pov_to_str('-Inf', plt.nemids, ic.pov))
+            for nemid,remote_nemids,pathlosses in ic_matrix.pathloss_rows():
+                efd.writelines(
+                    formatter.pathloss_row_to_str('-Inf', nemid, remote_nemids, pathlosses))
 
-                if ic.pathlosses:
-                    efd.writelines(
-                        formatter.pathlosses_to_str('-Inf',
-                                                    plt.nemids,
-                                                    ic.pathlosses,
-                                                    emoe_rt.emoe))
+            for ic in emoe.initial_conditions:
+                plt = emoe.platform_by_name(ic.platform_name)
 
                 for ap in ic.antenna_pointings:
                     # The initializer specifies the platform components
@@ -675,7 +919,7 @@ class BuilderImplEtce:
                                               'nemid').value[0]
 
                         antennaprofile = \
-                            emoe_rt.emoe.antenna_assignment(ic.platform_name, component_name)
+                            emoe.antenna_assignment(ic.platform_name, component_name)
 
                         if not antennaprofile:
                             logging.warning(f'No profile_id found for component '
@@ -683,7 +927,7 @@ class BuilderImplEtce:
 
                             continue
 
-                        profile_id = built_antennas.index(antennaprofile) + 1
+                        profile_id = profile_ids[antennaprofile]
 
                         efd.writelines(
                             formatter.antenna_pointing_to_str('-Inf',
@@ -695,27 +939,29 @@ class BuilderImplEtce:
     def _write_testpointbroker_conf(self, emoe_rt, helperdir):
         broker_file = os.path.join(helperdir, 'otestpoint-broker.xml')
 
-        broker_elem = etree.Element('otestpoint-broker')
+        broker_attrib = {'discovery': '0.0.0.0:9001',
+                         'publish': '0.0.0.0:9002'}
 
-        broker_elem.set('discovery', '0.0.0.0:9001')
+        with etree.xmlfile(broker_file) as xf, xf.element('otestpoint-broker', broker_attrib):
+            xf.write('\n')
 
-        broker_elem.set('publish', '0.0.0.0:9002')
+            for (p_name,c_name,_,ipv4address,_,_,cr) in \
+                sorted(emoe_rt.control_endpoints()):
 
-        for (p_name,c_name,_,ipv4address,_,_,cr) in \
-            sorted(emoe_rt.control_endpoints()):
+                if not cr.testpoint_publisher:
+                    continue
 
-            if not cr.testpoint_publisher:
-                continue
+                hostname = f'{p_name}-{c_name}'
 
-            hostname = f'{p_name}-{c_name}'
+                xf.write(etree.Comment(f'{hostname}'), pretty_print=True)
 
-            broker_elem.append(etree.Comment(f'{hostname}'))
+                testpoint_elem = etree.Element('testpoint')
 
-            testpoint_elem = etree.SubElement(broker_elem, 'testpoint')
+                testpoint_elem.set('discovery', f'{ipv4address}:8881')
 
-            testpoint_elem.set('discovery', f'{ipv4address}:8881')
+                testpoint_elem.set('publish', f'{ipv4address}:8882')
 
-            testpoint_elem.set('publish', f'{ipv4address}:8882')
+                xf.write(testpoint_elem, pretty_print=True)
         """
         <otestpoint-broker discovery="0.0.0.0:9001" publish="0.0.0.0:9002">
           <!-- spectrum monitor -->
@@ -734,21 +980,11 @@ class BuilderImplEtce:
 
         </otestpoint-broker>
         """
-        # write file
-        broker_tree = broker_elem.getroottree()
-
-        broker_tree.write(broker_file, pretty_print=True)
 
 
     def _write_node_view_conf(self, emoe_rt, localhostdir):
         node_view_file = os.path.join(localhostdir, 'emane-node-view-publisher.xml')
 
-        node_view_elem = etree.Element('emane-node-view-publisher')
-
-        node_view_elem.set('endpoint', 'helper-lxc:9002')
-
-        nodes_elem = etree.SubElement(node_view_elem, 'nodes')
-
         # keep track of platforms that already have a marker - we only
         # need one marker per platform
         marked_platforms = {}
@@ -805,33 +1041,46 @@ class BuilderImplEtce:
             logging.error('Cannot map platforms, no emane node')
             return
 
-        node_elem = etree.SubElement(nodes_elem, 'node')
-
         proxy_nemid,proxy_hostname = marked_platforms.pop(proxy_platform)
 
-        node_elem.set('nem-id', str(proxy_nemid))
-        node_elem.set('color', '#459e3c')
-        node_elem.set('label', proxy_platform)
-        node_elem.set('tag', proxy_hostname)
+        proxy_attrib = {'nem-id': str(proxy_nemid),
+                        'color': '#459e3c',
+                        'label': proxy_platform,
+                        'tag': proxy_hostname}
+
+        # write file
+        with etree.xmlfile(node_view_file) as xf, \
+             xf.element('emane-node-view-publisher', {'endpoint': 'helper-lxc:9002'}):
+            xf.write('\n')
 
-        proxy_elem = etree.SubElement(node_elem, 'proxy')
+            with xf.element('nodes'):
+                xf.write('\n')
 
-        for plt_name,(nemid, hostname) in marked_platforms.items():
-            node_elem = etree.SubElement(proxy_elem, 'node')
+                with xf.element('node', proxy_attrib):
+                    xf.write('\n')
 
-            node_elem.set('nem-id', str(nemid))
-            node_elem.set('color', '#459e3c')
-            # the label is just the platform name
-            node_elem.set('label', plt_name)
+                    with xf.element('proxy'):
+                        xf.write('\n')
 
-        # write file
-        node_view_tree = node_view_elem.getroottree()
+                        for plt_name,(nemid, hostname) in marked_platforms.items():
+                            node_elem = etree.Element('node')
+
+                            node_elem.set('nem-id', str(nemid))
+                            node_elem.set('color', '#459e3c')
+                            # the label is just the platform name
+                            node_elem.set('label', plt_name)
+
+                            xf.write(node_elem, pretty_print=True)
+
+                    xf.write('\n')
+
+                xf.write('\n')
+
+            xf.write('\n')
 
         # add the access port
         emoe_rt.add_container_port('emane-node-view', 5000)
 
-        node_view_tree.write(node_view_file, pretty_print=True)
-
 
     def _write_socat_mappings(self, emoe_rt, localhostdir):
         # map ports this way
@@ -903,7 +1152,7 @@ class BuilderImplEtce:
                       'range=172.17.0.2/24,' \
                       'ip-multicast-ttl=8,' \
                       'ip-multicast-if=10.76.0.250\n' % \
-                      (emoe_rt.mcast_address))
+                      (emoe_rt.mcast_address()))
 
             # expose any spectrum monitor ports
             next_port = 5004
@@ -0,0 +1,111 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+from contextlib import contextmanager
+import csv
+from threading import Lock
+import time
+
+
+class BuildTimer:
+    """Accumulate the wall clock time spent in each named stage of
+    an EMOE configuration build, and the number of processes that
+    rendered its platform configurations."""
+    def __init__(self):
+        # stage name -> seconds, in first entered order
+        self._stages = {}
+
+        self._render_workers = 1
+
+
+    @contextmanager
+    def stage(self, name):
+        start = time.monotonic()
+
+        try:
+            yield
+        finally:
+            self._stages[name] = self._stages.get(name, 0.0) + time.monotonic() - start
+
+
+    @property
+    def stages(self):
+        return list(self._stages.items())
+
+
+    @property
+    def render_workers(self):
+        return self._render_workers
+
+
+    @render_workers.setter
+    def render_workers(self, render_workers):
+        self._render_workers = render_workers
+
+
+    def write(self, csvfile):
+        with open(csvfile, 'w') as cfd:
+            writer = csv.writer(cfd)
+
+            writer.writerow(['stage', 'seconds'])
+
+            for name,seconds in self._stages.items():
+                writer.writerow([name, f'{seconds:.6f}'])
+
+
+class BuildMetrics:
+    """Per stage build time totals over all of the builds run by an
+    emexd instance. Builds run on the build worker threads, so
+    updates are locked."""
+    def __init__(self):
+        self._lock = Lock()
+
+        # stage name -> [count, total seconds, max seconds]
+        self._stages = {}
+
+
+    def add(self, build_timer):
+        with self._lock:
+            for name,seconds in build_timer.stages:
+                stage = self._stages.setdefault(name, [0, 0.0, 0.0])
+
+                stage[0] += 1
+                stage[1] += seconds
+                stage[2] = max(stage[2], seconds)
+
+
+    @property
+    def stages(self):
+        """Return a list of (name, count, total seconds, max seconds)."""
+        with self._lock:
+            return [(name,count,total,maximum)
+                    for name,(count,total,maximum) in self._stages.items()]
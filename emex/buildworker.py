@@ -0,0 +1,188 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+import logging
+from threading import Thread
+import traceback
+
+from emex.emoeruntime import EmoeRuntime
+from emex.emoestate import EmoeState
+
+
+class EmoeBuild:
+    """Tracks an EMOE from the StartEmoeRequest until its configuration
+    is built - the BUILDING phase.
+
+    The build is reported to clients in the QUEUED state, which spans
+    configuration building, waiting for CPUs and container start. A
+    build that fails is reported once in the FAILED state before it is
+    forgotten. The CPUs the EMOE needs are known once it is unpacked.
+    """
+    def __init__(self, timestamp, client_id, emoe_name):
+        self._timestamp = timestamp
+        self._client_id = client_id
+        self._emoe_name = emoe_name
+        self._state = EmoeState.QUEUED
+        self._cancelled = False
+        self._cpus = 0
+
+
+    @property
+    def timestamp(self):
+        return self._timestamp
+
+
+    @property
+    def emoe_id(self):
+        return self._timestamp.emoe_id
+
+
+    @property
+    def client_id(self):
+        return self._client_id
+
+
+    @property
+    def emoe_name(self):
+        return self._emoe_name
+
+
+    @property
+    def state(self):
+        return self._state
+
+
+    @state.setter
+    def state(self, state):
+        self._state = state
+
+
+    @property
+    def cpus(self):
+        return self._cpus
+
+
+    @cpus.setter
+    def cpus(self, cpus):
+        self._cpus = cpus
+
+
+    @property
+    def cancelled(self):
+        return self._cancelled
+
+
+    def cancel(self):
+        self._cancelled = True
+
+
+class BuildWorker(Thread):
+    """Unpack and build EMOE configurations in a separate thread.
+
+    Unpacking an EMOE runs all of the configuration helpers and
+    building its configuration renders the templates for every
+    platform component. Both take seconds for larger EMOEs. Running
+    them in the main emexd waveform_resource thread makes emexd
+    unresponsive to all clients for the duration. The Manager
+    enqueues (EmoeBuild, emoe_proto) items on the worker input
+    queue and this thread returns the outcome on the worker output
+    queue, signalling the main thread over worker_socket in the same
+    way as the ContainerWorker.
+
+    CPUs are not assigned here; the build records how many the EMOE
+    needs and the Manager allocates them once the build succeeds and
+    enough are free.
+    """
+    def __init__(self,
+                 config,
+                 unpack,
+                 builder,
+                 build_metrics,
+                 worker_in_q,
+                 worker_out_q,
+                 worker_socket,
+                 socket_lock):
+        super().__init__()
+        self._config = config
+        self._unpack = unpack
+        self._builder = builder
+        self._build_metrics = build_metrics
+        self._worker_in_q = worker_in_q
+        self._worker_out_q = worker_out_q
+        self._worker_socket = worker_socket
+        self._socket_lock = socket_lock
+        self._build_seq = 1
+
+
+    def run(self):
+        while True:
+            build,emoe_proto = self._worker_in_q.get()
+
+            emoe_rt = None
+
+            try:
+                if build.cancelled:
+                    self._worker_out_q.put((False, 'cancelled', build, None))
+
+                    continue
+
+                emoe = self._unpack(emoe_proto)
+
+                build.cpus = emoe.cpus
+
+                emoe_rt = EmoeRuntime(build.timestamp,
+                                      build.client_id,
+                                      emoe,
+                                      set(),
+                                      self._config)
+
+                build_timer = self._builder.build_config(emoe_rt, self._config)
+
+                self._build_metrics.add(build_timer)
+
+                self._worker_out_q.put((True, 'ok', build, emoe_rt))
+
+            except Exception as e:
+                logging.error(traceback.format_exc())
+
+                message = str(e)
+
+                self._worker_out_q.put((False, message, build, emoe_rt))
+
+            finally:
+                # signal the emexd event loop - doesn't really matter what we send
+                ret = f'build {self._build_seq} emoe "{build.emoe_name}"'
+
+                with self._socket_lock:
+                    self._worker_socket.send(bytes(ret,'utf-8'))
+
+                self._build_seq += 1
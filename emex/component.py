@@ -30,11 +30,14 @@
 #
 # See toplevel COPYING for more information.
 
-import copy
+import sys
+
 from emex.paramgroup import ParamGroup
 
 
 class Component:
+    __slots__ = ('_name', '_emex_type', '_emex_type_value', '_param_groups', '_labels')
+
     @staticmethod
     def configdict_from_protobuf(component_proto):
         name = component_proto.name
@@ -59,11 +62,11 @@ class Component:
 
 
     def __init__(self, name, component_dict):
-        self._name = component_dict['name']
+        self._name = sys.intern(component_dict['name'])
 
-        self._emex_type = component_dict['type']
+        self._emex_type = sys.intern(component_dict['type'])
 
-        self._emex_type_value = component_dict['value']
+        self._emex_type_value = sys.intern(component_dict['value'])
 
         self._param_groups = {
             group: ParamGroup(group, config_dict)
@@ -115,7 +118,7 @@ class Component:
 
     @property
     def param_groups(self):
-        return copy.deepcopy(self._param_groups)
+        return dict(self._param_groups)
 
 
     @property
@@ -172,20 +175,46 @@ class Component:
         param_group.set_param(p_name, value_list)
 
 
-    def to_protobuf(self, component_proto):
+    def differs_from(self, baseline):
+        """
+        True if the labels or any parameter value differ from those
+        of baseline, a component of the same type.
+        """
+        if not self.labels == baseline.labels:
+            return True
+
+        return any([pg.changed_params(baseline._param_groups[pg.group])
+                    for pg in self._param_groups.values()])
+
+
+    def to_protobuf(self, component_proto, baseline=None):
+        """
+        Write the component to component_proto. When baseline, a
+        component of the same type, is passed only the labels and
+        parameters that differ from it are written.
+        """
         component_proto.name = self.name
 
         component_proto.component_type = self.emex_type
 
         component_proto.value = self.emex_type_value
 
-        for label in self.labels:
-            component_proto.labels.append(label)
+        if not baseline or not self.labels == baseline.labels:
+            for label in self.labels:
+                component_proto.labels.append(label)
+
+        for param_group in self._param_groups.values():
+            baseline_group = None
+
+            if baseline:
+                baseline_group = baseline._param_groups[param_group.group]
+
+                if not param_group.changed_params(baseline_group):
+                    continue
 
-        for group_name, param in self.param_groups.items():
             param_group_proto = component_proto.param_groups.add()
 
-            param.to_protobuf(param_group_proto)
+            param_group.to_protobuf(param_group_proto, baseline_group)
 
 
     def lines(self, depth=0):
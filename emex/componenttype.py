@@ -30,7 +30,6 @@
 #
 # See toplevel COPYING for more information.
 
-import copy
 from emex.paramgrouptype import ParamGroupType
 
 
@@ -100,7 +99,7 @@ class ComponentType:
 
     @property
     def paramgroup_types(self):
-        return copy.deepcopy(self._paramgroup_types)
+        return dict(self._paramgroup_types)
 
 
     def to_protobuf(self, componenttype_proto):
@@ -110,7 +109,7 @@ class ComponentType:
 
         componenttype_proto.value = self.value
 
-        for group_name, paramtype in self.paramgroup_types.items():
+        for paramtype in self._paramgroup_types.values():
             paramtype_group_proto = componenttype_proto.paramgroup_types.add()
 
             paramtype.to_protobuf(paramtype_group_proto)
@@ -0,0 +1,273 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+
+"""Optional payload compression for length prefixed EMEX messages.
+
+EMEX messages are framed with a 4 byte, network order length
+prefix. When a frame is compressed the high bit of the prefix is
+set and the payload begins with a one byte codec id followed by the
+compressed message. Uncompressed frames are unchanged, so peers that
+never negotiate compression interoperate as before.
+
+Compression is negotiated per connection. The client lists the codecs
+it can decode in its requests and the server replies with the one it
+selected. Each side only compresses frames once it knows its peer can
+decode them, and only frames of at least threshold bytes.
+
+Frames are received from untrusted peers. Neither a frame nor the
+message decompressed from it may exceed max_size bytes, and frames
+that cannot be decoded raise FrameError.
+"""
+
+from collections import namedtuple
+import struct
+import zlib
+
+
+COMPRESSED_FLAG = 0x80000000
+
+LENGTH_MASK = 0x7FFFFFFF
+
+# frames smaller than this many bytes are sent uncompressed
+DEFAULT_THRESHOLD = 4096
+
+# the largest frame, or decompressed message, accepted from a peer
+DEFAULT_MAX_SIZE = 128 * 2**20
+
+
+class FrameError(ValueError):
+    """A received frame is too large, or cannot be decoded."""
+
+
+# decompress(data, max_size) returns the decompressed data, raising
+# FrameError when it is larger than max_size
+Codec = namedtuple('Codec', ['name', 'codec_id', 'compress', 'decompress'])
+
+
+def _zstd_codec():
+    try:
+        import zstandard
+    except ImportError:
+        return None
+
+    def decompress(data, max_size):
+        # decompress allocates the content size a frame declares, check
+        # it first. max_output_size bounds frames without a content size
+        content_size = zstandard.frame_content_size(data)
+
+        if content_size > max_size:
+            raise FrameError(f'zstd frame content size {content_size} exceeds {max_size}')
+
+        return zstandard.ZstdDecompressor().decompress(data, max_output_size=max_size)
+
+    # zstandard (de)compressors are not safe to share between threads,
+    # create them per call
+    return Codec('zstd',
+                 2,
+                 lambda data: zstandard.ZstdCompressor(level=3).compress(data),
+                 decompress)
+
+
+def _lz4_codec():
+    try:
+        import lz4.frame
+    except ImportError:
+        return None
+
+    def decompress(data, max_size):
+        decompressor = lz4.frame.LZ4FrameDecompressor()
+
+        decompressed = decompressor.decompress(data, max_length=max_size)
+
+        # output beyond max_length is held back, leaving the frame unfinished
+        if not decompressor.eof:
+            raise FrameError(f'lz4 frame is truncated or exceeds {max_size} bytes')
+
+        return decompressed
+
+    return Codec('lz4', 3, lz4.frame.compress, decompress)
+
+
+def _zlib_codec():
+    def decompress(data, max_size):
+        decompressor = zlib.decompressobj()
+
+        decompressed = decompressor.decompress(data, max_size)
+
+        # input left unconsumed at max_size holds more output
+        if decompressor.unconsumed_tail or not decompressor.eof:
+            raise FrameError(f'zlib stream is truncated or exceeds {max_size} bytes')
+
+        return decompressed
+
+    return Codec('zlib',
+                 1,
+                 lambda data: zlib.compress(data, 1),
+                 decompress)
+
+
+# available codecs in order of preference, zlib is always present
+_CODECS = [codec for codec in (_zstd_codec(), _lz4_codec(), _zlib_codec())
+           if codec]
+
+_CODECS_BY_NAME = {codec.name:codec for codec in _CODECS}
+
+_CODECS_BY_ID = {codec.codec_id:codec for codec in _CODECS}
+
+
+def available_codecs():
+    """Names of the codecs available on this host, most preferred first."""
+    return [codec.name for codec in _CODECS]
+
+
+def parse_codecs(codecs_str):
+    """Parse a comma separated list of codec names, dropping any
+    that are not available on this host. "none" or an empty string
+    disables compression."""
+    names = [name.strip().lower() for name in codecs_str.split(',')]
+
+    return [name for name in names if name in _CODECS_BY_NAME]
+
+
+def get_codec(name):
+    """Return the named Codec, or None for no compression."""
+    if not name:
+        return None
+
+    codec = _CODECS_BY_NAME.get(name)
+
+    if not codec:
+        raise ValueError(f'unsupported compression codec "{name}"')
+
+    return codec
+
+
+def negotiate(offered, supported=None):
+    """Select the first of the supported codecs that the peer offered.
+
+    Returns None when there is no codec in common."""
+    if supported is None:
+        supported = available_codecs()
+
+    for name in supported:
+        if name in offered and name in _CODECS_BY_NAME:
+            return _CODECS_BY_NAME[name]
+
+    return None
+
+
+def frame_buffers(payload, codec=None, threshold=DEFAULT_THRESHOLD):
+    """Return the list of buffers that make up the frame of payload,
+    the length prefix followed by the, possibly compressed, payload.
+    The payload is compressed with codec when it is at least threshold
+    bytes and compression reduces its size."""
+    if codec and len(payload) >= threshold:
+        compressed = codec.compress(payload)
+
+        if len(compressed) + 1 < len(payload):
+            return [struct.pack('!IB', (len(compressed) + 1) | COMPRESSED_FLAG, codec.codec_id),
+                    compressed]
+
+    return [struct.pack('!I', len(payload)), payload]
+
+
+def encode_frame(payload, codec=None, threshold=DEFAULT_THRESHOLD):
+    """Return payload framed with its length prefix, see frame_buffers."""
+    return b''.join(frame_buffers(payload, codec, threshold))
+
+
+def decode_header(header):
+    """Unpack a 4 byte frame prefix to a (count, compressed) tuple,
+    where count is the number of payload bytes that follow."""
+    (word,) = struct.unpack('!I', header)
+
+    return word & LENGTH_MASK, bool(word & COMPRESSED_FLAG)
+
+
+def check_frame_size(count, max_size=DEFAULT_MAX_SIZE):
+    """Raise FrameError when a frame of count payload bytes is too large."""
+    if count > max_size:
+        raise FrameError(f'received frame of {count} bytes exceeds {max_size}')
+
+
+def decode_payload(payload, compressed, max_size=DEFAULT_MAX_SIZE):
+    """Return the message carried by a frame payload. Raises FrameError
+    for an unsupported codec, corrupt data, or a message larger than
+    max_size bytes."""
+    if not compressed:
+        return payload
+
+    if not len(payload):
+        raise FrameError('received compressed frame without a codec id')
+
+    codec = _CODECS_BY_ID.get(payload[0])
+
+    if not codec:
+        raise FrameError(f'received frame with unsupported compression codec id {payload[0]}')
+
+    try:
+        return codec.decompress(memoryview(payload)[1:], max_size)
+
+    except FrameError:
+        raise
+
+    except Exception as e:
+        raise FrameError(f'unable to decompress {codec.name} frame: {e}') from e
+
+
+def split_frames(data, max_size=DEFAULT_MAX_SIZE):
+    """Split data into the complete messages it contains.
+
+    Returns the list of messages and the trailing bytes of any
+    incomplete frame, which should be prepended to the next data
+    received. Raises FrameError for a frame that is too large or
+    cannot be decoded."""
+    messages = []
+
+    offset = 0
+
+    while len(data) - offset >= 4:
+        count,compressed = decode_header(data[offset:offset+4])
+
+        check_frame_size(count, max_size)
+
+        if count > len(data) - offset - 4:
+            break
+
+        payload = data[offset+4:offset+4+count]
+
+        messages.append(decode_payload(payload, compressed, max_size))
+
+        offset += count + 4
+
+    return messages, data[offset:]
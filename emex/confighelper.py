@@ -30,10 +30,92 @@
 #
 # See toplevel COPYING for more information.
 
+from collections import defaultdict,namedtuple
 import re
 import logging
 
 
+IndexedParam = namedtuple('IndexedParam', ['platform_name', 'component', 'group', 'param'])
+
+
+class ParamIndex:
+    """
+    Index of every parameter of a set of platforms, collected in one
+    pass so that the helpers configuring and checking an EMOE can look
+    up parameters by name instead of each rescanning all platforms.
+    Entries reference the Param objects themselves, so values set by
+    one helper are seen by the next.
+    """
+    def __init__(self, platforms):
+        self._params = {}
+
+        self._params_by_group_and_name = defaultdict(lambda: [])
+
+        self._params_by_name = defaultdict(lambda: [])
+
+        for plt in platforms:
+            for c in plt.components:
+                for pg_name, param_group in c.param_groups.items():
+                    for p_name, param in param_group.params.items():
+                        entry = IndexedParam(plt.name, c, pg_name, param)
+
+                        self._params[(plt.name, c.name, pg_name, p_name)] = entry
+
+                        self._params_by_group_and_name[(pg_name, p_name)].append(entry)
+
+                        self._params_by_name[p_name].append(entry)
+
+
+    def get(self, plt_name, c_name, pg_name, p_name):
+        return self._params.get((plt_name, c_name, pg_name, p_name), None)
+
+
+    def params(self, pg_name, p_name):
+        """
+        The pg_name.p_name parameter of every component that has one,
+        in platform and component order.
+        """
+        return self._params_by_group_and_name.get((pg_name, p_name), [])
+
+
+    def params_by_name(self, p_name):
+        """
+        The p_name parameter of any group of every component that has
+        one, in platform and component order.
+        """
+        return self._params_by_name.get(p_name, [])
+
+
+class IdPool:
+    """
+    Hand out ids from id_pool in order, skipping those already
+    assigned. Each id is tested against a set and the pool is walked
+    once, so assigning n ids is linear in n.
+    """
+    def __init__(self, id_pool, assigned=()):
+        self._ids = iter(id_pool)
+
+        self._assigned = set(assigned)
+
+
+    def __contains__(self, value):
+        return value in self._assigned
+
+
+    def add(self, value):
+        self._assigned.add(value)
+
+
+    def next(self):
+        for next_id in self._ids:
+            if not next_id in self._assigned:
+                self._assigned.add(next_id)
+
+                return next_id
+
+        raise ValueError('No unassigned ids remain in the id pool.')
+
+
 class ConfigHelper:
     """
     Interface for configuration helpers. These classes are intended to
@@ -42,8 +124,12 @@ class ConfigHelper:
     programmatically capture the various configuration requirements
     that are tedious to perform by hand. Helper classes inherit this
     interface and are placed in the emex.helper module.
+
+    Each method accepts the ParamIndex of the platforms, shared
+    across all helpers of an EMOE. Helpers build their own when
+    none is passed.
     """
-    def configure(self, platforms):
+    def configure(self, platforms, index=None):
         """
         Configure the platforms according to the rule implemented
         by this class.
@@ -51,7 +137,7 @@ class ConfigHelper:
         raise NotImplementedError('ConfigHelper.configure')
 
 
-    def check(self, platforms):
+    def check(self, platforms, index=None):
         """
         Check the rule implemented by this class. raise ValueError
         if the rule is not followed.
@@ -59,7 +145,7 @@ class ConfigHelper:
         raise NotImplementedError('ConfigHelper.check')
 
 
-    def get_meta_params(self, emoe_rt):
+    def get_meta_params(self, emoe_rt, index=None):
         """
         Returns a set of parameters that can be set or derived from
         the platforms and runtime configuration.
@@ -67,6 +153,10 @@ class ConfigHelper:
         raise NotImplementedError('ConfigHelper.get_meta_params')
 
 
+    def get_index(self, platforms, index=None):
+        return index if index else ParamIndex(platforms)
+
+
     def get_components(self, platforms, emex_types, value_pattern):
         components = []
 
@@ -91,7 +181,7 @@ class ConfigHelper:
         Configure a unique value to the pg_name.p_name of the passed in components.
         Values are selected from the id_pool set.
         """
-        assigned = set([])
+        assigned = IdPool(id_pool)
 
         unconfigured = []
 
@@ -109,18 +199,9 @@ class ConfigHelper:
             else:
                 unconfigured.append(c)
 
-        pool_index = 0
-
         # assign values to unconfigured components
         for c in unconfigured:
-            while id_pool[pool_index] in assigned:
-                pool_index += 1
-
-            next_id = id_pool[pool_index]
-
-            c.set_param(pg_name, p_name, next_id)
-
-            assigned.add(next_id)
+            c.set_param(pg_name, p_name, assigned.next())
 
 
     def assign_unique_meta_param_id(self, meta_params, components, pg_name, p_name, id_pool=range(1,1025)):
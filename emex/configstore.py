@@ -0,0 +1,170 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+import hashlib
+import logging
+import os
+import shutil
+from threading import Lock
+
+from emex.utils import link_or_copy
+
+
+class ConfigStore:
+    """Content addressed store of rendered EMOE configuration.
+
+    Repeated trials of the same scenario produce the same
+    configuration files except for a handful of per-run values.
+    The builder fingerprints everything that determines the run
+    independent files - the EMOE description, without its name,
+    and the template and builder inputs - renders those files
+    once into a store entry named by the fingerprint and then
+    materializes each EMOE directory from the entry with
+    hardlinks (falling back to reflinks or copies).
+
+    Entries are evicted least recently used first when the store
+    exceeds MAX_ENTRIES.
+    """
+    MAX_ENTRIES = 16
+
+    def __init__(self, storedir):
+        self._storedir = storedir
+
+        self._lock = Lock()
+
+        self._tmp_seq = 0
+
+
+    @staticmethod
+    def fingerprint(description, input_paths):
+        """Return the hex digest of the description bytes and the
+        name, size and modification time of each of the input_paths
+        files and every file below each of the input_paths directories.
+        """
+        digest = hashlib.sha256(description)
+
+        def _update(srcfile):
+            srcstat = os.stat(srcfile)
+
+            digest.update(
+                f'{srcfile}:{srcstat.st_size}:{srcstat.st_mtime_ns}\n'.encode())
+
+        for input_path in input_paths:
+            if os.path.isfile(input_path):
+                _update(input_path)
+
+                continue
+
+            for dirname,dirnames,filenames in os.walk(input_path):
+                dirnames.sort()
+
+                for filename in sorted(filenames):
+                    _update(os.path.join(dirname, filename))
+
+        return digest.hexdigest()
+
+
+    def get(self, digest, render):
+        """Return the store entry directory for digest, calling
+        render(entrydir) to populate it when it does not exist yet.
+        """
+        entrydir = os.path.join(self._storedir, digest)
+
+        with self._lock:
+            if os.path.isdir(entrydir):
+                logging.info(f'config store hit {digest}')
+
+                # mark as recently used
+                os.utime(entrydir)
+
+                return entrydir
+
+            self._tmp_seq += 1
+
+            tmpdir = os.path.join(self._storedir, f'.{digest}.{os.getpid()}.{self._tmp_seq}')
+
+        logging.info(f'config store miss {digest}')
+
+        os.makedirs(tmpdir, mode=0o755)
+
+        try:
+            render(tmpdir)
+        except:
+            shutil.rmtree(tmpdir, ignore_errors=True)
+            raise
+
+        with self._lock:
+            if os.path.isdir(entrydir):
+                # rendered concurrently by another builder
+                shutil.rmtree(tmpdir, ignore_errors=True)
+            else:
+                os.rename(tmpdir, entrydir)
+
+            self._evict(entrydir)
+
+        return entrydir
+
+
+    def materialize(self, entrydir, dstdir):
+        """Link every file below entrydir into the same relative
+        location below dstdir.
+        """
+        with self._lock:
+            for dirname,_,filenames in os.walk(entrydir):
+                reldir = os.path.relpath(dirname, entrydir)
+
+                outdir = os.path.normpath(os.path.join(dstdir, reldir))
+
+                os.makedirs(outdir, mode=0o755, exist_ok=True)
+
+                for filename in filenames:
+                    link_or_copy(os.path.join(dirname, filename),
+                                 os.path.join(outdir, filename))
+
+
+    def _evict(self, keep):
+        entries = []
+
+        with os.scandir(self._storedir) as it:
+            for entry in it:
+                if entry.name.startswith('.') or not entry.is_dir():
+                    continue
+
+                entries.append((entry.stat().st_mtime, entry.path))
+
+        for _,path in sorted(entries)[:max(len(entries)-ConfigStore.MAX_ENTRIES, 0)]:
+            if path == keep:
+                continue
+
+            logging.info(f'config store evict {os.path.basename(path)}')
+
+            shutil.rmtree(path, ignore_errors=True)
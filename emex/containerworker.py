@@ -92,7 +92,13 @@ class ContainerWorker(Thread):
                         cpuset_cpus=cpus_str,
                         environment={'EMEXD_LISTEN_ADDRESS': listenaddress,
                                      'EMEXD_LISTEN_PORT': str(listenport),
-                                     'EMOE_ID':emoe_rt.emoe_id},
+                                     'EMOE_ID':emoe_rt.emoe_id,
+                                     'EMEX_COMPRESSION_CODECS':
+                                     ','.join(self._config.compression_codecs),
+                                     'EMEX_COMPRESSION_THRESHOLD':
+                                     str(self._config.compression_threshold),
+                                     'EMEX_HEARTBEAT_PERIOD':
+                                     str(self._config.container_heartbeat_period)},
                         volumes={f'{emoe_rt.workdir}':{'bind':'/tmp/etce', 'mode':'rw'}},
                         ports=ports,
                         detach=True,
@@ -32,46 +32,33 @@
 
 
 class EelFormatter:
+    """Generate EEL lines. Each method yields its lines, so callers
+    can stream them to a file with writelines."""
     def pov_to_str(self, time, nemids, pov):
-        lines = []
-
         #-Inf nem:NEMID location gps  38.192924,-75.921039,1000
         #-Inf nem:NEMID orientation pitch,roll,yaw
         #-Inf nem:NEMID velocity az,el,mag
-        for nemid in nemids:
-            lines.append(f'{time} nem:{nemid} location gps '
-                         f'{pov.latitude},{pov.longitude},{pov.altitude}\n')
-            lines.append(f'{time} nem:{nemid} orientation '
-                         f'{pov.pitch},{pov.roll},{pov.yaw}\n')
-            lines.append(f'{time} nem:{nemid} velocity '
-                         f'{pov.azimuth},{pov.elevation},{pov.speed}\n')
-
-        return lines
-
-
-    def pathlosses_to_str(self, time, nemids, pathlosses, emoe):
-        lines = []
+        location = f'location gps {pov.latitude},{pov.longitude},{pov.altitude}\n'
+        orientation = f'orientation {pov.pitch},{pov.roll},{pov.yaw}\n'
+        velocity = f'velocity {pov.azimuth},{pov.elevation},{pov.speed}\n'
 
         for nemid in nemids:
-            line = f'{time} nem:{nemid} pathloss'
-            for pl in pathlosses:
-                remote_nemids = emoe.platform_by_name(pl.remote_platform).nemids
+            yield f'{time} nem:{nemid} {location}'
+            yield f'{time} nem:{nemid} {orientation}'
+            yield f'{time} nem:{nemid} {velocity}'
 
-                for rnemid in remote_nemids:
-                    line += f' nem:{rnemid},{pl.pathloss}'
 
-            lines.append(f'{line}\n')
+    def pathloss_row_to_str(self, time, nemid, remote_nemids, pathlosses):
+        #-Inf nem:NEMID pathloss nem:REMOTE_NEMID,pathloss ...
+        remotes = ' '.join([f'nem:{rnemid},{pathloss}'
+                            for rnemid,pathloss in zip(remote_nemids, pathlosses)])
 
-        return lines
+        yield f'{time} nem:{nemid} pathloss {remotes}\n'
 
 
     def antenna_pointing_to_str(self, time, nemid, profile_id, antenna_pointing):
         #-Inf nem:NEMID antennaprofile profileid,az,el
-        lines = []
-
-        lines.append(f'{time} nem:{nemid} antennaprofile '
-                     f'{profile_id},'
-                     f'{antenna_pointing.azimuth},'
-                     f'{antenna_pointing.elevation}\n')
-
-        return lines
+        yield (f'{time} nem:{nemid} antennaprofile '
+               f'{profile_id},'
+               f'{antenna_pointing.azimuth},'
+               f'{antenna_pointing.elevation}\n')
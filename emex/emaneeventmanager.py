@@ -46,6 +46,18 @@ class EmaneEventManager:
 
         self._antenna_profileid_map = antenna_profileid_map
 
+        # per platform nemids and (component_name, profileid) tuples
+        # for events that apply to all of a platform's components
+        self._nemids_by_platform = defaultdict(lambda: [])
+
+        for (plt_name,_),nemid in self._nemid_map.items():
+            self._nemids_by_platform[plt_name].append(nemid)
+
+        self._profileids_by_platform = defaultdict(lambda: [])
+
+        for (plt_name,component_name),profileid in self._antenna_profileid_map.items():
+            self._profileids_by_platform[plt_name].append((component_name, profileid))
+
 
     def send_events(self, emane_events):
         if not self._service:
@@ -84,9 +96,7 @@ class EmaneEventManager:
                     for c_name in pov.component_names:
                         nemids.append(self._nemid_map[(plt_name, c_name)])
                 else:
-                    nemids = [nemid
-                              for (plt_name2,_),nemid in self._nemid_map.items()
-                              if plt_name == plt_name2]
+                    nemids = self._nemids_by_platform.get(plt_name, [])
 
                 for nemid in nemids:
                     pov_event.append(
@@ -131,18 +141,14 @@ class EmaneEventManager:
                     for c_name in pathloss.component_names:
                         local_nemids.append(self._nemid_map[(plt_name, c_name)])
                 else:
-                    local_nemids = [nemid
-                                    for (plt_name2,_),nemid in self._nemid_map.items()
-                                    if plt_name == plt_name2]
+                    local_nemids = self._nemids_by_platform.get(plt_name, [])
 
                 remote_nemids = []
                 if pathloss.remote_component_names:
                     for rc_name in pathloss.remote_component_names:
                         remote_nemids.append(self._nemid_map[(remote_plt_name, rc_name)])
                 else:
-                    remote_nemids = [nemid
-                                     for (remote_plt_name2,_),nemid in self._nemid_map.items()
-                                     if remote_plt_name == remote_plt_name2]
+                    remote_nemids = self._nemids_by_platform.get(remote_plt_name, [])
 
                 for nemid1 in local_nemids:
                     for nemid2 in remote_nemids:
@@ -186,12 +192,11 @@ class EmaneEventManager:
                     else:
                         # if component_names is not specified, it applies to
                         # all of the platforms antennas
-                        for (plt_name2,component_name),profileid in self._antenna_profileid_map.items():
-                            if plt_name == plt_name2:
-                                profileids.append(profileid)
+                        for component_name,profileid in self._profileids_by_platform.get(plt_name, []):
+                            profileids.append(profileid)
 
-                                nemids.append(
-                                    self._nemid_map[(plt_name,component_name)])
+                            nemids.append(
+                                self._nemid_map[(plt_name,component_name)])
 
                     for profileid,nemid in zip(profileids,nemids):
                         logging.debug(
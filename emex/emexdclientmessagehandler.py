@@ -36,6 +36,7 @@ from emex.antennatype import AntennaType
 from emex.emoestate import EmoeState
 from emex.platformtype import PlatformType
 from emex.common_pb2 import PASS,FAIL
+from emex.compression import get_codec
 import emex.emexd_pb2 as emexd_pb2
 from emex.emexdmessages import (
     ServiceAccessor,
@@ -44,13 +45,40 @@ from emex.emexdmessages import (
     StopEmoeReply,
     ListEmoesReply,
     ListEmoesReplyEntry,
+    BuildStageMetric,
     EmoeStateTransitionEvent
 )
 
 
 class EmexdClientMessageHandler:
-    def __init__(self):
-        pass
+    def __init__(self, compression_codecs=()):
+        self._compression_codecs = list(compression_codecs)
+
+        self._compression_codec = None
+
+
+    @property
+    def compression_codec(self):
+        """The Codec selected by the server for this connection, None
+        until the server accepts one of the offered codecs."""
+        return self._compression_codec
+
+
+    def _offer_compression(self, request):
+        # offer codecs until the server selects one
+        if not self._compression_codec:
+            request.compression_codecs.extend(self._compression_codecs)
+
+
+    def _parse_server_message(self, reply_str):
+        reply = emexd_pb2.ServerMessage()
+
+        reply.ParseFromString(reply_str)
+
+        if reply.HasField('compression_codec'):
+            self._compression_codec = get_codec(reply.compression_codec)
+
+        return reply
 
 
     def build_models_request_message(self):
@@ -58,6 +86,8 @@ class EmexdClientMessageHandler:
 
         request.type = request.MODEL_TYPES_REQUEST_TYPE
 
+        self._offer_compression(request)
+
         return request.SerializeToString()
 
 
@@ -68,7 +98,9 @@ class EmexdClientMessageHandler:
 
         request.checkEmoeRequest.emoe_name = emoe.name
 
-        emoe.to_protobuf(request.checkEmoeRequest.emoe)
+        emoe.to_protobuf(request.checkEmoeRequest.emoe, sparse=True)
+
+        self._offer_compression(request)
 
         return request.SerializeToString()
 
@@ -78,6 +110,8 @@ class EmexdClientMessageHandler:
 
         request.type = request.LIST_EMOES_REQUEST_TYPE
 
+        self._offer_compression(request)
+
         return request.SerializeToString()
 
 
@@ -88,7 +122,9 @@ class EmexdClientMessageHandler:
 
         request.startEmoeRequest.emoe_name = emoe.name
 
-        emoe.to_protobuf(request.startEmoeRequest.emoe)
+        emoe.to_protobuf(request.startEmoeRequest.emoe, sparse=True)
+
+        self._offer_compression(request)
 
         return request.SerializeToString()
 
@@ -100,13 +136,13 @@ class EmexdClientMessageHandler:
 
         request.stopEmoeRequest.handle = emoe_handle
 
+        self._offer_compression(request)
+
         return request.SerializeToString()
 
 
     def parse_models_reply_message(self, reply_str):
-        reply = emexd_pb2.ServerMessage()
-
-        reply.ParseFromString(reply_str)
+        reply = self._parse_server_message(reply_str)
 
         return self._build_models_reply_message(reply)
 
@@ -132,9 +168,7 @@ class EmexdClientMessageHandler:
 
 
     def parse_check_emoe_reply_message(self, reply_str):
-        reply = emexd_pb2.ServerMessage()
-
-        reply.ParseFromString(reply_str)
+        reply = self._parse_server_message(reply_str)
 
         return self._build_check_emoe_reply_message(reply)
 
@@ -149,9 +183,7 @@ class EmexdClientMessageHandler:
 
 
     def parse_list_emoes_reply_message(self, reply_str):
-        reply = emexd_pb2.ServerMessage()
-
-        reply.ParseFromString(reply_str)
+        reply = self._parse_server_message(reply_str)
 
         return self._build_list_emoes_reply_message(reply)
 
@@ -175,15 +207,21 @@ class EmexdClientMessageHandler:
                                                entry.assigned_cpus,
                                                service_accessors))
 
+        build_stage_metrics = \
+            [BuildStageMetric(metric.name,
+                              metric.count,
+                              metric.total_seconds,
+                              metric.max_seconds)
+             for metric in reply.listEmoesReply.build_stage_metrics]
+
         return ListEmoesReply(total_cpus = reply.listEmoesReply.total_cpus,
                               available_cpus = reply.listEmoesReply.available_cpus,
-                              emoe_entries = entries)
+                              emoe_entries = entries,
+                              build_stage_metrics = build_stage_metrics)
 
 
     def parse_start_emoe_reply_message(self, reply_str):
-        reply = emexd_pb2.ServerMessage()
-
-        reply.ParseFromString(reply_str)
+        reply = self._parse_server_message(reply_str)
 
         return self._build_start_emoe_reply_message(reply)
 
@@ -191,15 +229,18 @@ class EmexdClientMessageHandler:
         if not reply.type == reply.START_EMOE_REPLY_TYPE:
             raise ValueError(f'Unexpected reply type {reply.type}.')
 
+        state = EmoeState(reply.startEmoeReply.state) \
+            if reply.startEmoeReply.HasField('state') else None
+
         return StartEmoeReply(reply.startEmoeReply.emoe_name,
                               reply.startEmoeReply.result==PASS,
-                              reply.startEmoeReply.message)
+                              reply.startEmoeReply.message,
+                              reply.startEmoeReply.handle,
+                              state)
 
 
     def parse_stop_emoe_reply_message(self, reply_str):
-        reply = emexd_pb2.ServerMessage()
-
-        reply.ParseFromString(reply_str)
+        reply = self._parse_server_message(reply_str)
 
         return self._build_stop_emoe_reply_message(reply)
 
@@ -234,9 +275,7 @@ class EmexdClientMessageHandler:
 
 
     def parse_reply(self, reply_str):
-        reply = emexd_pb2.ServerMessage()
-
-        reply.ParseFromString(reply_str)
+        reply = self._parse_server_message(reply_str)
 
         if reply.type == reply.MODEL_TYPES_REPLY_TYPE:
             return self._build_models_reply_message(reply)
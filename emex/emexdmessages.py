@@ -40,7 +40,7 @@ CheckEmoeReply = \
 
 StartEmoeReply = \
     namedtuple('StartEmoeReply',
-               ['emoe_name','result','message'])
+               ['emoe_name','result','message','handle','state'])
 
 StopEmoeReply = \
     namedtuple('StopEmoeReply',
@@ -48,7 +48,11 @@ StopEmoeReply = \
 
 ListEmoesReply = \
     namedtuple('ListEmoesReply',
-               ['total_cpus', 'available_cpus', 'emoe_entries'])
+               ['total_cpus', 'available_cpus', 'emoe_entries', 'build_stage_metrics'])
+
+BuildStageMetric = \
+    namedtuple('BuildStageMetric',
+               ['name', 'count', 'total_seconds', 'max_seconds'])
 
 ServiceAccessor = \
     namedtuple('ServiceAccessor', ['name', 'ip_address', 'port'])
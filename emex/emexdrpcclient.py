@@ -31,9 +31,10 @@
 # See toplevel COPYING for more information.
 
 import socket
-import struct
 
+from emex.compression import available_codecs
 from emex.emexdclientmessagehandler import EmexdClientMessageHandler
+from emex.transport import send_frame,recv_frame
 
 
 class EmexdRpcClient:
@@ -49,13 +50,21 @@ class EmexdRpcClient:
     The client may, nonetheless query the daemon for current Emoe
     status via the ListEmoesRequest/ListEmoesReply exchange
     (listemoes) call.
+
+    The client offers compression_codecs, by default all codecs
+    available on the host, to the daemon. Large messages are compressed
+    in both directions once the daemon selects one of them. Pass an
+    empty list to disable compression.
     """
-    def __init__(self, endpoint=('127.0.0.1', 49901)):
+    def __init__(self, endpoint=('127.0.0.1', 49901), compression_codecs=None):
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
         self._socket.connect(endpoint)
 
-        self._message_handler = EmexdClientMessageHandler()
+        if compression_codecs is None:
+            compression_codecs = available_codecs()
+
+        self._message_handler = EmexdClientMessageHandler(compression_codecs)
 
 
     def close(self):
@@ -98,12 +107,6 @@ class EmexdRpcClient:
 
 
     def _send_and_wait(self, request_str):
-        format_str = '!I%ds' % len(request_str)
-
-        bufstr = struct.pack(format_str, len(request_str), request_str)
-
-        self._socket.send(bufstr)
-
-        (count,) = struct.unpack('!I', self._socket.recv(4))
+        send_frame(self._socket, request_str, self._message_handler.compression_codec)
 
-        return struct.unpack('%ds' % count, self._socket.recv(count, socket.MSG_WAITALL))[0]
+        return recv_frame(self._socket)
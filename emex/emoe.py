@@ -34,8 +34,10 @@ import math
 
 from emex.antenna import Antenna
 from emex.antennaprofile import AntennaProfile
+from emex.confighelper import ParamIndex
 from emex.emoeerror import EmoeError
 from emex.platform import Platform
+from emex.platformgroup import PlatformGroup
 from emex.initialcondition import InitialCondition
 from emex.helpers.nemhelper import NemHelper
 from emex.helpers.ipv4helper import Ipv4Helper
@@ -46,26 +48,24 @@ from emex.utils import load_platform_helpers
 class Emoe:
     @staticmethod
     def from_protobuf(emoe_proto, antennatypes, platformtypes):
-        emoe = Emoe(emoe_proto.name, [], [])
+        antennas = [Antenna.from_protobuf(antenna_proto, antennatypes)
+                    for antenna_proto in emoe_proto.antennas]
 
-        for antenna_proto in emoe_proto.antennas:
-            emoe.add_antenna(
-                Antenna.from_protobuf(antenna_proto, antennatypes))
+        platforms = [Platform.from_protobuf(platform_proto, platformtypes)
+                     for platform_proto in emoe_proto.platforms]
 
-        platforms = []
-        for platform_proto in emoe_proto.platforms:
-            platforms.append(Platform.from_protobuf(platform_proto, platformtypes))
+        initial_conditions = [InitialCondition.from_protobuf(initial_condition_proto)
+                              for initial_condition_proto in emoe_proto.initial_conditions]
 
-        Emoe.configure_and_check_platforms(platforms)
+        platform_groups = [PlatformGroup.from_protobuf(group_proto, platformtypes)
+                           for group_proto in emoe_proto.platform_groups]
 
-        for platform in platforms:
-            emoe.add_platform(platform)
-
-        for intial_condition_proto in emoe_proto.initial_conditions:
-            emoe.add_initial_condition(
-                InitialCondition.from_protobuf(intial_condition_proto))
-
-        return emoe
+        # the constructor configures and checks the platforms, once
+        return Emoe(emoe_proto.name,
+                    platforms,
+                    antennas,
+                    initial_conditions,
+                    platform_groups)
 
 
     @staticmethod
@@ -74,9 +74,12 @@ class Emoe:
 
         helpers.extend(load_platform_helpers(platforms))
 
+        # one parameter index shared by all of the helpers
+        index = ParamIndex(platforms)
+
         # Configuration Helpers
         for helper in helpers:
-            helper().configure(platforms)
+            helper().configure(platforms, index)
 
         for p in platforms:
             if not p.configured:
@@ -87,16 +90,24 @@ class Emoe:
                     f'"{unconfigured_str}".')
 
         for helper in helpers:
-            helper().check(platforms)
+            helper().check(platforms, index)
 
 
     def __init__(self,
                  name,
                  platforms=[],
                  antennas=[],
-                 initial_conditions=[]):
+                 initial_conditions=[],
+                 platform_groups=[]):
         self._name = name
 
+        # grouped platforms are expanded and then handled like any other
+        self._platform_groups = list(platform_groups)
+
+        platforms = list(platforms)
+        for platform_group in self._platform_groups:
+            platforms.extend(platform_group.platforms())
+
         self.configure_and_check_platforms(platforms)
 
         # map of (platform_name, component_name) tuples to its corresponding
@@ -106,7 +117,16 @@ class Emoe:
         for antenna in antennas:
             self.add_antenna(antenna)
 
+        # platforms and components are indexed as they are added for
+        # constant time lookup by name, and their nemids and ipv4
+        # addresses collected. The indexes are built from the param
+        # values at add_platform, after configure_and_check_platforms
+        # has assigned them, and are not updated if params change later
         self._platforms = []
+        self._platforms_by_name = {}
+        self._components_by_name = {}
+        self._nemid_map = {}
+        self._ipv4address_map = {}
         for platform in platforms:
             self.add_platform(platform)
 
@@ -120,16 +140,48 @@ class Emoe:
         return self._name
 
 
+    def with_name(self, name):
+        """
+        Return a copy of this Emoe with a different name that shares
+        its already configured and checked platforms, antennas and
+        initial conditions.
+        """
+        emoe = copy.copy(self)
+
+        emoe._name = name
+
+        return emoe
+
+
     @property
     def platforms(self):
         return self._platforms
 
 
     def platform_by_name(self, name):
-        for platform in self._platforms:
-            if name == platform.name:
-                return platform
-        return None
+        return self._platforms_by_name.get(name, None)
+
+
+    def component_by_name(self, platform_name, component_name):
+        return self._components_by_name.get((platform_name, component_name), None)
+
+
+    @property
+    def nemid_map(self):
+        """
+        The (platform_name, component_name) to nemid mapping for all
+        nemids in the network, in platform order.
+        """
+        return self._nemid_map
+
+
+    @property
+    def ipv4address_map(self):
+        """
+        The (platform_name, component_name) to ipv4 address mapping for
+        all components with an address, in platform order.
+        """
+        return self._ipv4address_map
 
 
     @property
@@ -157,23 +209,78 @@ class Emoe:
         return math.ceil(sum([p.cpus for p in self.platforms]))
 
 
-    def to_protobuf(self, emoe_proto):
+    @property
+    def platform_groups(self):
+        return self._platform_groups
+
+
+    def to_protobuf(self, emoe_proto, sparse=False):
+        """
+        Write the EMOE to emoe_proto. With sparse, platforms are
+        written relative to their platformtype defaults and platform
+        groups are written in place of their platforms, for sending
+        to emexd. Otherwise every parameter of every platform is
+        written.
+        """
         emoe_proto.name = self._name
 
         for _,antenna in self._antennas.items():
             antenna.to_protobuf(emoe_proto.antennas.add())
 
-        for platform in self._platforms:
-            platform.to_protobuf(emoe_proto.platforms.add())
+        if sparse:
+            self._platforms_to_protobuf_sparse(emoe_proto)
+        else:
+            for platform in self._platforms:
+                platform.to_protobuf(emoe_proto.platforms.add())
 
         for initial_condition in self._initial_conditions:
             initial_condition.to_protobuf(emoe_proto.initial_conditions.add())
 
 
+    def _platforms_to_protobuf_sparse(self, emoe_proto):
+        grouped_names = set([])
+
+        for platform_group in self._platform_groups:
+            platform_group.to_protobuf(emoe_proto.platform_groups.add(),
+                                       self._platforms_by_name)
+
+            grouped_names.update(platform_group.platform_names)
+
+        # one default platform per platformtype to compare against
+        defaults = {}
+
+        for platform in self._platforms:
+            if platform.name in grouped_names:
+                continue
+
+            platformtype = platform.platformtype
+
+            if not platformtype.name in defaults:
+                defaults[platformtype.name] = Platform(platformtype.name, platformtype)
+
+            platform.to_protobuf(emoe_proto.platforms.add(), defaults[platformtype.name])
+
+
     def add_platform(self, platform):
+        if platform.name in self._platforms_by_name:
+            raise EmoeError(f'Duplicate platform name "{platform.name}".')
+
         self._platforms.append(platform)
 
+        self._platforms_by_name[platform.name] = platform
+
         for c in platform.components:
+            self._components_by_name[(platform.name, c.name)] = c
+
+            for _, _, p_name, p_value in c.get_params():
+                if not p_value:
+                    continue
+
+                if p_name == 'nemid':
+                    self._nemid_map[(platform.name, c.name)] = p_value[0]
+                elif p_name == 'ipv4address':
+                    self._ipv4address_map[(platform.name, c.name)] = p_value[0]
+
             if c.has_param('phy', 'antenna0'):
                 # verify that antenna0 is a valid antenna name, either omniGAIN
                 # or the name of one of the directional antennas that is part
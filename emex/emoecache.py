@@ -0,0 +1,139 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+import hashlib
+import logging
+from threading import Lock
+import time
+
+
+class EmoeCache:
+    """
+    Short lived cache of validated Emoe objects keyed by a digest of
+    their serialized protobuf. Clients normally check an EMOE and then
+    start it, and batch trials start the same scenario repeatedly, so
+    caching lets those requests skip unpacking and running the
+    configuration helpers again.
+
+    The EMOE name is excluded from the digest so that the same scenario
+    submitted under different names shares an entry. Entries are
+    renamed on the way out.
+    """
+    def __init__(self, ttl=300.0, max_entries=32):
+        self._ttl = ttl
+
+        self._max_entries = max_entries
+
+        # digest -> (expiry, emoe)
+        self._entries = {}
+
+        self._lock = Lock()
+
+        self._hits = 0
+
+        self._misses = 0
+
+
+    @staticmethod
+    def digest(emoe_proto):
+        unnamed = type(emoe_proto)()
+
+        unnamed.CopyFrom(emoe_proto)
+
+        unnamed.ClearField('name')
+
+        return hashlib.sha256(
+            unnamed.SerializePartialToString(deterministic=True)).hexdigest()
+
+
+    @property
+    def hits(self):
+        return self._hits
+
+
+    @property
+    def misses(self):
+        return self._misses
+
+
+    def get(self, digest, name):
+        """
+        Return the cached Emoe for digest renamed to name, or None
+        if there is no unexpired entry.
+        """
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+
+            entry = self._entries.get(digest, None)
+
+            if not entry:
+                self._misses += 1
+
+                return None
+
+            self._hits += 1
+
+            _,emoe = entry
+
+        logging.debug(f'emoe cache hit for "{name}" {digest[:12]}')
+
+        return emoe.with_name(name)
+
+
+    def put(self, digest, emoe):
+        now = time.monotonic()
+
+        with self._lock:
+            self._expire(now)
+
+            # evict the entry closest to expiring to make room
+            if len(self._entries) >= self._max_entries and not digest in self._entries:
+                oldest = min(self._entries, key=lambda d: self._entries[d][0])
+
+                self._entries.pop(oldest)
+
+            self._entries[digest] = (now + self._ttl, emoe)
+
+
+    def clear(self):
+        with self._lock:
+            self._entries.clear()
+
+
+    def _expire(self, now):
+        expired = [digest for digest,(expiry,_) in self._entries.items()
+                   if expiry <= now]
+
+        for digest in expired:
+            self._entries.pop(digest)
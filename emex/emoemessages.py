@@ -65,6 +65,20 @@ StopFlowRequest = \
                ['flow_name','flow_ids', 'sources','destinations'])
 
 
+# The flow table rows added or changed after a version, or all of
+# them when snapshot is True, and the flow_index of rows removed.
+FlowsDelta = \
+    namedtuple('FlowsDelta',
+               ['version', 'snapshot', 'flows_df', 'removed_flow_indexes'])
+
+
+# wall clock timestamps of a scenario event, None where they do not apply
+EventTiming = \
+    namedtuple('EventTiming',
+               ['scheduled_time', 'client_send_time', 'server_receive_time',
+                'traffic_complete_time', 'emane_complete_time', 'jamming_complete_time'])
+
+
 JamOnEvent = \
     namedtuple('JamOnEvent',
                ['platform_name', 'component_names',
@@ -76,3 +90,31 @@ JamOffEvent = \
     namedtuple('JamOffEvent',
                ['platform_name', 'component_names'])
 
+
+
+class ProgramRequestType(enum.IntEnum):
+    LOAD = emexscenario_pb2.ProgramRequest.LOAD
+    PAUSE = emexscenario_pb2.ProgramRequest.PAUSE
+    RESUME = emexscenario_pb2.ProgramRequest.RESUME
+    ABORT = emexscenario_pb2.ProgramRequest.ABORT
+    MERGE = emexscenario_pb2.ProgramRequest.MERGE
+
+
+class ProgramState(enum.IntEnum):
+    IDLE = emexscenario_pb2.ProgramReply.IDLE
+    RUNNING = emexscenario_pb2.ProgramReply.RUNNING
+    PAUSED = emexscenario_pb2.ProgramReply.PAUSED
+    COMPLETE = emexscenario_pb2.ProgramReply.COMPLETE
+    ABORTED = emexscenario_pb2.ProgramReply.ABORTED
+
+
+# scheduled_time and executed_time are seconds of program time
+ProgramEventResult = \
+    namedtuple('ProgramEventResult',
+               ['event_index', 'ok', 'message',
+                'scheduled_time', 'executed_time'])
+
+
+ProgramStatus = \
+    namedtuple('ProgramStatus',
+               ['state', 'event_results', 'pending_events'])
@@ -86,31 +86,33 @@ class EmoeRuntime:
         else:
             self._container_name = self._emoe.name
 
-        for plt in emoe.platforms:
-            for c in plt.components:
-                addr = None
-                mask = None
-                device_name = None
-                nemid = None
-                for c_name, pg_name, p_name, p_value in c.get_params():
-                    if p_name == 'ipv4address':
-                        addr = p_value[0]
-                    elif p_name == 'ipv4mask':
-                        mask = p_value[0]
-                    elif p_name == 'device':
-                        device_name = p_value[0]
-                    elif p_name == 'nemid':
-                        nemid = p_value[0]
-
-                if addr and mask and device_name:
-                    container_rt = self.get_container_runtime(plt.name, c.name)
-
-                    if nemid:
-                        container_rt.add_device(device_name,
-                                                RadioDevice(device_name, addr, mask, nemid))
-                    else:
-                        container_rt.add_device(device_name,
-                                                HostDevice(device_name, addr, mask))
+        # devices are added for components with an ipv4 address, mask
+        # and device name. radio devices also have a nemid
+        for (plt_name,c_name),addr in emoe.ipv4address_map.items():
+            c = emoe.component_by_name(plt_name, c_name)
+
+            mask = self._net_param(c, 'ipv4mask')
+            device_name = self._net_param(c, 'device')
+            nemid = emoe.nemid_map.get((plt_name, c_name), None)
+
+            if addr and mask and device_name:
+                container_rt = self.get_container_runtime(plt_name, c_name)
+
+                if nemid:
+                    container_rt.add_device(device_name,
+                                            RadioDevice(device_name, addr, mask, nemid))
+                else:
+                    container_rt.add_device(device_name,
+                                            HostDevice(device_name, addr, mask))
+
+
+    def _net_param(self, component, p_name):
+        if not component.has_param('net', p_name):
+            return None
+
+        value = component.get_param('net', p_name).value
+
+        return value[0] if value else None
 
 
     def __eq__(self, other):
@@ -136,7 +138,7 @@ class EmoeRuntime:
 
 
     def mcast_address(self):
-        return self._timestamp.mcast_address
+        return self._timestamp.mcast_address()
 
 
     @property
@@ -191,6 +193,12 @@ class EmoeRuntime:
     def cpus(self):
         return sorted(list(self._cpus))
 
+
+    @cpus.setter
+    def cpus(self, cpus):
+        self._cpus = cpus
+
+
     @property
     def num_cpus(self):
         return len(self._cpus)
@@ -354,17 +362,7 @@ class EmoeRuntime:
     def nemid_map(self):
         """
          Return a list of platform_name,component_name,nemid mapping
-         values for all nemids in the network.
+         values for all nemids in the network. The map is maintained
+         by the Emoe as platforms are added.
         """
-        nemid_map_entries = {}
-
-        for plt in self.emoe.platforms:
-            for c_name, pg_name, p_name, p_value in plt.get_params():
-                if not p_name == 'nemid':
-                    continue
-
-                nemid = p_value[0]
-
-                nemid_map_entries[(plt.name,c_name)] = nemid
-
-        return nemid_map_entries
+        return self.emoe.nemid_map
@@ -30,7 +30,6 @@
 #
 # See toplevel COPYING for more information.
 
-import datetime
 import math
 import time
 
@@ -54,12 +53,12 @@ class EventSequencerIterator(object):
             return eventtime,eventlist
 
     def _wait(self, eventtime, starttime):
+        # wait on the monotonic clock, wall clock adjustments during
+        # the scenario would otherwise shift the remaining events
         if math.isinf(eventtime) and eventtime < 0:
             return
 
-        nowtime = datetime.datetime.now()
-        eventabstime = starttime + datetime.timedelta(seconds=eventtime)
-        sleeptime = (eventabstime - nowtime).total_seconds()
+        sleeptime = starttime + eventtime - time.monotonic()
         if sleeptime <= 0:
             return
         time.sleep(sleeptime)
@@ -68,10 +67,19 @@ class EventSequencerIterator(object):
 class EventSequencer:
     def __init__(self, events):
         self._events = events
+        self._walltime = None
 
     @property
     def num_events(self):
         return len(self._events)
 
+    def scheduled_time(self, eventtime):
+        """Return the wall clock time eventtime is due in the current
+        iteration, None for events that run immediately."""
+        if self._walltime is None or (math.isinf(eventtime) and eventtime < 0):
+            return None
+        return self._walltime + eventtime
+
     def __iter__(self):
-        return EventSequencerIterator(self._events, datetime.datetime.now())
+        self._walltime = time.time()
+        return EventSequencerIterator(self._events, time.monotonic())
@@ -0,0 +1,192 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+
+import csv
+import math
+import os
+
+
+class EventTimingLog:
+    """Collect the EventTiming of the scenario events a client sends,
+    and write them with a lateness and jitter summary per event type.
+
+    Lateness is the time from an event's scheduled time until the EMOE
+    completed it: the mgen commands of traffic events, the EMANE event
+    publish of emane events and the commands of jamming events. Jitter
+    is the change in lateness between consecutive events of a type.
+    """
+    EVENT_TYPES = (('traffic', 'traffic_complete_time'),
+                   ('emane', 'emane_complete_time'),
+                   ('jamming', 'jamming_complete_time'))
+
+    # histogram bin upper edges in milliseconds, values above the
+    # last edge are counted in a final open bin
+    HISTOGRAM_EDGES_MS = (1, 2, 5, 10, 20, 50, 100, 200, 500, 1000)
+
+    def __init__(self):
+        # (EventTiming, client receive time) in receive order
+        self._records = []
+
+
+    def __len__(self):
+        return len(self._records)
+
+
+    def add(self, timing, receive_time):
+        self._records.append((timing, receive_time))
+
+
+    def lateness(self):
+        """Return {event_type: [seconds]} of the events with a scheduled
+        time, in scheduled order."""
+        scheduled = sorted([(timing.scheduled_time, timing)
+                            for timing,_ in self._records
+                            if timing.scheduled_time is not None],
+                           key=lambda entry: entry[0])
+
+        lateness = {}
+
+        for event_type,field in EventTimingLog.EVENT_TYPES:
+            lateness[event_type] = [getattr(timing, field) - scheduled_time
+                                    for scheduled_time,timing in scheduled
+                                    if getattr(timing, field) is not None]
+
+        return lateness
+
+
+    def jitter(self):
+        """Return {event_type: [seconds]} of the lateness change between
+        consecutive events."""
+        return {event_type:[abs(later - earlier) for earlier,later in zip(values, values[1:])]
+                for event_type,values in self.lateness().items()}
+
+
+    def summary(self):
+        """Return a list of (event_type, metric, count, mean, min, p50,
+        p95, max) in seconds for the lateness and jitter metrics."""
+        rows = []
+
+        for metric,values_by_type in (('lateness', self.lateness()), ('jitter', self.jitter())):
+            for event_type,values in values_by_type.items():
+                if not values:
+                    continue
+
+                values = sorted(values)
+
+                rows.append((event_type,
+                             metric,
+                             len(values),
+                             sum(values) / len(values),
+                             values[0],
+                             self._percentile(values, 50),
+                             self._percentile(values, 95),
+                             values[-1]))
+
+        return rows
+
+
+    def histogram(self):
+        """Return a list of (event_type, metric, bin, count), where bin
+        is the bin upper edge in milliseconds or '>' followed by the
+        last edge for the open bin."""
+        rows = []
+
+        edges = EventTimingLog.HISTOGRAM_EDGES_MS
+
+        for metric,values_by_type in (('lateness', self.lateness()), ('jitter', self.jitter())):
+            for event_type,values in values_by_type.items():
+                if not values:
+                    continue
+
+                counts = [0] * (len(edges) + 1)
+
+                for value in values:
+                    value_ms = value * 1000.0
+
+                    index = next((i for i,edge in enumerate(edges) if value_ms <= edge), len(edges))
+
+                    counts[index] += 1
+
+                labels = [str(edge) for edge in edges] + [f'>{edges[-1]}']
+
+                rows.extend([(event_type, metric, label, count)
+                             for label,count in zip(labels, counts)])
+
+        return rows
+
+
+    def write(self, output_path):
+        """Write event_timing.csv, event_timing_summary.csv and
+        event_timing_histogram.csv to output_path."""
+        with open(os.path.join(output_path, 'event_timing.csv'), 'w') as cfd:
+            writer = csv.writer(cfd)
+
+            writer.writerow(['scheduled_time',
+                             'client_send_time',
+                             'server_receive_time',
+                             'traffic_complete_time',
+                             'emane_complete_time',
+                             'jamming_complete_time',
+                             'client_receive_time'])
+
+            for timing,receive_time in self._records:
+                writer.writerow([self._format_time(value) for value in timing] +
+                                [self._format_time(receive_time)])
+
+        with open(os.path.join(output_path, 'event_timing_summary.csv'), 'w') as cfd:
+            writer = csv.writer(cfd)
+
+            writer.writerow(['event_type', 'metric', 'count',
+                             'mean_ms', 'min_ms', 'p50_ms', 'p95_ms', 'max_ms'])
+
+            for event_type,metric,count,*values in self.summary():
+                writer.writerow([event_type, metric, count] +
+                                [f'{value * 1000.0:.3f}' for value in values])
+
+        with open(os.path.join(output_path, 'event_timing_histogram.csv'), 'w') as cfd:
+            writer = csv.writer(cfd)
+
+            writer.writerow(['event_type', 'metric', 'bin_ms', 'count'])
+
+            writer.writerows(self.histogram())
+
+
+    def _format_time(self, value):
+        return '' if value is None else f'{value:.6f}'
+
+
+    def _percentile(self, sorted_values, percent):
+        # nearest rank
+        rank = max(1, math.ceil(percent / 100.0 * len(sorted_values)))
+
+        return sorted_values[rank - 1]
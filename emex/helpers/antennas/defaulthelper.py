@@ -44,8 +44,7 @@ class DefaultHelper:
         xmlfile = utils.get_emex_data_resource_file_path(f'xml/antennas/{xmlfile}')
 
         # copy the template antenna profile to the configdir
-        profile_file_name = \
-            f'{antennaprofile.name}_north{antennaprofile.north}_east{antennaprofile.east}_up{antennaprofile.up}.xml'
+        profile_file_name = antennaprofile.file_name
         profile_file = os.path.join(configdir, profile_file_name)
 
         shutil.copy2(xmlfile, profile_file)
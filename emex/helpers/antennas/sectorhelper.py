@@ -103,8 +103,7 @@ class SectorHelper:
         antennaprofile_elem_tree.docinfo.system_url = \
             'file:///usr/share/emane/dtd/antennaprofile.dtd'
 
-        profile_file_name = \
-            f'{antennaprofile.name}_north{antennaprofile.north}_east{antennaprofile.east}_up{antennaprofile.up}.xml'
+        profile_file_name = antennaprofile.file_name
         profile_file = os.path.join(configdir, profile_file_name)
         antennaprofile_elem_tree.write(profile_file, pretty_print=True)
 
@@ -35,6 +35,10 @@ from collections import defaultdict
 from emex.confighelper import ConfigHelper
 
 
+# pcis with non-overlapping control channels, one per enb
+PCIS = [8*j+i for i in range(3) for j in range(63)]
+
+
 class LTE(ConfigHelper):
     """
     LTE helper. Enforces:
@@ -48,9 +52,7 @@ class LTE(ConfigHelper):
        * set and insure unique ue imsis.
        * generate epc imsi database
     """
-    def configure(self, platforms):
-        assigned_macids = set([])
-
+    def configure(self, platforms, index=None):
         lte_components = self.get_components(platforms,
                                              ['waveform','host'],
                                              'lte.*')
@@ -86,9 +88,7 @@ class LTE(ConfigHelper):
         for _,group_enbs,_ in grouped_components.values():
             enbs.extend(group_enbs)
 
-        pcis = [8*j+i for i in range(3) for j in range(63)]
-
-        self.assign_unique_param_id(enbs, 'rm', 'pci', id_pool=pcis)
+        self.assign_unique_param_id(enbs, 'rm', 'pci', id_pool=PCIS)
 
 
     def _configure_ues_meta(self, lte_meta_params, grouped_components):
@@ -125,13 +125,13 @@ class LTE(ConfigHelper):
                 raise ValueError(f'LTE group "{label}" must have exactly 1 EPC.')
 
 
-    def check(self, platforms):
+    def check(self, platforms, index=None):
         lte_components = self.get_components(platforms,
                                              ['waveform','host'],
                                              'lte.*')
 
 
-    def get_meta_params(self, emoe_rt):
+    def get_meta_params(self, emoe_rt, index=None):
         platforms = emoe_rt.emoe.platforms
 
         lte_components = self.get_components(platforms,
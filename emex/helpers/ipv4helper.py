@@ -50,7 +50,7 @@ class Ipv4Helper(ConfigHelper):
         self._subnet_start = subnet_start
 
 
-    def configure(self, platforms):
+    def configure(self, platforms, index=None):
         wf_groups = group_components_by_label(platforms, label='net')
 
         # assign ip addresses by wf group
@@ -92,9 +92,7 @@ class Ipv4Helper(ConfigHelper):
                                     self._subnet_format % (subnetid, hostid))
 
 
-    def check(self, platforms):
-        for platform in platforms:
-            for c_name,pg_name,p_name,value in platform.get_params():
-                if pg_name == 'net' and p_name == 'ipv4address':
-                    if not value:
-                        raise ValueError(f'net.ipv4address is not set for {platform.name}.{c.name}')
+    def check(self, platforms, index=None):
+        for plt_name, c, _, param in self.get_index(platforms, index).params('net', 'ipv4address'):
+            if not param.value:
+                raise ValueError(f'net.ipv4address is not set for {plt_name}.{c.name}')
@@ -31,7 +31,8 @@
 # See toplevel COPYING for more information.
 
 from collections import defaultdict
-from emex.confighelper import ConfigHelper
+import itertools
+from emex.confighelper import ConfigHelper,IdPool
 
 
 class NemHelper(ConfigHelper):
@@ -42,45 +43,29 @@ class NemHelper(ConfigHelper):
     It then checks that all NEMs are assigned a unique
     nemid and raises an exception.
     """
-    def configure(self, platforms):
-        assigned_nemids = []
+    def configure(self, platforms, index=None):
+        nemid_params = self.get_index(platforms, index).params_by_name('nemid')
 
-        for platform in platforms:
-            for c, pg, p, v in platform.get_params():
-                if v and p == 'nemid':
-                    assigned_nemids.append(v[0])
+        nemids = IdPool(itertools.count(1),
+                        [entry.param.value[0]
+                         for entry in nemid_params
+                         if entry.param.value])
 
-        assigned_nemids = sorted(set(assigned_nemids))
+        for plt_name, c, pg, param in nemid_params:
+            if param.value:
+                continue
 
-        next_nemid = 1
+            c.set_param(pg, param.name, nemids.next())
 
-        while next_nemid in assigned_nemids:
-            next_nemid += 1
 
-        for platform in platforms:
-            for c, pg, p, v in platform.get_params():
-                if v:
-                    continue
-
-                if p == 'nemid':
-                    platform.set_param(c, pg, p, next_nemid)
-
-                    assigned_nemids.append(next_nemid)
-
-                    while next_nemid in assigned_nemids:
-                        next_nemid += 1
-
-
-    def check(self, platforms):
+    def check(self, platforms, index=None):
         nemids = defaultdict(lambda: [])
 
-        for plt in platforms:
-            for c, pg, p, v in plt.get_params():
-                if p == 'nemid':
-                    if not v:
-                        raise ValueError(f'Platform {plt.name} does not have a nemid assigned')
+        for plt_name, c, pg, param in self.get_index(platforms, index).params_by_name('nemid'):
+            if not param.value:
+                raise ValueError(f'Platform {plt_name} does not have a nemid assigned')
 
-                    nemids[v[0]].append(f'{plt.name}.{c}')
+            nemids[param.value[0]].append(f'{plt_name}.{c.name}')
 
         for nemid, plt_cmps in nemids.items():
             if len(plt_cmps) > 1:
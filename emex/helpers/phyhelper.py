@@ -41,45 +41,48 @@ class PhyHelper(ConfigHelper):
     to correctly set values of fixedantennagainenable
     and fixedantennagain.
     """
-    def configure(self, platforms):
+    def configure(self, platforms, index=None):
         pass
 
 
-    def check(self, platforms):
+    def check(self, platforms, index=None):
         pass
 
 
-    def get_meta_params(self, emoe_rt):
+    def get_meta_params(self, emoe_rt, index=None):
         phy_fixed_gain_settings = {}
 
-        platforms = emoe_rt.emoe.platforms
-
-        for platform in platforms:
-            for c, pg, p, v in platform.get_params():
-                if v and pg == 'phy' and p == 'antenna0':
-                    if v[0].lower().startswith('omni'):
-                        # omni antenna0 parameter value may optionally
-                        # specify a gain as in omni_20.0.
-                        gain = 0.0
-                        antenna0_toks = v[0].split('_')
-
-                        if len(antenna0_toks) > 1:
-                            gain = float(antenna0_toks[1])
-
-                        logging.debug(
-                            f'platform {platform.name} has omni antenna with gain {gain}')
-
-                        phy_fixed_gain_settings[(platform.name, c)] = {
-                            'phy.fixedantennagainenable': 'true',
-                            'phy.fixedantennagain': gain,
-                        }
-                    else:
-                        logging.debug(
-                            f'platform {platform.name} has antenna0 {v[0]}')
-
-                        phy_fixed_gain_settings[(platform.name, c)] = {
-                            'phy.fixedantennagainenable': 'false',
-                            'phy.fixedantennagain': 0.0,
-                        }
+        index = self.get_index(emoe_rt.emoe.platforms, index)
+
+        for plt_name, c, _, param in index.params('phy', 'antenna0'):
+            v = param.value
+
+            if not v:
+                continue
+
+            if v[0].lower().startswith('omni'):
+                # omni antenna0 parameter value may optionally
+                # specify a gain as in omni_20.0.
+                gain = 0.0
+                antenna0_toks = v[0].split('_')
+
+                if len(antenna0_toks) > 1:
+                    gain = float(antenna0_toks[1])
+
+                logging.debug(
+                    f'platform {plt_name} has omni antenna with gain {gain}')
+
+                phy_fixed_gain_settings[(plt_name, c.name)] = {
+                    'phy.fixedantennagainenable': 'true',
+                    'phy.fixedantennagain': gain,
+                }
+            else:
+                logging.debug(
+                    f'platform {plt_name} has antenna0 {v[0]}')
+
+                phy_fixed_gain_settings[(plt_name, c.name)] = {
+                    'phy.fixedantennagainenable': 'false',
+                    'phy.fixedantennagain': 0.0,
+                }
 
         return phy_fixed_gain_settings
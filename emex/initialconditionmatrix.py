@@ -0,0 +1,184 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+import numpy as np
+
+from emex.emaneeventmessages import POV
+
+
+class InitialConditionMatrix:
+    """The POV and pathloss initial conditions of an EMOE held in NumPy
+    arrays indexed by NEM id - one POV row per NEM and a dense
+    (local NEM, remote NEM) pathloss matrix, NaN where unassigned.
+
+    Initial conditions name platforms; each applies to all of the
+    NEM ids the platform maps to in nemids_by_platform.
+    """
+    SPEED_OF_LIGHT = 299792458.0
+
+    # WGS84
+    EARTH_SEMI_MAJOR_AXIS = 6378137.0
+    EARTH_ECCENTRICITY_SQUARED = 6.69437999014e-3
+
+    POV_FIELDS = ('latitude', 'longitude', 'altitude',
+                  'pitch', 'roll', 'yaw',
+                  'azimuth', 'elevation', 'speed')
+
+    def __init__(self, nemids_by_platform, initial_conditions):
+        self._nemids = \
+            np.unique(np.array([int(nemid)
+                                for nemids in nemids_by_platform.values()
+                                for nemid in nemids], dtype=np.int64))
+
+        # NEM id -> row, -1 for unknown NEM ids
+        self._rows = np.full(self._nemids.max()+1 if len(self._nemids) else 1,
+                             -1,
+                             dtype=np.int64)
+
+        self._rows[self._nemids] = np.arange(len(self._nemids))
+
+        self._rows_by_platform = \
+            {name:self._rows[np.array([int(nemid) for nemid in nemids], dtype=np.int64)]
+             for name,nemids in nemids_by_platform.items()}
+
+        # row -> platform number, to tell NEMs of the same platform apart
+        self._platform_of_row = np.full(len(self._nemids), -1, dtype=np.int64)
+
+        for platform_number,rows in enumerate(self._rows_by_platform.values()):
+            self._platform_of_row[rows] = platform_number
+
+        self._povs = np.full((len(self._nemids), len(self.POV_FIELDS)), np.nan)
+
+        self._pathloss = np.full((len(self._nemids), len(self._nemids)), np.nan)
+
+        for ic in initial_conditions:
+            local_rows = self._rows_by_platform.get(ic.platform_name, None)
+
+            if local_rows is None:
+                continue
+
+            if ic.pov:
+                self._povs[local_rows] = [getattr(ic.pov, field) for field in self.POV_FIELDS]
+
+            for pl in ic.pathlosses:
+                remote_rows = self._rows_by_platform.get(pl.remote_platform, None)
+
+                if remote_rows is None:
+                    continue
+
+                self._pathloss[np.ix_(local_rows, remote_rows)] = pl.pathloss
+
+
+    @property
+    def nemids(self):
+        return self._nemids.tolist()
+
+
+    def pathloss(self, nemid, remote_nemid):
+        value = self._pathloss[self._rows[nemid], self._rows[remote_nemid]]
+
+        return None if np.isnan(value) else float(value)
+
+
+    def pathloss_from_povs(self, model, frequency_hz, overwrite=False):
+        """Assign freespace or 2ray pathloss, computed from the POV
+        locations, between every pair of NEMs of different platforms
+        that both have a POV. Pairs with an assigned pathloss are
+        kept unless overwrite is set.
+        """
+        if not model in ('freespace', '2ray'):
+            raise ValueError(f'Unknown pathloss model "{model}".')
+
+        has_pov = ~np.isnan(self._povs[:,0])
+
+        latitude = np.radians(self._povs[:,0])
+        longitude = np.radians(self._povs[:,1])
+        altitude = self._povs[:,2]
+
+        # geodetic to earth centered, earth fixed coordinates
+        n = self.EARTH_SEMI_MAJOR_AXIS / \
+            np.sqrt(1.0 - self.EARTH_ECCENTRICITY_SQUARED * np.sin(latitude)**2)
+
+        ecef = np.stack([(n + altitude) * np.cos(latitude) * np.cos(longitude),
+                         (n + altitude) * np.cos(latitude) * np.sin(longitude),
+                         (n * (1.0 - self.EARTH_ECCENTRICITY_SQUARED) + altitude) * np.sin(latitude)],
+                        axis=1)
+
+        distance = np.sqrt(((ecef[:,np.newaxis,:] - ecef[np.newaxis,:,:])**2).sum(axis=2))
+
+        # clamp to avoid log of zero for co-located NEMs
+        distance = np.maximum(distance, 1.0)
+
+        wavelength = self.SPEED_OF_LIGHT / frequency_hz
+
+        pathloss = 20.0 * np.log10(4.0 * np.pi * distance / wavelength)
+
+        if model == '2ray':
+            # 2ray applies beyond the crossover distance, freespace within
+            height = np.maximum(altitude, 1.0)
+
+            height_product = height[:,np.newaxis] * height[np.newaxis,:]
+
+            crossover = 4.0 * np.pi * height_product / wavelength
+
+            pathloss = np.where(distance > crossover,
+                                40.0 * np.log10(distance) - 20.0 * np.log10(height_product),
+                                pathloss)
+
+        assign = has_pov[:,np.newaxis] & has_pov[np.newaxis,:] & \
+            (self._platform_of_row[:,np.newaxis] != self._platform_of_row[np.newaxis,:])
+
+        if not overwrite:
+            assign &= np.isnan(self._pathloss)
+
+        self._pathloss[assign] = pathloss[assign]
+
+
+    def povs(self):
+        """Yield (nemid, POV) for every NEM with a POV."""
+        for row in np.flatnonzero(~np.isnan(self._povs[:,0])).tolist():
+            pov_dict = dict(zip(self.POV_FIELDS, self._povs[row].tolist()))
+
+            yield int(self._nemids[row]),POV(component_names=[], **pov_dict)
+
+
+    def pathloss_rows(self):
+        """Yield (nemid, remote nemids, pathlosses) for every NEM with
+        at least one assigned pathloss."""
+        assigned = ~np.isnan(self._pathloss)
+
+        for row in np.flatnonzero(assigned.any(axis=1)).tolist():
+            cols = np.flatnonzero(assigned[row])
+
+            yield (int(self._nemids[row]),
+                   self._nemids[cols].tolist(),
+                   self._pathloss[row, cols].tolist())
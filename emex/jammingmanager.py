@@ -30,6 +30,7 @@
 #
 # See toplevel COPYING for more information.
 
+from collections import defaultdict
 import logging
 import shlex
 import subprocess
@@ -43,6 +44,11 @@ class JammingManager:
 
         self._antenna_profileid_map = antenna_profileid_map
 
+        self._components_by_platform = defaultdict(lambda: [])
+
+        for (plt_name,cmp_name),nemid in self._nemid_map.items():
+            self._components_by_platform[plt_name].append((cmp_name, nemid))
+
 
     def send_events(self, events):
         for evt in events:
@@ -59,11 +65,9 @@ class JammingManager:
         # send jamming on to all of them
         all_components = not len(evt.component_names)
 
-        for (plt_name,cmp_name),nemid in self._nemid_map.items():
-            # ignore other platforms
-            if not plt_name == evt.platform_name:
-                continue
+        plt_name = evt.platform_name
 
+        for cmp_name,nemid in self._components_by_platform.get(plt_name, []):
             # ignore components that aren't targetted
             if not all_components and not cmp_name in evt.component_names:
                 continue
@@ -93,11 +97,9 @@ class JammingManager:
         # send jamming off to all of them
         all_components = not len(evt.component_names)
 
-        for (plt_name,cmp_name) in self._nemid_map:
-            # ignore other platforms
-            if not plt_name == evt.platform_name:
-                continue
+        plt_name = evt.platform_name
 
+        for cmp_name,_ in self._components_by_platform.get(plt_name, []):
             # ignore components that aren't targetted
             if not all_components and not cmp_name in evt.component_names:
                 continue
@@ -38,20 +38,28 @@ from collections import defaultdict
 import logging
 from queue import Queue
 import os
-import shutil
+import socket
+from threading import Lock
 
 from emex.builder import Builder
+from emex.buildtimer import BuildMetrics
+from emex.buildworker import BuildWorker,EmoeBuild
 from emex.emoecommand import EmoeCommand
 from emex.emoestate import EmoeState
-from emex.emoeruntime import EmoeRuntime
 from emex.containermanager import ContainerManager
 from emex.resourcetracker import ResourceTracker
 from emex.timestamper import Timestamper
 from emex.emoe import Emoe
+from emex.emoecache import EmoeCache
+from emex.workdircleaner import WorkdirCleaner
 
 
 class Manager:
-    def __init__(self, broker, config, container_worker_connect_endpoint):
+    def __init__(self,
+                 broker,
+                 config,
+                 container_worker_connect_endpoint,
+                 build_worker_connect_endpoint):
         self._broker = broker
 
         self._config = config
@@ -73,10 +81,56 @@ class Manager:
 
         self._emoes_by_emoe_id = {}
 
+        # emoes in the BUILDING phase, or that failed it
+        self._builds_by_emoe_id = {}
+
+        # built emoes waiting, in build order, for enough free cpus
+        self._waiting_builds_by_emoe_id = {}
+
         os.makedirs(Timestamper.EMEX_WORKDIR, exist_ok=True)
 
         self._timestamper = Timestamper()
 
+        self._cleaner = WorkdirCleaner(config)
+        self._cleaner.setName('thread_cleaner')
+        self._cleaner.setDaemon(True)
+        self._cleaner.start()
+
+        self._build_metrics = BuildMetrics()
+
+        # validated emoes shared by check and start requests
+        self._emoe_cache = EmoeCache()
+
+        self._build_in_q = Queue()
+
+        self._build_out_q = Queue()
+
+        build_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        logging.info(f'Connecting build worker socket to {build_worker_connect_endpoint}')
+
+        build_socket.connect(build_worker_connect_endpoint)
+
+        socket_lock = Lock()
+
+        self._build_threads = []
+
+        for i in range(config.num_build_workers):
+            thread = \
+                BuildWorker(config,
+                            self.unpack_emoe,
+                            self._builder,
+                            self._build_metrics,
+                            self._build_in_q,
+                            self._build_out_q,
+                            build_socket,
+                            socket_lock)
+
+            thread.setName(f'thread_builder{i}')
+            thread.setDaemon(True)
+            thread.start()
+            self._build_threads.append(thread)
+
 
     @property
     def total_cpus(self):
@@ -85,7 +139,18 @@ class Manager:
 
     @property
     def available_cpus(self):
-        return self._cpum.num_available
+        """CPUs free for new EMOEs, less those needed by EMOEs that
+        are built or unpacked but not yet started."""
+        reserved = sum([build.cpus
+                        for build in self._builds_by_emoe_id.values()
+                        if build.state == EmoeState.QUEUED and not build.cancelled])
+
+        return max(self._cpum.num_available - reserved, 0)
+
+
+    @property
+    def build_metrics(self):
+        return self._build_metrics
 
 
     def reset(self):
@@ -107,25 +172,66 @@ class Manager:
 
 
     def reset_client(self, client_id):
-        for emoe_rt in self._emoes_by_client_id[client_id]:
+        # stop builds first so the cpus freed below do not start them
+        for build in self.emoe_builds_by_client_id(client_id):
+            self.stop_emoe(client_id, build.emoe_id)
+
+        for emoe_rt in list(self._emoes_by_client_id[client_id]):
             self.stop_emoe(client_id, emoe_rt.emoe_id)
 
+        self.clear_failed_builds(client_id)
+
 
     def get_models(self):
         return self._builder.platformtypes,self._builder.antennatypes
 
 
-    def check_emoe(self, emoe):
-        emoe_names = [emoe_rt.emoe.name
-                      for emoe_rts in self._emoes_by_client_id.values()
-                      for emoe_rt in emoe_rts]
+    def unpack_emoe(self, emoe_proto):
+        """
+        Unpack and validate emoe_proto, reusing the Emoe from an
+        earlier check or start of the same scenario when it is still
+        cached.
+        """
+        digest = EmoeCache.digest(emoe_proto)
+
+        emoe = self._emoe_cache.get(digest, emoe_proto.name)
+
+        if emoe:
+            return emoe
 
-        if emoe.name in emoe_names:
+        platformtypes,antennatypes = self.get_models()
+
+        # this implicitly checks that
+        # all platforms have an ok number of waveforms
+        # all waveform parameters have an assigned value
+        emoe = Emoe.from_protobuf(emoe_proto,
+                                  antennatypes,
+                                  platformtypes)
+
+        self._emoe_cache.put(digest, emoe)
+
+        return emoe
+
+
+    def _emoe_names(self):
+        emoe_names = set([emoe_rt.emoe.name
+                          for emoe_rts in self._emoes_by_client_id.values()
+                          for emoe_rt in emoe_rts])
+
+        emoe_names.update([build.emoe_name
+                           for build in self._builds_by_emoe_id.values()
+                           if not build.state == EmoeState.FAILED])
+
+        return emoe_names
+
+
+    def check_emoe(self, emoe):
+        if emoe.name in self._emoe_names():
             return False,f'EMOE name "{emoe.name}" already exists.'
 
         requested = emoe.cpus
 
-        available = self._cpum.num_available
+        available = self.available_cpus
 
         return requested <= available,f'requested cpus {requested} available cpus {available}'
 
@@ -134,47 +240,129 @@ class Manager:
         return self._emoes_by_client_id.get(client_id, [])
 
 
-    def start_emoe(self,
-                   client_id,
-                   emoe,
-                   container_listen_address,
-                   container_listen_port):
-        ok,message = self.check_emoe(emoe)
+    def emoe_builds_by_client_id(self, client_id):
+        return [build for build in self._builds_by_emoe_id.values()
+                if build.client_id == client_id]
+
+
+    def clear_failed_builds(self, client_id):
+        """Forget the client's failed builds once they have been reported."""
+        for build in self.emoe_builds_by_client_id(client_id):
+            if build.state == EmoeState.FAILED:
+                self._builds_by_emoe_id.pop(build.emoe_id)
+
+
+    def queue_emoe(self, client_id, emoe_proto):
+        """Queue an EMOE for the BUILDING phase and return its handle.
+
+        The EMOE is unpacked, checked and its configuration built by
+        the build workers. Once the build succeeds the EMOE stays
+        QUEUED until enough CPUs are free, then CPUs are allocated
+        and the container started.
+        """
+        if emoe_proto.name in self._emoe_names():
+            return False,f'EMOE name "{emoe_proto.name}" already exists.',None
+
+        build = EmoeBuild(self._timestamper.next_timestamp,
+                          client_id,
+                          emoe_proto.name)
+
+        self._builds_by_emoe_id[build.emoe_id] = build
+
+        self._build_in_q.put((build, emoe_proto))
+
+        return True,'queued',build.emoe_id
+
+
+    def handle_build_worker_event(self, data):
+        ret = str(data, 'utf-8')
+        logging.info(f'handle_build_worker_event {ret}')
+
+        while not self._build_out_q.empty():
+            ok,message,build,emoe_rt = self._build_out_q.get()
 
-        if not ok:
-            return False,message,None
+            workdir = emoe_rt.workdir if emoe_rt else None
 
-        num_cpus_requested = emoe.cpus
+            if build.cancelled:
+                logging.info(f'discarding build of stopped emoe "{build.emoe_name}"')
 
-        cpus = self._cpum.allocate(num_cpus_requested)
+                # the client was told STOPPING when the build was cancelled
+                build.state = EmoeState.STOPPED
 
-        emoe_rt = EmoeRuntime(self._timestamper.next_timestamp,
-                              client_id,
-                              emoe,
-                              cpus,
-                              self._config)
+                self._broker.send_build_state_message_to_client(build, 'stopped during build')
 
-        ok = False
-        message = ''
+                self._builds_by_emoe_id.pop(build.emoe_id)
 
-        try:
-            self._builder.build_config(emoe_rt, self._config)
+                self._clean_up_workdir(workdir, False)
 
-            ok,message = \
-                self._cm.start(emoe_rt,
-                               container_listen_address,
-                               container_listen_port)
+                continue
+
+            if ok and build.cpus > self.total_cpus:
+                ok = False
+
+                message = f'requested cpus {build.cpus} total cpus {self.total_cpus}'
+
+            if ok:
+                self._waiting_builds_by_emoe_id[build.emoe_id] = emoe_rt
+
+                continue
+
+            self._fail_build(build, workdir, message)
+
+        self._start_waiting_emoes()
+
+
+    def _start_waiting_emoes(self):
+        """Start built EMOEs, in build order, while there are enough
+        free CPUs for the next one."""
+        for emoe_id,emoe_rt in list(self._waiting_builds_by_emoe_id.items()):
+            if emoe_rt.emoe.cpus > self._cpum.num_available:
+                # later emoes wait their turn so larger ones are not starved
+                break
+
+            self._waiting_builds_by_emoe_id.pop(emoe_id)
+
+            build = self._builds_by_emoe_id[emoe_id]
+
+            ok,message = self._start_built_emoe(emoe_rt)
 
             if ok:
-                self._emoes_by_client_id[emoe_rt.client_id].append(emoe_rt)
+                self._builds_by_emoe_id.pop(emoe_id)
+
+                continue
+
+            self._fail_build(build, emoe_rt.workdir, message)
+
+
+    def _fail_build(self, build, workdir, message):
+        logging.error(f'emoe "{build.emoe_name}" failed to start: {message}')
+
+        # keep the failed build until it is reported to the client
+        build.state = EmoeState.FAILED
+
+        self._broker.send_build_state_message_to_client(build, message)
+
+        self._clean_up_workdir(workdir, False)
+
+
+    def _start_built_emoe(self, emoe_rt):
+        cpus = self._cpum.allocate(emoe_rt.emoe.cpus)
+
+        emoe_rt.cpus = cpus
 
-                self._emoes_by_emoe_id[emoe_rt.emoe_id] = emoe_rt
+        ok,message = \
+            self._cm.start(emoe_rt,
+                           self._config.container_listen_address,
+                           self._config.container_listen_port)
 
-        finally:
-            if not ok:
-                self._cpum.deallocate(cpus)
+        if ok:
+            self._emoes_by_client_id[emoe_rt.client_id].append(emoe_rt)
 
-        return ok,message,emoe_rt
+            self._emoes_by_emoe_id[emoe_rt.emoe_id] = emoe_rt
+        else:
+            self._cpum.deallocate(cpus)
+
+        return ok,message
 
 
     def register_started_container(self, emoe_rt, container):
@@ -200,6 +388,41 @@ class Manager:
 
 
     def stop_emoe(self, client_id, emoe_id):
+        build = self._builds_by_emoe_id.get(emoe_id, None)
+
+        if build:
+            if not build.state == EmoeState.QUEUED:
+                return False,f'emoe "{build.emoe_name}" is {build.state.name}',build.emoe_name
+
+            emoe_rt = self._waiting_builds_by_emoe_id.pop(emoe_id, None)
+
+            if emoe_rt:
+                logging.info(f'Manager.stop_emoe drop built emoe_id={emoe_id} '
+                             f'emoe_name={build.emoe_name} waiting for cpus')
+
+                build.state = EmoeState.STOPPED
+
+                self._broker.send_build_state_message_to_client(build, 'stopped while waiting for cpus')
+
+                self._builds_by_emoe_id.pop(emoe_id)
+
+                self._clean_up_workdir(emoe_rt.workdir, False)
+
+                # emoes queued behind this one may now fit
+                self._start_waiting_emoes()
+
+                return True,f'stopped emoe "{build.emoe_name}".',build.emoe_name
+
+            logging.info(f'Manager.stop_emoe cancel build for emoe_id={emoe_id} '
+                         f'emoe_name={build.emoe_name}')
+
+            # the build worker result is discarded when it arrives
+            build.cancel()
+
+            build.state = EmoeState.STOPPING
+
+            return True,f'stopping emoe "{build.emoe_name}".',build.emoe_name
+
         emoe_rt = self._emoes_by_emoe_id.get(emoe_id, None)
 
         if not emoe_rt:
@@ -213,7 +436,7 @@ class Manager:
             logging.info(f'Ignore request to stop emoe_id={emoe_id} '
                          f'emoe_name={emoe_rt.emoe.name} already stopped')
 
-            return
+            return True,f'emoe "{emoe_rt.emoe.name}" already stopping.',emoe_rt.emoe.name
 
         emoe_rt.state = EmoeState.STOPPING
         emoe_rt.stop_count = 2
@@ -225,6 +448,8 @@ class Manager:
         # stop the emoe
         self._send_container_control_message(emoe_rt, EmoeCommand.STOP)
 
+        self._start_waiting_emoes()
+
         return True,f'stopping emoe "{emoe_rt.emoe.name}".',emoe_rt.emoe.name
 
 
@@ -287,12 +512,7 @@ class Manager:
 
             self._cm.stop_and_remove(emoe_rt.container)
 
-            # delete directory according to emexdirectory_action configuration itme
-            if self._config.emexdirectory_action == 'delete' or \
-               self._config.emexdirectory_action == 'deleteonsuccess' and emoe_rt.did_run:
-                logging.info(f'emexdirectory action: '
-                             f'{self._config.emexdirectory_action} {emoe_rt.workdir}')
-                shutil.rmtree(emoe_rt.workdir)
+            self._clean_up_workdir(emoe_rt.workdir, emoe_rt.did_run)
 
             # delete
             self._delete_emoe_rt(emoe_rt)
@@ -301,6 +521,25 @@ class Manager:
             logging.debug(f'on state message from {emoe_rt.emoe.name}, no action')
 
 
+    def _clean_up_workdir(self, workdir, did_run):
+        if not workdir or not os.path.isdir(workdir):
+            return
+
+        # delete or archive the directory according to emexdirectory_action
+        # configuration item. the work is queued to the cleaner thread so
+        # large directories do not stall the event loop
+        if self._config.emexdirectory_action == 'delete' or \
+           self._config.emexdirectory_action == 'deleteonsuccess' and did_run:
+            logging.info(f'emexdirectory action: '
+                         f'{self._config.emexdirectory_action} {workdir}')
+            self._cleaner.delete(workdir)
+
+        elif self._config.emexdirectory_action == 'archive':
+            logging.info(f'emexdirectory action: '
+                         f'{self._config.emexdirectory_action} {workdir}')
+            self._cleaner.archive(workdir)
+
+
     def _delete_emoe_rt(self, emoe_rt):
         self._emoes_by_emoe_id.pop(emoe_rt.emoe_id)
 
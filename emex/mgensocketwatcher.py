@@ -0,0 +1,202 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+
+import ctypes
+import ctypes.util
+import logging
+import os
+import select
+import struct
+from threading import Thread
+
+
+# inotify(7) constants
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_CLOEXEC = 0o2000000
+
+# struct inotify_event { int wd; uint32_t mask, cookie, len; char name[]; }
+INOTIFY_EVENT_FORMAT = 'iIII'
+INOTIFY_EVENT_SIZE = struct.calcsize(INOTIFY_EVENT_FORMAT)
+
+
+def _inotify_watch(directory):
+    """Return an inotify file descriptor that reports files created in
+    directory. Raises OSError when inotify is not available."""
+    libc_name = ctypes.util.find_library('c')
+
+    if not libc_name:
+        raise OSError('unable to find libc for inotify')
+
+    libc = ctypes.CDLL(libc_name, use_errno=True)
+
+    fd = libc.inotify_init1(IN_CLOEXEC)
+
+    if fd < 0:
+        errno = ctypes.get_errno()
+
+        raise OSError(errno, f'inotify_init1 failed: {os.strerror(errno)}')
+
+    if libc.inotify_add_watch(fd, os.fsencode(directory), IN_CREATE | IN_MOVED_TO) < 0:
+        errno = ctypes.get_errno()
+
+        os.close(fd)
+
+        raise OSError(errno, f'inotify_add_watch {directory} failed: {os.strerror(errno)}')
+
+    return fd
+
+
+class MgenSocketWatcher(Thread):
+    """Report the mgen remote control sockets as they are created.
+
+    The ETCE traffic step starts an mgen instance per platform, each
+    binding a unix socket named /tmp/mgen-HOSTNAME. This thread
+    watches the socket directory with inotify, or by polling the
+    directory every poll_interval seconds where inotify is not
+    available, and writes the name of each new socket, newline
+    terminated, over worker_socket so that the emexcontainerd event
+    loop can connect as soon as the sockets exist. Sockets that are
+    already present when the thread starts are reported first.
+
+    The thread owns the read end of the stop pipe and closes it when
+    it exits, stop owns the write end, so neither closes a descriptor
+    the other may still use.
+    """
+    def __init__(self,
+                 worker_socket,
+                 directory='/tmp',
+                 prefix='mgen-',
+                 poll_interval=0.25):
+        super().__init__()
+        self.daemon = True
+        self._worker_socket = worker_socket
+        self._directory = directory
+        self._prefix = prefix
+        self._poll_interval = poll_interval
+        self._stop_read,self._stop_write = os.pipe()
+        self._reported = set()
+
+
+    def stop(self):
+        if self._stop_write is None:
+            return
+
+        try:
+            os.write(self._stop_write, b'x')
+        except OSError as e:
+            # the thread already exited and closed the read end
+            logging.debug(f'mgen socket watcher already stopped: {e}')
+
+        os.close(self._stop_write)
+
+        self._stop_write = None
+
+
+    def run(self):
+        try:
+            try:
+                fd = _inotify_watch(self._directory)
+            except OSError as e:
+                logging.warning(f'{e}, polling {self._directory} for mgen sockets')
+
+                fd = None
+
+            # report what exists after the watch is in place, so that
+            # no socket is missed
+            self._report(os.listdir(self._directory))
+
+            if fd is None:
+                self._poll()
+            else:
+                self._watch(fd)
+
+        except OSError as e:
+            logging.error(f'mgen socket watcher stopped: {e}')
+
+        finally:
+            self._worker_socket.close()
+
+            os.close(self._stop_read)
+
+
+    def _watch(self, fd):
+        try:
+            while True:
+                readable,_,_ = select.select([fd, self._stop_read], [], [])
+
+                if self._stop_read in readable:
+                    return
+
+                data = os.read(fd, 65536)
+
+                names = []
+
+                offset = 0
+
+                while offset + INOTIFY_EVENT_SIZE <= len(data):
+                    _,_,_,length = struct.unpack_from(INOTIFY_EVENT_FORMAT, data, offset)
+
+                    offset += INOTIFY_EVENT_SIZE
+
+                    names.append(os.fsdecode(data[offset:offset+length].rstrip(b'\0')))
+
+                    offset += length
+
+                self._report(names)
+
+        finally:
+            os.close(fd)
+
+
+    def _poll(self):
+        while True:
+            readable,_,_ = select.select([self._stop_read], [], [], self._poll_interval)
+
+            if readable:
+                return
+
+            self._report(os.listdir(self._directory))
+
+
+    def _report(self, names):
+        new_names = [name for name in names
+                     if name.startswith(self._prefix) and not name in self._reported]
+
+        if not new_names:
+            return
+
+        self._reported.update(new_names)
+
+        self._worker_socket.sendall(
+            ''.join([f'{name}\n' for name in new_names]).encode())
@@ -0,0 +1,168 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+import hashlib
+import logging
+import os
+import pickle
+import sys
+import tempfile
+
+
+# increment when the layout of the snapshot changes
+SNAPSHOT_VERSION = 1
+
+# modules defining the classes pickled in the snapshot, a change
+# to any of them invalidates it
+MODEL_MODULES = [
+    'antennatype',
+    'componenttype',
+    'paramgrouptype',
+    'paramtype',
+    'platformtemplate',
+    'platformtype',
+    'types',
+    'waveformtype',
+]
+
+
+def model_files(model_paths):
+    """
+    Return the sorted .yml/.yaml files found in the model_paths trees.
+    """
+    yml_files = []
+
+    for model_path in model_paths:
+        for dirname, _, filenames in os.walk(model_path):
+            yml_files.extend([os.path.join(dirname, f) for f in filenames
+                              if f.split('.')[-1].lower() in ['yml', 'yaml']])
+
+    return sorted(yml_files)
+
+
+def source_signature(yml_files):
+    """
+    The snapshot version, python version and the (path, mtime, size)
+    of every model source file. A snapshot is only used when its
+    signature matches the current one.
+    """
+    moduledir = os.path.dirname(os.path.abspath(__file__))
+
+    source_files = yml_files + [os.path.join(moduledir, f'{module}.py')
+                                for module in MODEL_MODULES]
+
+    files = []
+
+    for source_file in source_files:
+        st = os.stat(source_file)
+
+        files.append((os.path.abspath(source_file), st.st_mtime_ns, st.st_size))
+
+    return (SNAPSHOT_VERSION, sys.version_info[:2], tuple(files))
+
+
+def default_snapshot_path(model_paths):
+    """
+    The EMEX_MODEL_SNAPSHOT environment variable, if set, otherwise a
+    file in the user cache directory specific to the model_paths.
+    """
+    snapshot_path = os.environ.get('EMEX_MODEL_SNAPSHOT')
+
+    if snapshot_path:
+        return snapshot_path
+
+    key = hashlib.sha256(
+        '\0'.join([os.path.abspath(p) for p in model_paths]).encode()).hexdigest()[:16]
+
+    cachedir = os.environ.get('XDG_CACHE_HOME', os.path.expanduser('~/.cache'))
+
+    return os.path.join(cachedir, 'emex', f'models-{key}.pickle')
+
+
+def load_snapshot(snapshot_path, signature):
+    """
+    Return the models dictionary stored in snapshot_path, or None
+    if there is no snapshot or it does not match signature.
+    """
+    if not os.path.isfile(snapshot_path):
+        return None
+
+    try:
+        with open(snapshot_path, 'rb') as sfd:
+            snapshot = pickle.load(sfd)
+    except Exception as e:
+        logging.warning(f'ignoring unreadable model snapshot "{snapshot_path}": {e}')
+
+        return None
+
+    if not isinstance(snapshot, dict) or not snapshot.get('signature') == signature:
+        logging.info(f'model snapshot "{snapshot_path}" is stale')
+
+        return None
+
+    logging.info(f'loaded model snapshot "{snapshot_path}"')
+
+    return snapshot['models']
+
+
+def write_snapshot(snapshot_path, signature, models):
+    """
+    Atomically write models to snapshot_path. Return True on success.
+    """
+    snapshotdir = os.path.dirname(snapshot_path)
+
+    try:
+        os.makedirs(snapshotdir, exist_ok=True)
+
+        fd,tmp_path = tempfile.mkstemp(dir=snapshotdir, suffix='.tmp')
+
+        try:
+            with os.fdopen(fd, 'wb') as sfd:
+                pickle.dump({'signature': signature, 'models': models},
+                            sfd,
+                            protocol=pickle.HIGHEST_PROTOCOL)
+
+            os.chmod(tmp_path, 0o644)
+
+            os.replace(tmp_path, snapshot_path)
+        except:
+            os.unlink(tmp_path)
+
+            raise
+    except Exception as e:
+        logging.info(f'unable to write model snapshot "{snapshot_path}": {e}')
+
+        return False
+
+    logging.info(f'wrote model snapshot "{snapshot_path}"')
+
+    return True
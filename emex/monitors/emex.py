@@ -75,25 +75,19 @@ class Emex:
 
         ip_address_elem = etree.SubElement(root_elem, 'ip-address')
 
-        for platform in self._emoe.platforms:
-            for c_name,pg_name,p_name,value in platform.get_params():
-                hostname = f'{platform.name}-{c_name}'
+        for (plt_name,c_name),nemid in self._emoe.nemid_map.items():
+            map_elem = etree.SubElement(nem_elem, 'map')
 
-                pg_p_name = f'{pg_name}.{p_name}'
+            map_elem.set('tag', f'{plt_name}-{c_name}')
 
-                if pg_p_name == 'emane.nemid':
-                    map_elem = etree.SubElement(nem_elem, 'map')
+            map_elem.set('nem', str(nemid))
 
-                    map_elem.set('tag', hostname)
+        for (plt_name,c_name),ipv4address in self._emoe.ipv4address_map.items():
+            map_elem = etree.SubElement(ip_address_elem, 'map')
 
-                    map_elem.set('nem', str(value[0]))
+            map_elem.set('tag', f'{plt_name}-{c_name}')
 
-                elif pg_p_name == 'net.ipv4address':
-                    map_elem = etree.SubElement(ip_address_elem, 'map')
-
-                    map_elem.set('tag', hostname)
-
-                    map_elem.set('ip-address', value[0])
+            map_elem.set('ip-address', ipv4address)
 
         # write file
         root_tree = root_elem.getroottree()
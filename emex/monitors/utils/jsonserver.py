@@ -38,7 +38,7 @@ import socket
 import threading
 
 from queue import Queue
-from emex.utils import sock_send_string
+from emex.transport import send_frame
 
 
 eventstrs = {
@@ -60,6 +60,9 @@ eventstrs = {
 
 
 class JsonServer:
+    # seconds to wait on a client that is not reading before it is dropped
+    SEND_TIMEOUT = 10.0
+
     def __init__(self, client_endpoint, verbose, orientation):
         client_address,client_port = client_endpoint.split(':')
         self._client_endpoint = (client_address, int(client_port))
@@ -182,10 +185,18 @@ class JsonServer:
                         while not self._q.empty():
                             timestamp,dfs = self._q.get()
                             df_json_bytestr = self.dfs_to_json_bytestr(dfs)
-                            for _,conn in self._connections.items():
+                            closed = []
+                            for fileno,conn in self._connections.items():
                                 logging.debug(f'send ts={timestamp} len={len(df_json_bytestr)} '
                                               f'type={type(df_json_bytestr)}')
-                                sock_send_string(conn, df_json_bytestr)
+                                try:
+                                    send_frame(conn, df_json_bytestr, timeout=self.SEND_TIMEOUT)
+                                except OSError as e:
+                                    logging.info(f'dropping {self._socket_names.get(fileno, fileno)}: {e}')
+                                    closed.append(fileno)
+                            for fileno in closed:
+                                self._epoll.unregister(fileno)
+                                self._connections.pop(fileno).close()
 
                     elif event & select.EPOLLHUP:
                         logging.info(f'EPOLLHUP {fileno}')
@@ -30,10 +30,16 @@
 #
 # See toplevel COPYING for more information.
 
+import sys
+
 from emex.utils import configstrtoval
 
 
 class Param:
+    # there is one Param per parameter of every component of
+    # every platform, keep them small
+    __slots__ = ('_name', '_value')
+
     @staticmethod
     def configdict_from_protobuf(param_proto):
         param_dict = {
@@ -49,20 +55,23 @@ class Param:
         if '.' in name:
             raise ValueError(f'Illegal character "." in {name}. Quitting.')
 
-        self._name = name
+        self._name = sys.intern(name)
 
         self._value = self._convert(value)
 
 
     def _convert(self, value):
         """
-        Make sure value is a list and of the narrowest type of float,
-        int, bool or string.
+        Make sure value is a tuple and of the narrowest type of float,
+        int, bool or string. Tuples are already converted (they are
+        ParamType defaults) and are shared rather than copied.
         """
-        if not isinstance(value, list):
-            return [configstrtoval(value)]
+        if isinstance(value, tuple):
+            return value
+        elif not isinstance(value, list):
+            return (configstrtoval(value),)
         else:
-            return list(map(configstrtoval, value))
+            return tuple(map(configstrtoval, value))
 
 
     @property
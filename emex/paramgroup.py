@@ -30,7 +30,8 @@
 #
 # See toplevel COPYING for more information.
 
-import copy
+import sys
+
 from emex.param import Param
 
 
@@ -48,6 +49,8 @@ class ParamGroup:
       repeated ParamValue params = 2;
     }
     """
+    __slots__ = ('_group', '_params')
+
     @staticmethod
     def configdict_from_protobuf(paramgroup_proto):
         param_dict = { paramgroup_proto.group: {} }
@@ -59,7 +62,7 @@ class ParamGroup:
 
 
     def __init__(self, group, paramgroup_dict):
-        self._group = group
+        self._group = sys.intern(group)
 
         self._params = {name: Param(name, value)
                         for name, value in paramgroup_dict.items()}
@@ -72,7 +75,7 @@ class ParamGroup:
 
     @property
     def params(self):
-        return copy.deepcopy(self._params)
+        return dict(self._params)
 
 
     @property
@@ -120,10 +123,25 @@ class ParamGroup:
         param.set_param(value_list)
 
 
-    def to_protobuf(self, paramgroup_proto):
+    def changed_params(self, baseline):
+        """
+        The params whose values differ from those of baseline,
+        a group of the same type.
+        """
+        return [p for p in self._params.values()
+                if not baseline.has_param(p.name) or
+                not p.value == baseline.get_param(p.name).value]
+
+
+    def to_protobuf(self, paramgroup_proto, baseline=None):
         paramgroup_proto.group = self.group
 
-        for param in self._params.values():
+        params = self._params.values()
+
+        if baseline:
+            params = self.changed_params(baseline)
+
+        for param in params:
             param_proto = paramgroup_proto.params.add()
 
             param.to_protobuf(param_proto)
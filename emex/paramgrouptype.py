@@ -30,7 +30,6 @@
 #
 # See toplevel COPYING for more information.
 
-import copy
 from emex.paramtype import ParamType
 
 
@@ -62,7 +61,7 @@ class ParamGroupType:
 
     @property
     def paramtypes(self):
-        return copy.copy(self._paramtypes)
+        return dict(self._paramtypes)
 
 
     @property
@@ -74,7 +73,7 @@ class ParamGroupType:
     def to_protobuf(self, paramgrouptype_proto):
         paramgrouptype_proto.name = self.group
 
-        for _, paramtype in self.paramtypes.items():
+        for paramtype in self._paramtypes.values():
             paramtype_proto = paramgrouptype_proto.param_types.add()
 
             paramtype.to_protobuf(paramtype_proto)
@@ -61,13 +61,15 @@ class ParamType:
             self._type_dict['description'] = ''
 
         if not 'default' in self._type_dict:
-            self._type_dict['default'] = []
+            self._type_dict['default'] = ()
         else:
-            if not isinstance(self._type_dict['default'], list):
+            if not isinstance(self._type_dict['default'], (list, tuple)):
                 self._type_dict['default'] = [self._type_dict['default']]
 
+        # defaults are immutable so that every Param created from
+        # this type can share them until the user overrides the value
         self._type_dict['default'] = \
-            list(map(configstrtoval, self._type_dict['default']))
+            tuple(map(configstrtoval, self._type_dict['default']))
 
 
     @property
@@ -31,7 +31,6 @@
 # See toplevel COPYING for more information.
 
 from collections import defaultdict
-import copy
 from fractions import Fraction
 import logging
 
@@ -46,15 +45,28 @@ class Platform:
         if not platformtype:
             raise ValueError(f'"{platform_proto.platformtype}" not recognized. Ignoring.')
 
+        user_config,labels = Platform.config_from_protobuf(platform_proto.components)
+
+        return Platform(platform_proto.name, platformtype, user_config, labels)
+
+
+    @staticmethod
+    def config_from_protobuf(component_protos):
+        """
+        Return the user_config and labels dictionaries of the
+        Emoe.Component messages component_protos. Components
+        and parameters that are not listed take their
+        platformtype default values.
+        """
         user_config = {}
 
-        labels = defaultdict(lambda: [])
+        labels = {}
 
-        for component_proto in platform_proto.components:
+        for component_proto in component_protos:
             user_config[component_proto.name] = {}
 
-            for label in component_proto.labels:
-                labels[component_proto.name].append(label)
+            if component_proto.labels:
+                labels[component_proto.name] = list(component_proto.labels)
 
             for param_group_proto in component_proto.param_groups:
                 group_params = {}
@@ -69,7 +81,7 @@ class Platform:
                 user_config[component_proto.name][param_group_proto.group] = \
                     group_params
 
-        return Platform(platform_proto.name, platformtype, user_config, labels)
+        return user_config,labels
 
 
     def __init__(self, name, platformtype, user_config={}, labels={}):
@@ -97,7 +109,7 @@ class Platform:
 
     @property
     def platformtype(self):
-        return copy.deepcopy(self._platformtype)
+        return self._platformtype
 
 
     @property
@@ -154,7 +166,7 @@ class Platform:
 
 
     def has_component(self, name):
-        return name in [c.name for c in self._components.values()]
+        return name in self._components
 
 
     @property
@@ -222,15 +234,34 @@ class Platform:
         return template.component_descriptor(component_name)
 
 
-    def to_protobuf(self, platform_proto):
+    def to_protobuf(self, platform_proto, baseline=None):
+        """
+        Write the platform to platform_proto. When baseline, a platform
+        of the same platformtype, is passed only the components and
+        parameters whose values differ from it are written.
+        """
         platform_proto.name = self._name
 
         platform_proto.platformtype = self.platformtype.name
 
+        self.components_to_protobuf(platform_proto.components, baseline)
+
+
+    def components_to_protobuf(self, component_protos, baseline=None):
+        """
+        Add the platform components to the repeated Emoe.Component
+        field component_protos, sparsely relative to baseline if passed.
+        """
         for component in self._components.values():
-            component_proto = platform_proto.components.add()
+            baseline_component = None
+
+            if baseline:
+                baseline_component = baseline.component_by_name(component.name)
+
+                if not component.differs_from(baseline_component):
+                    continue
 
-            component.to_protobuf(component_proto)
+            component.to_protobuf(component_protos.add(), baseline_component)
 
 
     def __str__(self):
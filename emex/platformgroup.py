@@ -0,0 +1,192 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+from emex.platform import Platform
+
+
+class PlatformGroup:
+    """
+    count platforms of one platformtype that share a user
+    configuration, named by formatting name_format with each
+    index from first_index, as in name_format "rfpipe-{index:03d}".
+    Individual platforms may override the shared configuration with
+    instance_configs, a dictionary of platform name to a
+    (user_config, labels) tuple.
+
+    Clients send a group in place of its platforms and emexd
+    expands it.
+    """
+    @staticmethod
+    def from_protobuf(group_proto, platformtypes):
+        platformtype = platformtypes.get(group_proto.platformtype, None)
+
+        if not platformtype:
+            raise ValueError(f'"{group_proto.platformtype}" not recognized. Ignoring.')
+
+        user_config,labels = Platform.config_from_protobuf(group_proto.components)
+
+        instance_configs = {
+            platform_proto.name: Platform.config_from_protobuf(platform_proto.components)
+            for platform_proto in group_proto.instances
+        }
+
+        return PlatformGroup(group_proto.name_format,
+                             platformtype,
+                             group_proto.count,
+                             user_config,
+                             labels,
+                             group_proto.first_index,
+                             instance_configs)
+
+
+    def __init__(self,
+                 name_format,
+                 platformtype,
+                 count,
+                 user_config={},
+                 labels={},
+                 first_index=1,
+                 instance_configs={}):
+        if not '{index' in name_format:
+            raise ValueError(f'Platform group name format "{name_format}" '
+                             f'does not contain an "{{index}}" field.')
+
+        self._name_format = name_format
+
+        self._platformtype = platformtype
+
+        self._user_config = user_config
+
+        self._labels = labels
+
+        self._first_index = first_index
+
+        self._platform_names = [name_format.format(index=index)
+                                for index in range(first_index, first_index + count)]
+
+        if not len(set(self._platform_names)) == count:
+            raise ValueError(f'Platform group name format "{name_format}" '
+                             f'does not generate unique platform names.')
+
+        unknown_names = set(instance_configs).difference(self._platform_names)
+
+        if unknown_names:
+            raise ValueError(f'Platform group "{name_format}" has overrides '
+                             f'for unknown platforms {", ".join(sorted(unknown_names))}.')
+
+        self._instance_configs = instance_configs
+
+
+    @property
+    def name_format(self):
+        return self._name_format
+
+
+    @property
+    def platformtype(self):
+        return self._platformtype
+
+
+    @property
+    def count(self):
+        return len(self._platform_names)
+
+
+    @property
+    def first_index(self):
+        return self._first_index
+
+
+    @property
+    def platform_names(self):
+        return self._platform_names
+
+
+    def platforms(self):
+        """
+        Expand the group to one Platform per name. Instance overrides
+        are applied per parameter over the shared configuration,
+        instance labels replace the shared labels of a component.
+        """
+        platforms = []
+
+        for name in self._platform_names:
+            instance_config,instance_labels = self._instance_configs.get(name, ({}, {}))
+
+            user_config = {}
+
+            for c_name in set(self._user_config).union(instance_config):
+                user_config[c_name] = {}
+
+                for config in (self._user_config, instance_config):
+                    for pg_name,params in config.get(c_name, {}).items():
+                        user_config[c_name].setdefault(pg_name, {}).update(params)
+
+            labels = dict(self._labels)
+
+            labels.update(instance_labels)
+
+            platforms.append(Platform(name, self._platformtype, user_config, labels))
+
+        return platforms
+
+
+    def to_protobuf(self, group_proto, platforms_by_name):
+        """
+        Write the group to group_proto. The shared configuration is
+        written relative to the platformtype defaults and each
+        configured platform in platforms_by_name relative to the
+        shared configuration, so only per instance differences such
+        as helper assigned nemids and addresses are sent.
+        """
+        group_proto.name_format = self._name_format
+
+        group_proto.platformtype = self._platformtype.name
+
+        group_proto.count = self.count
+
+        group_proto.first_index = self._first_index
+
+        defaults = Platform(self._name_format, self._platformtype)
+
+        shared = Platform(self._name_format, self._platformtype, self._user_config, self._labels)
+
+        shared.components_to_protobuf(group_proto.components, defaults)
+
+        for name in self._platform_names:
+            platform = platforms_by_name[name]
+
+            if not any([c.differs_from(shared.component_by_name(c.name))
+                        for c in platform.components]):
+                continue
+
+            platform.to_protobuf(group_proto.instances.add(), shared)
@@ -30,7 +30,6 @@
 #
 # See toplevel COPYING for more information.
 
-import copy
 import os
 from yaml import safe_load
 
@@ -79,9 +78,6 @@ class PlatformType:
     def name(self):
         return self._name
 
-    @name.setter
-    def name(self, val):
-        self._name = val
 
     @property
     def emex_type(self):
@@ -100,7 +96,7 @@ class PlatformType:
 
     @property
     def componenttypes(self):
-        return copy.deepcopy(self._componenttypes)
+        return dict(self._componenttypes)
 
 
     def to_protobuf(self, platformtype_proto):
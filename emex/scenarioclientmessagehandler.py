@@ -30,32 +30,106 @@
 #
 # See toplevel COPYING for more information.
 
+from collections import namedtuple
 import logging
-from pandas import DataFrame
+import time
 
 from emex.common_pb2 import PASS,FAIL
+from emex.compression import get_codec
+from emex.emoemessages import ProgramState,ProgramEventResult,ProgramStatus,EventTiming
 import emex.emexscenario_pb2 as emexscenario_pb2
 
 
+# a parsed ScenarioServerMessage. program is the ProgramStatus of
+# program replies and timing the EventTiming of event replies, each
+# None otherwise
+ScenarioReply = \
+    namedtuple('ScenarioReply',
+               ['client_sequence', 'ok', 'message', 'flows_df', 'program', 'timing'])
+
+
 class ScenarioClientMessageHandler:
-    def __init__(self, list_flows_flag=False):
+    FLOW_COLUMNS = ['flow_name',
+                    'active',
+                    'flow_id',
+                    'source',
+                    'destination',
+                    'tos',
+                    'ttl',
+                    'proto',
+                    'flow_pattern', # periodic,poisson,jitter
+                    'size_bytes',
+                    'packet_rate',
+                    'jitter_fraction']
+
+    def __init__(self, list_flows_flag=False, compression_codecs=()):
         self._send_sequence = 0
 
         self._list_flows_flag = list_flows_flag
 
+        self._compression_codecs = list(compression_codecs)
+
+        self._compression_codec = None
+
+        # the flow table rows by flow_index, as of flows_version, merged
+        # from the incremental replies, and its DataFrame
+        self._flows_version = None
+
+        self._flow_rows = {}
+
+        self._flow_df = None
+
+        self._full_flows_snapshot = False
+
+        # program events are numbered across LOAD and MERGE requests
+        self._program_event_index = 0
+
+
+    @property
+    def compression_codec(self):
+        """The Codec selected by the server for this connection, None
+        until the server accepts one of the offered codecs."""
+        return self._compression_codec
+
+
+    @property
+    def sequence(self):
+        """The sequence of the last built message."""
+        return self._send_sequence
+
 
     def _next_sequence(self):
         self._send_sequence += 1
         return self._send_sequence
 
 
-    def build_client_message(self, eventdict):
+    def request_full_flows_snapshot(self):
+        """Ask for the whole flow table, rather than the changes since
+        the last reply, with the next message."""
+        self._full_flows_snapshot = True
+
+
+    def build_client_message(self, eventdict, scheduled_time=None):
+        """Build the message for eventdict. scheduled_time is the wall
+        clock time the events were due, recorded in their EventTiming."""
         client_request_proto = emexscenario_pb2.ScenarioClientMessage()
 
         client_request_proto.sequence = self._next_sequence()
 
+        if scheduled_time is not None:
+            client_request_proto.scheduled_time = scheduled_time
+
         client_request_proto.trafficRequest.list_flows_flag = self._list_flows_flag
 
+        if self._list_flows_flag:
+            if self._full_flows_snapshot:
+                client_request_proto.trafficRequest.full_flows_snapshot = True
+
+                self._full_flows_snapshot = False
+
+            elif self._flows_version is not None:
+                client_request_proto.trafficRequest.known_flows_version = self._flows_version
+
         self.build_start_traffic_flows(
             client_request_proto.trafficRequest, eventdict)
 
@@ -68,6 +142,54 @@ class ScenarioClientMessageHandler:
         self.build_jamming_events(
             client_request_proto.jammingEvents, eventdict)
 
+        # offer codecs until the server selects one
+        if not self._compression_codec:
+            client_request_proto.compression_codecs.extend(self._compression_codecs)
+
+        client_request_proto.send_time = time.time()
+
+        return client_request_proto.SerializeToString()
+
+
+    def build_program_message(self, request_type, events=()):
+        """Build a ProgramRequest of ProgramRequestType request_type.
+        events, for LOAD and MERGE, is a {time: eventdict} dictionary,
+        as in the scenario builder events, or (time, eventdict) pairs."""
+        client_request_proto = emexscenario_pb2.ScenarioClientMessage()
+
+        client_request_proto.sequence = self._next_sequence()
+
+        programRequest = client_request_proto.programRequest
+
+        programRequest.type = request_type.value
+
+        if isinstance(events, dict):
+            events = events.items()
+
+        for eventtime,eventdict in sorted(events, key=lambda event: event[0]):
+            event_proto = programRequest.events.add()
+
+            event_proto.event_index = self._program_event_index
+
+            self._program_event_index += 1
+
+            event_proto.time = eventtime
+
+            event_proto.trafficRequest.list_flows_flag = self._list_flows_flag
+
+            self.build_start_traffic_flows(event_proto.trafficRequest, eventdict)
+
+            self.build_stop_traffic_flows(event_proto.trafficRequest, eventdict)
+
+            self.build_emane_events(event_proto.emaneEvents, eventdict)
+
+            self.build_jamming_events(event_proto.jammingEvents, eventdict)
+
+        if not self._compression_codec:
+            client_request_proto.compression_codecs.extend(self._compression_codecs)
+
+        client_request_proto.send_time = time.time()
+
         return client_request_proto.SerializeToString()
 
 
@@ -217,10 +339,20 @@ class ScenarioClientMessageHandler:
 
 
     def parse_server_reply(self, reply_str):
+        reply = self.parse_server_message(reply_str)
+
+        return reply.ok,reply.message,reply.flows_df
+
+
+    def parse_server_message(self, reply_str):
+        """Parse a ScenarioServerMessage to a ScenarioReply."""
         reply = emexscenario_pb2.ScenarioServerMessage()
 
         reply.ParseFromString(reply_str)
 
+        if reply.HasField('compression_codec'):
+            self._compression_codec = get_codec(reply.compression_codec)
+
         server_sequence = reply.sequence
 
         client_sequence = reply.client_sequence
@@ -237,40 +369,85 @@ class ScenarioClientMessageHandler:
 
         logging.debug(f'\n{flow_df}')
 
-        return ok,message,flow_df
+        program = self._parse_program_reply(reply.programReply) \
+            if reply.HasField('programReply') else None
+
+        timing = self._parse_timing(reply.timing) \
+            if reply.HasField('timing') else None
+
+        return ScenarioReply(client_sequence, ok, message, flow_df, program, timing)
+
+
+    def _parse_timing(self, timingProto):
+        return EventTiming(*[getattr(timingProto, name) if timingProto.HasField(name) else None
+                             for name in EventTiming._fields])
+
+
+    def _parse_program_reply(self, programReply):
+        event_results = [
+            ProgramEventResult(resultProto.event_index,
+                               resultProto.result == PASS,
+                               resultProto.message,
+                               resultProto.scheduled_time,
+                               resultProto.executed_time)
+            for resultProto in programReply.eventResults
+        ]
+
+        return ProgramStatus(ProgramState(programReply.state),
+                             event_results,
+                             programReply.pending_events)
 
 
     def _parse_traffic_reply(self, trafficReply):
+        # pandas is slow to import, load it on the first traffic reply
+        # rather than whenever a client starts
+        from pandas import DataFrame
+
         bool_result = trafficReply.result == PASS
 
-        rows = []
+        if not trafficReply.HasField('flows_version'):
+            # program control replies carry no flows, the table is unchanged
+            if self._flow_df is not None:
+                return bool_result,trafficReply.message,self._flow_df
+
+            # no flows requested, or a server without flow table versions
+            rows = [self._flow_entry_to_row(flowEntry)
+                    for flowEntry in trafficReply.flowEntries]
+
+            return bool_result,trafficReply.message,DataFrame(rows, columns=self.FLOW_COLUMNS)
+
+        changed = trafficReply.flows_snapshot or \
+            trafficReply.removed_flow_indexes or \
+            trafficReply.flowEntries or \
+            self._flow_df is None
+
+        if trafficReply.flows_snapshot:
+            self._flow_rows = {}
+
+        for flow_index in trafficReply.removed_flow_indexes:
+            self._flow_rows.pop(flow_index, None)
 
         for flowEntry in trafficReply.flowEntries:
-            rows.append([flowEntry.flow_name,
-                         flowEntry.active,
-                         flowEntry.flow_id,
-                         flowEntry.source,
-                         flowEntry.destination,
-                         flowEntry.tos,
-                         flowEntry.ttl,
-                         flowEntry.protocol_type,
-                         flowEntry.simple_flow.type,
-                         flowEntry.simple_flow.size_bytes,
-                         flowEntry.simple_flow.packet_rate,
-                         flowEntry.simple_flow.jitter_fraction])
-
-        flow_df = DataFrame(rows, columns=['flow_name',
-                                           'active',
-                                           'flow_id',
-                                           'source',
-                                           'destination',
-                                           'tos',
-                                           'ttl',
-                                           'proto',
-                                           'flow_pattern', # periodic,poisson,jitter
-                                           'size_bytes',
-                                           'packet_rate',
-                                           'jitter_fraction'])
-
-
-        return bool_result,trafficReply.message,flow_df
+            self._flow_rows[flowEntry.flow_index] = self._flow_entry_to_row(flowEntry)
+
+        self._flows_version = trafficReply.flows_version
+
+        if changed:
+            self._flow_df = DataFrame(list(self._flow_rows.values()), columns=self.FLOW_COLUMNS)
+
+        return bool_result,trafficReply.message,self._flow_df
+
+
+    def _flow_entry_to_row(self, flowEntry):
+        return [flowEntry.flow_name,
+                flowEntry.active,
+                flowEntry.flow_id,
+                flowEntry.source,
+                flowEntry.destination,
+                flowEntry.tos,
+                flowEntry.ttl,
+                flowEntry.protocol_type,
+                flowEntry.simple_flow.type,
+                flowEntry.simple_flow.size_bytes,
+                flowEntry.simple_flow.packet_rate,
+                flowEntry.simple_flow.jitter_fraction]
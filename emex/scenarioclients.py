@@ -0,0 +1,179 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+
+from collections import deque
+import logging
+
+from emex.scenarioprogram import ScenarioProgram
+
+
+class ScenarioClient:
+    """The connection state of one scenario client: the channel it
+    connected on, its partial frame data, negotiated compression
+    codec, reply sequence number, the requests waiting to be
+    processed and its scenario program."""
+    def __init__(self, endpoint, channel_id):
+        self._endpoint = endpoint
+
+        self._channel_id = channel_id
+
+        self.cache_data = b''
+
+        self.codec = None
+
+        # the flow table version last sent to the client, the version
+        # program event replies are built against
+        self.flows_version = None
+
+        self.program = ScenarioProgram()
+
+        self._send_sequence = 0
+
+        self._last_client_sequence = None
+
+        self._requests = deque()
+
+
+    @property
+    def endpoint(self):
+        return self._endpoint
+
+
+    @property
+    def channel_id(self):
+        return self._channel_id
+
+
+    @property
+    def pending(self):
+        return len(self._requests)
+
+
+    def next_sequence(self):
+        self._send_sequence += 1
+
+        return self._send_sequence
+
+
+    def enqueue(self, client_sequence, requests):
+        if self._last_client_sequence is not None and \
+           client_sequence <= self._last_client_sequence:
+            logging.warning(f'scenario client {self._endpoint} sequence {client_sequence} '
+                            f'does not follow {self._last_client_sequence}')
+
+        self._last_client_sequence = client_sequence
+
+        self._requests.append((client_sequence, requests))
+
+
+    def dequeue(self):
+        return self._requests.popleft()
+
+
+class ScenarioClients:
+    """The connected scenario clients of an EMOE.
+
+    Each client's requests are processed in the order received. Across
+    clients, requests are taken round robin, one per client with
+    pending requests in turn, so a client that sends a burst of
+    requests does not hold up the others.
+    """
+    def __init__(self):
+        self._clients = {}
+
+        # endpoints of clients with pending requests, in service order
+        self._ready = deque()
+
+
+    def __len__(self):
+        return len(self._clients)
+
+
+    def __contains__(self, endpoint):
+        return endpoint in self._clients
+
+
+    def add(self, endpoint, channel_id):
+        client = ScenarioClient(endpoint, channel_id)
+
+        self._clients[endpoint] = client
+
+        return client
+
+
+    def remove(self, endpoint):
+        """Remove the client and discard its pending requests."""
+        client = self._clients.pop(endpoint, None)
+
+        if client and client.pending:
+            self._ready.remove(endpoint)
+
+            logging.info(f'discarding {client.pending} requests from '
+                         f'closed scenario client {endpoint}')
+
+        return client
+
+
+    def get(self, endpoint):
+        return self._clients.get(endpoint)
+
+
+    def enqueue(self, endpoint, client_sequence, requests):
+        client = self._clients[endpoint]
+
+        if not client.pending:
+            self._ready.append(endpoint)
+
+        client.enqueue(client_sequence, requests)
+
+
+    def has_requests(self):
+        return bool(self._ready)
+
+
+    def next_request(self):
+        """Return the (client, client_sequence, requests) to process
+        next, or None when no requests are pending."""
+        if not self._ready:
+            return None
+
+        endpoint = self._ready.popleft()
+
+        client = self._clients[endpoint]
+
+        client_sequence,requests = client.dequeue()
+
+        if client.pending:
+            self._ready.append(endpoint)
+
+        return client,client_sequence,requests
@@ -31,15 +31,13 @@
 # See toplevel COPYING for more information.
 
 import logging
-import os
-import shutil
-
-from pandas import DataFrame
+import time
 
 from emex.trafficmanager import TrafficManager
 from emex.emaneeventmanager import EmaneEventManager
 from emex.jammingmanager import JammingManager
-from emex.emoemessages import StartSimpleFlowRequest,StopFlowRequest
+from emex.emoemessages import StartSimpleFlowRequest,StopFlowRequest,EventTiming
+from emex.workdircleaner import hand_back_tree
 
 
 class ScenarioManager:
@@ -71,14 +69,45 @@ class ScenarioManager:
     def handle_requests(self, remote, client_sequence, requests):
         logging.debug(f'scenario_manager handle_requests')
 
+        ok,message,flows,timing = self.execute_requests(client_sequence, requests)
+
+        self._broker.send_result(remote,
+                                 client_sequence,
+                                 ok,
+                                 message,
+                                 flows,
+                                 timing=timing)
+
+
+    def execute_requests(self, client_sequence, requests):
+        """Apply the flow, emane and jamming requests and return the
+        (ok, message, flows, timing) result. timing is the EventTiming
+        of the requests, with the time each kind of request present
+        completed."""
         start_ok,start_message = self._tm.start_flows(requests['flow_on'])
 
         stop_ok,stop_message = self._tm.stop_flows(requests['flow_off'])
 
+        traffic_complete_time = time.time()
+
         events_ok,events_message = self._eem.send_events(requests['emane_events'])
 
+        emane_complete_time = time.time()
+
         jamming_ok,jamming_message = self._jm.send_events(requests['jamming_events'])
 
+        jamming_complete_time = time.time()
+
+        has_emane_events = any(requests['emane_events'].values())
+
+        timing = EventTiming(
+            requests['scheduled_time'],
+            requests['client_send_time'],
+            requests['server_receive_time'],
+            traffic_complete_time if requests['flow_on'] or requests['flow_off'] else None,
+            emane_complete_time if has_emane_events else None,
+            jamming_complete_time if requests['jamming_events'] else None)
+
         message = f'ok for client_sequence={client_sequence}'
 
         ok = start_ok and stop_ok and events_ok and jamming_ok
@@ -93,31 +122,30 @@ class ScenarioManager:
             else:
                 message = jamming_message
 
-        flows_df = self._tm.get_flows() \
-            if requests['list_flows_flag'] else DataFrame()
+        flows = None
 
-        self._broker.send_result(remote,
-                                 client_sequence,
-                                 ok,
-                                 message,
-                                 flows_df)
+        if requests['list_flows_flag']:
+            known_version = None \
+                if requests['full_flows_snapshot'] else requests['known_flows_version']
+
+            flows = self._tm.get_flows_delta(known_version)
+
+        return ok,message,flows,timing
 
 
     def clean_up(self, did_run):
-        # remove emoe created subdirectories in the emex directory when
-        # configured to do so
-        if self._emexd_config_map['emexdirectory-action'] == 'keep':
+        # prepare emoe created subdirectories in the emex directory for
+        # removal or archiving when configured to do so
+        action = self._emexd_config_map['emexdirectory-action']
+
+        if action == 'keep':
             return
 
-        if self._emexd_config_map['emexdirectory-action'] == 'delete' or did_run:
+        if action == 'delete' or action == 'archive' or did_run:
             """
-            delete files and subdirectories in /tmp/etce created within
-            the container (owned by root or with subdirectories written by root)
-            when configure to do so:
-
-                1. when emexdirectory-action is "delete"
-                2. when emexdirectory-action is "deleteonsuccess" and the emoe reached the
-                   RUNNINGstate
+            files and subdirectories in /tmp/etce created within
+            the container are owned by root (or have subdirectories
+            written by root):
 
             drwxr-xr-x 7 user       user         200 Aug 18 09:44 config
             drwxr-xr-x 6 root       root         200 Aug 18 09:44 current_test
@@ -126,26 +154,20 @@ class ScenarioManager:
             ---------- 1 root       root       17110 Aug 18 09:44 etce.log
             drwxr-xr-x 2 root       root         280 Aug 18 09:44 lock
             drwxr-xr-x 5 user       user         120 Aug 18 09:44 lxcroot
-            """
-            logging.info(f'cleanup /tmp/etce/current_test')
-            shutil.rmtree('/tmp/etce/current_test', ignore_errors=True)
 
-            logging.info(f'cleanup /tmp/etce/data')
-            shutil.rmtree('/tmp/etce/data', ignore_errors=True)
+            return them to the owner of /tmp/etce so that emexd can delete or
+            archive the whole directory in its cleanup thread:
 
-            logging.info(f'cleanup /tmp/etce/lxcroot')
-            shutil.rmtree('/tmp/etce/lxcroot', ignore_errors=True)
-
-            logging.info(f'cleanup /tmp/etce/lock')
-            shutil.rmtree('/tmp/etce/lock', ignore_errors=True)
+                1. when emexdirectory-action is "delete" or "archive"
+                2. when emexdirectory-action is "deleteonsuccess" and the emoe reached the
+                   RUNNING state
 
-            if os.path.isfile('/tmp/etce/etce.log'):
-                logging.info(f'cleanup /tmp/etce/etce.log')
-                os.remove('/tmp/etce/etce.log')
+            changing ownership is much cheaper than deleting the files here,
+            which would delay the final state message to emexd.
+            """
+            logging.info(f'cleanup hand back /tmp/etce for {action}')
 
-            if os.path.isfile('/tmp/etce/emexcontainerd.log'):
-                logging.info(f'cleanup /tmp/etce/emexcontainerd.log')
-                os.remove('/tmp/etce/emexcontainerd.log')
+            hand_back_tree('/tmp/etce')
 
 
     def _read_nemid_profileid_map_file(self):
@@ -0,0 +1,216 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+
+
+from collections import namedtuple
+import heapq
+import time
+
+from emex.emoemessages import ProgramState
+
+
+# an event of a scenario program. client_sequence is the sequence of
+# the LOAD or MERGE request that carried it, scheduled_time is its
+# offset from the program start and requests the parsed event requests
+ScheduledEvent = \
+    namedtuple('ScheduledEvent',
+               ['event_index', 'client_sequence', 'scheduled_time', 'requests'])
+
+
+class ScenarioProgram:
+    """The uploaded event timeline of one scenario client.
+
+    Program time is measured on the monotonic clock from when the
+    program is loaded, less the time spent paused. Events are kept
+    in a heap ordered by scheduled time and then arrival, so merged
+    events interleave with the loaded ones.
+
+    Every change that moves the next wake up (load, merge, pause,
+    resume, abort) increments the generation. The owner tags each
+    timer it sets with the current generation and ignores timers
+    whose generation is stale, rather than cancelling them.
+    """
+    def __init__(self, clock=time.monotonic):
+        self._clock = clock
+
+        self._state = ProgramState.IDLE
+
+        self._events = []
+
+        self._arrival = 0
+
+        self._start = None
+
+        self._paused_at = None
+
+        self._generation = 0
+
+
+    @property
+    def state(self):
+        return self._state
+
+
+    @property
+    def generation(self):
+        return self._generation
+
+
+    @property
+    def pending(self):
+        return len(self._events)
+
+
+    def elapsed(self):
+        """Return the current program time in seconds."""
+        if self._start is None:
+            return 0.0
+
+        now = self._paused_at if self._paused_at is not None else self._clock()
+
+        return now - self._start
+
+
+    def load(self, client_sequence, events):
+        """Replace the timeline with events, (event_index, time, requests)
+        tuples, and start it."""
+        self._events = []
+
+        self._start = self._clock()
+
+        self._paused_at = None
+
+        self._add(client_sequence, events)
+
+        self._state = ProgramState.RUNNING if self._events else ProgramState.COMPLETE
+
+        self._generation += 1
+
+
+    def merge(self, client_sequence, events):
+        """Add events to the running or paused timeline. Start a new
+        program from them when there is none."""
+        if self._state not in (ProgramState.RUNNING, ProgramState.PAUSED):
+            self.load(client_sequence, events)
+
+            return
+
+        self._add(client_sequence, events)
+
+        self._generation += 1
+
+
+    def pause(self):
+        if not self._state == ProgramState.RUNNING:
+            return False
+
+        self._paused_at = self._clock()
+
+        self._state = ProgramState.PAUSED
+
+        self._generation += 1
+
+        return True
+
+
+    def resume(self):
+        if not self._state == ProgramState.PAUSED:
+            return False
+
+        self._start += self._clock() - self._paused_at
+
+        self._paused_at = None
+
+        self._state = ProgramState.RUNNING
+
+        self._generation += 1
+
+        return True
+
+
+    def abort(self):
+        """Discard the remaining events."""
+        if self._state not in (ProgramState.RUNNING, ProgramState.PAUSED):
+            return False
+
+        self._events = []
+
+        self._paused_at = None
+
+        self._state = ProgramState.ABORTED
+
+        self._generation += 1
+
+        return True
+
+
+    def next_delay(self):
+        """Return the seconds until the next event is due, or None
+        when no event is scheduled to run."""
+        if not self._state == ProgramState.RUNNING or not self._events:
+            return None
+
+        return max(0.0, self._events[0][0] - self.elapsed())
+
+
+    def pop_due(self):
+        """Remove and return the next ScheduledEvent that is due, or
+        None. The program is COMPLETE once its last event is popped."""
+        if not self._state == ProgramState.RUNNING or not self._events:
+            return None
+
+        if self._events[0][0] > self.elapsed():
+            return None
+
+        scheduled_time,_,event = heapq.heappop(self._events)
+
+        if not self._events:
+            self._state = ProgramState.COMPLETE
+
+        return event
+
+
+    def _add(self, client_sequence, events):
+        for event_index,event_time,requests in events:
+            # times at or before the start, including -inf, run immediately
+            scheduled_time = max(0.0, event_time)
+
+            self._arrival += 1
+
+            heapq.heappush(self._events,
+                           (scheduled_time,
+                            self._arrival,
+                            ScheduledEvent(event_index,
+                                           client_sequence,
+                                           scheduled_time,
+                                           requests)))
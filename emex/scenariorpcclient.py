@@ -30,12 +30,16 @@
 #
 # See toplevel COPYING for more information.
 
+from collections import deque
 import logging
 import socket
-import struct
+import time
 
-from emex.utils import sock_send_string,sock_recv_string
+from emex.compression import available_codecs
+from emex.emoemessages import ProgramRequestType,ProgramState
+from emex.eventtiming import EventTimingLog
 from emex.scenarioclientmessagehandler import ScenarioClientMessageHandler
+from emex.transport import send_frame,recv_frame
 
 
 class ScenarioRpcClient:
@@ -47,36 +51,168 @@ class ScenarioRpcClient:
     target EMOE. It's service endpoint is exposed as the 'emexcontainerd'
     accessor that is advertised in the startScenarioReply EMEX message
     from the serving emexd.
+
+    As with the EmexdRpcClient, compression_codecs are offered to
+    the server to compress large replies, such as flow tables. None
+    offers all codecs available on the host.
+
+    Besides sending events one at a time with send_event, a client
+    may upload a whole timeline as a scenario program that the EMOE
+    executes on its own clock, see run_program. The EMOE streams back
+    a reply per executed event. Replies that arrive while waiting on
+    another request are held for next_program_result.
+
+    The EventTiming returned with each event reply is collected in
+    event_timing.
     """
-    def __init__(self, endpoint, list_flows_flag=True):
+    def __init__(self, endpoint, list_flows_flag=True, compression_codecs=None):
         self._socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
 
         logging.info(f'Connecting to emoe at {endpoint}')
 
         self._socket.connect(endpoint)
 
-        self._message_handler = ScenarioClientMessageHandler(list_flows_flag)
+        if compression_codecs is None:
+            compression_codecs = available_codecs()
+
+        self._message_handler = ScenarioClientMessageHandler(list_flows_flag,
+                                                             compression_codecs)
+
+        self._program_results = deque()
+
+        self._control_reply = None
+
+        self._event_timing = EventTimingLog()
 
 
     def close(self):
         self._socket.close()
 
 
+    @property
+    def event_timing(self):
+        return self._event_timing
+
+
     def getsockname(self):
         if self._socket:
             return self._socket.getsockname()
         return None
 
 
-    def send_event(self, eventdict):
-        reply_str = self._send_and_wait(
-            self._message_handler.build_client_message(eventdict))
+    def request_full_flows_snapshot(self):
+        """Return the whole flow table, instead of the changes merged
+        into the last one, from the next send_event."""
+        self._message_handler.request_full_flows_snapshot()
+
+
+    def send_event(self, eventdict, scheduled_time=None):
+        reply = self._send_and_wait(
+            self._message_handler.build_client_message(eventdict, scheduled_time))
+
+        return reply.ok,reply.message,reply.flows_df
+
+
+    def load_program(self, events):
+        """Upload events, a {time: eventdict} dictionary, as the
+        scenario program and start it. Returns the ScenarioReply."""
+        return self._send_program_request(ProgramRequestType.LOAD, events)
+
+
+    def merge_program(self, events):
+        """Add events, with times relative to the program start,
+        to the running program."""
+        return self._send_program_request(ProgramRequestType.MERGE, events)
+
+
+    def pause_program(self):
+        return self._send_program_request(ProgramRequestType.PAUSE)
+
+
+    def resume_program(self):
+        return self._send_program_request(ProgramRequestType.RESUME)
+
+
+    def abort_program(self):
+        return self._send_program_request(ProgramRequestType.ABORT)
 
-        return self._message_handler.parse_server_reply(reply_str)
+
+    def next_program_result(self):
+        """Wait for and return the ScenarioReply of the next executed
+        program event."""
+        if self._program_results:
+            return self._program_results.popleft()
+
+        return self._receive()
+
+
+    def run_program(self, events, on_result=None):
+        """Load events as the scenario program and wait for it to
+        finish, calling on_result with the ScenarioReply of each
+        executed event. on_result may merge into, pause or abort the
+        program; run_program returns once the program is complete,
+        aborted or paused; after resume_program, read the remaining
+        results with next_program_result. Returns the last
+        ScenarioReply."""
+        reply = self.load_program(events)
+
+        # a reply without program status is from an EMOE that does not
+        # support scenario programs
+        while reply.ok and reply.program and \
+              reply.program.state == ProgramState.RUNNING:
+            reply = self.next_program_result()
+
+            if on_result:
+                self._control_reply = None
+
+                on_result(reply)
+
+                # a request sent from on_result carries the newest
+                # program state
+                if self._control_reply:
+                    reply = self._control_reply
+
+        return reply
+
+
+    def _send_program_request(self, request_type, events=()):
+        reply = self._send_and_wait(
+            self._message_handler.build_program_message(request_type, events))
+
+        if reply.program:
+            self._control_reply = reply
+
+        return reply
 
 
     def _send_and_wait(self, request_str):
-        sock_send_string(self._socket, request_str)
+        sequence = self._message_handler.sequence
+
+        send_frame(self._socket, request_str, self._message_handler.compression_codec)
+
+        while True:
+            reply = self._receive()
+
+            # hold results of program events executed in the meantime
+            if reply.program and reply.program.event_results:
+                self._program_results.append(reply)
+
+            elif reply.client_sequence == sequence:
+                return reply
+
+            else:
+                logging.warning(f'ignoring scenario reply to client_sequence '
+                                f'{reply.client_sequence} while waiting for {sequence}')
+
+
+    def _receive(self):
+        reply_str = recv_frame(self._socket)
+
+        receive_time = time.time()
+
+        reply = self._message_handler.parse_server_message(reply_str)
 
-        return sock_recv_string(self._socket)
+        if reply.timing:
+            self._event_timing.add(reply.timing, receive_time)
 
+        return reply
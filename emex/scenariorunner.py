@@ -219,6 +219,50 @@ class ScenarioRunner():
 
         logging.info(f'run {self._scenario_builder.name}')
 
+        # upload the whole timeline once, the emoe executes each event
+        # at its time and streams back the result
+        reply = scenario_rpc.run_program(self._scenario_builder.events,
+                                         on_result=self._log_program_result)
+
+        if reply.program is None:
+            logging.warning('emoe does not support scenario programs, sending events')
+
+            flows_df = self._send_events(scenario_rpc)
+
+        else:
+            if not reply.ok:
+                logging.error(f'scenario program failed with message "{reply.message}"')
+
+            flows_df = reply.flows_df
+
+        self._write_event_timing(scenario_rpc.event_timing)
+
+        return flows_df
+
+
+    def _write_event_timing(self, event_timing):
+        for event_type,metric,count,mean,minimum,p50,p95,maximum in event_timing.summary():
+            logging.info(f'{event_type} {metric} count={count} '
+                         f'mean={mean*1000:.3f}ms p50={p50*1000:.3f}ms '
+                         f'p95={p95*1000:.3f}ms max={maximum*1000:.3f}ms')
+
+        if not self._output_path:
+            return
+
+        os.makedirs(self._output_path, exist_ok=True)
+
+        event_timing.write(self._output_path)
+
+        logging.info(f'Event timing written to {self._output_path}')
+
+
+    def _log_program_result(self, reply):
+        for event_result in reply.program.event_results:
+            logging.info(f'event time=%0.1f executed=%0.3f ok={event_result.ok}' %
+                         (event_result.scheduled_time, event_result.executed_time))
+
+
+    def _send_events(self, scenario_rpc):
         # send a StartFlowsRequest for all flows
         sequencer = EventSequencer(self._scenario_builder.events)
 
@@ -229,7 +273,8 @@ class ScenarioRunner():
         for eventtime,eventdict in sequencer:
             logging.info(f'event time=%0.1f' % eventtime)
 
-            ok,message,flows_df = scenario_rpc.send_event(eventdict)
+            ok,message,flows_df = \
+                scenario_rpc.send_event(eventdict, sequencer.scheduled_time(eventtime))
 
         return flows_df
 
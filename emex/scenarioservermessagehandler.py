@@ -35,7 +35,7 @@ import logging
 
 from emex.common_pb2 import PASS,FAIL
 import emex.emexscenario_pb2 as emexscenario_pb2
-from emex.emoemessages import SimpleTrafficFlowType,StartSimpleFlowRequest,StopFlowRequest,TrafficProtocolType,JamOnEvent,JamOffEvent
+from emex.emoemessages import SimpleTrafficFlowType,StartSimpleFlowRequest,StopFlowRequest,TrafficProtocolType,JamOnEvent,JamOffEvent,ProgramRequestType
 from emex.emaneeventmessages import POV,Pathloss,AntennaPointing
 
 
@@ -49,20 +49,70 @@ class ScenarioServerMessageHandler:
         return self._send_sequence
 
 
-    def parse_client_request(self, request_str):
+    def parse_client_request(self, request_str, receive_time=None):
         request = emexscenario_pb2.ScenarioClientMessage()
 
         request.ParseFromString(request_str)
 
         client_sequence = request.sequence
 
-        requests = self._parse_traffic_request(request.trafficRequest)
+        requests = self._parse_event_requests(request.trafficRequest,
+                                              request.emaneEvents,
+                                              request.jammingEvents)
 
-        requests.update(self._parse_emane_events(request.emaneEvents))
+        requests['program'] = self._parse_program_request(request.programRequest) \
+            if request.HasField('programRequest') else None
 
-        requests.update(self._parse_jamming_events(request.jammingEvents))
+        requests['scheduled_time'] = request.scheduled_time \
+            if request.HasField('scheduled_time') else None
 
-        return client_sequence,requests
+        requests['client_send_time'] = request.send_time \
+            if request.HasField('send_time') else None
+
+        requests['server_receive_time'] = receive_time
+
+        if requests['program']:
+            # program events are scheduled by the server, they share
+            # the send and receive times of the message that carried them
+            for _,_,event_requests in requests['program'][1]:
+                event_requests['client_send_time'] = requests['client_send_time']
+
+                event_requests['server_receive_time'] = receive_time
+
+        return client_sequence,requests,list(request.compression_codecs)
+
+
+    def _parse_event_requests(self, trafficRequest, emaneEvents, jammingEvents):
+        requests = self._parse_traffic_request(trafficRequest)
+
+        requests.update(self._parse_emane_events(emaneEvents))
+
+        requests.update(self._parse_jamming_events(jammingEvents))
+
+        return requests
+
+
+    def _parse_program_request(self, programRequest):
+        """Return the (ProgramRequestType, events) of the request, where
+        events are the (event_index, time, requests) of each event."""
+        events = []
+
+        for event in programRequest.events:
+            requests = self._parse_event_requests(event.trafficRequest,
+                                                  event.emaneEvents,
+                                                  event.jammingEvents)
+
+            # program events are answered against the flow table
+            # version last sent to the client
+            requests['known_flows_version'] = None
+
+            requests['program'] = None
+
+            requests['scheduled_time'] = None
+
+            events.append((event.event_index, event.time, requests))
+
+        return ProgramRequestType(programRequest.type),events
 
 
     def _parse_traffic_request(self, trafficRequest):
@@ -76,6 +126,11 @@ class ScenarioServerMessageHandler:
 
         requests['list_flows_flag'] = trafficRequest.list_flows_flag
 
+        requests['known_flows_version'] = trafficRequest.known_flows_version \
+            if trafficRequest.HasField('known_flows_version') else None
+
+        requests['full_flows_snapshot'] = trafficRequest.full_flows_snapshot
+
         return requests
 
 
@@ -200,13 +255,18 @@ class ScenarioServerMessageHandler:
         return {'jamming_events': events}
 
 
-    def build_result(self, client_sequence, ok, message, flows_df):
+    def build_result(self, client_sequence, ok, message, flows,
+                     compression_codec=None, sequence=None, program_status=None,
+                     timing=None):
         reply = emexscenario_pb2.ScenarioServerMessage()
 
-        reply.sequence = self._next_sequence()
+        reply.sequence = sequence if sequence is not None else self._next_sequence()
 
         reply.client_sequence = client_sequence
 
+        if compression_codec:
+            reply.compression_codec = compression_codec.name
+
         logging.info(f'build_traffic_result '
                      f'sequence={reply.sequence} ',
                      f'client_sequence={client_sequence} ',
@@ -217,7 +277,22 @@ class ScenarioServerMessageHandler:
 
         reply.trafficReply.message = message
 
-        self._add_traffic_flow_entries(reply.trafficReply, flows_df)
+        if flows:
+            reply.trafficReply.flows_version = flows.version
+
+            reply.trafficReply.flows_snapshot = flows.snapshot
+
+            reply.trafficReply.removed_flow_indexes.extend(flows.removed_flow_indexes)
+
+            self._add_traffic_flow_entries(reply.trafficReply, flows.flows_df)
+
+        if program_status:
+            self._add_program_reply(reply.programReply, ok, message, program_status)
+
+        if timing:
+            for name,value in timing._asdict().items():
+                if value is not None:
+                    setattr(reply.timing, name, value)
 
         reply_str = reply.SerializeToString()
 
@@ -228,6 +303,7 @@ class ScenarioServerMessageHandler:
         for _,row in flows_df.iterrows():
             flowEntry = trafficReply.flowEntries.add()
 
+            flowEntry.flow_index = row.flow_index
             flowEntry.flow_name = row.flow_name
             flowEntry.active = row.active
             flowEntry.flow_id = row.flow_id
@@ -241,3 +317,22 @@ class ScenarioServerMessageHandler:
             flowEntry.simple_flow.size_bytes = row.size_bytes
             flowEntry.simple_flow.packet_rate = row.packet_rate
             flowEntry.simple_flow.jitter_fraction = row.jitter_fraction
+
+
+    def _add_program_reply(self, programReply, ok, message, program_status):
+        programReply.result = PASS if ok else FAIL
+
+        programReply.message = message
+
+        programReply.state = program_status.state.value
+
+        programReply.pending_events = program_status.pending_events
+
+        for event_result in program_status.event_results:
+            resultProto = programReply.eventResults.add()
+
+            resultProto.event_index = event_result.event_index
+            resultProto.result = PASS if event_result.ok else FAIL
+            resultProto.message = event_result.message
+            resultProto.scheduled_time = event_result.scheduled_time
+            resultProto.executed_time = event_result.executed_time
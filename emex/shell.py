@@ -601,6 +601,16 @@ class Shell(cmd.Cmd):
 
             print()
 
+        if reply.build_stage_metrics:
+            print('###############')
+            print('build stages:')
+            print(f'   {"stage":20s} {"count":>8s} {"total (s)":>10s} {"mean (s)":>10s} {"max (s)":>10s}')
+            for metric in reply.build_stage_metrics:
+                print(f'   {metric.name:20s} {metric.count:8d} '
+                      f'{metric.total_seconds:10.3f} '
+                      f'{metric.total_seconds/metric.count:10.3f} '
+                      f'{metric.max_seconds:10.3f}')
+
 
     def do_stopemoe(self, arg):
         """
@@ -31,14 +31,81 @@
 # See toplevel COPYING for more information.
 
 from collections import defaultdict,namedtuple
+from functools import lru_cache
 import logging
+import os
+import stat
+import tempfile
+from threading import Lock
 
 from mako.exceptions import SyntaxException
+from mako.lookup import TemplateLookup
 from mako.template import Template
 from mako.runtime import Context
 import io
 
 
+# Mako writes the python module compiled from each template file
+# here, in a subdirectory mirroring the template file path, and
+# only recompiles when the template file is newer than the module.
+# The modules are imported, so the directory is only used when it
+# is private to the current user, see _check_module_directory.
+TEMPLATE_MODULE_DIRECTORY = \
+    os.path.join(tempfile.gettempdir(), f'emex-mako-modules-{os.getuid()}')
+
+_template_lookup = None
+
+_template_lookup_lock = Lock()
+
+
+def get_template_lookup():
+    """Return the process wide template lookup.
+
+    The lookup keeps compiled templates in memory, keyed by their
+    absolute path, and rechecks the file modification time on each
+    access so that edited templates are reloaded.
+    """
+    global _template_lookup
+
+    with _template_lookup_lock:
+        if not _template_lookup:
+            module_directory = TEMPLATE_MODULE_DIRECTORY
+
+            try:
+                os.makedirs(module_directory, mode=0o700, exist_ok=True)
+
+                _check_module_directory(module_directory)
+            except OSError as e:
+                logging.warning(f'unable to use template module directory '
+                                f'"{module_directory}", compiling templates '
+                                f'in memory only: {e}')
+                module_directory = None
+
+            _template_lookup = TemplateLookup(directories=['/'],
+                                              module_directory=module_directory,
+                                              filesystem_checks=True,
+                                              strict_undefined=True)
+
+        return _template_lookup
+
+
+def _check_module_directory(module_directory):
+    """Raise OSError unless module_directory is a real directory, not
+    a symlink, owned by the current user and accessible only to them.
+    The directory is at a predictable path in the shared temporary
+    directory, where another user may have created it first."""
+    st = os.lstat(module_directory)
+
+    if not stat.S_ISDIR(st.st_mode):
+        raise OSError(f'"{module_directory}" is not a directory')
+
+    if not st.st_uid == os.getuid():
+        raise OSError(f'"{module_directory}" is owned by uid {st.st_uid}')
+
+    if not stat.S_IMODE(st.st_mode) == 0o700:
+        raise OSError(f'"{module_directory}" has mode {stat.S_IMODE(st.st_mode):o}, not 700')
+
+
 class TemplateError(Exception):
     def __init__(self, message):
         Exception.__init__(self, message)
@@ -73,7 +140,7 @@ def format_file(srcfile, dstfile, overlays):
 
     with open(dstfile, 'w') as outf:
         try:
-            template = Template(filename=srcfile, strict_undefined=True)
+            template = get_template_lookup().get_template(os.path.abspath(srcfile))
 
             outf.write(template.render(**overlays))
         except NameError as ne:
@@ -141,7 +208,7 @@ def paramdict_to_namedtuple(d):
     for k,v in d.items():
         g,n = k.split('.')
 
-        if not isinstance(v, list):
+        if not isinstance(v, (list, tuple)):
             v = [v]
 
         sn[g].append((n,v))
@@ -149,8 +216,15 @@ def paramdict_to_namedtuple(d):
     for g,tpls in sn.items():
         ns,vs = zip(*tpls)
         vstrs = [ ','.join(map(str,v)) for v in vs ]
-        gtype = namedtuple(g, ns)
+        gtype = _group_namedtuple(g, ns)
         objs[g] = gtype(*vstrs)
 
     return objs
 
+
+@lru_cache(maxsize=None)
+def _group_namedtuple(g, ns):
+    # the same parameter groups, with the same members, recur for
+    # every instance of a component type. reuse their classes.
+    return namedtuple(g, ns)
+
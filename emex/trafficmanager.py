@@ -36,16 +36,31 @@ import logging
 
 from pandas import DataFrame
 
-from emex.emoemessages import SimpleTrafficFlowType,TrafficProtocolType
+from emex.emoemessages import FlowsDelta,SimpleTrafficFlowType,TrafficProtocolType
 
 
 class TrafficManager:
     MGEN_PORTMAP_FILE='/tmp/etce/config/doc/mgen_port_map.csv'
 
+    # number of removed flows remembered for incremental flow replies,
+    # clients that are further behind receive a full snapshot
+    MAX_TOMBSTONES=10000
+
     def __init__(self):
         self._flow_index = 0 # unique index per flows row
 
+        # the flow table version, bumped by each change to the table.
+        # each row records the version that last changed it.
+        self._flows_version = 0
+
+        # (flow_index, version) of removed rows, oldest first, and the
+        # oldest version that can be brought up to date from them
+        self._tombstones = []
+
+        self._tombstone_floor = 0
+
         self._flows = DataFrame(columns=['flow_index',
+                                         'version',
                                          'flow_name',
                                          'flow_id',
                                          'source',
@@ -139,6 +154,43 @@ class TrafficManager:
         return self._flows
 
 
+    def get_flows_delta(self, known_version=None):
+        """
+        Return the FlowsDelta that brings a flow table at known_version
+        up to date, or a full snapshot when known_version is None or
+        older than the remembered removals.
+        """
+        if known_version is None or \
+           known_version < self._tombstone_floor or \
+           known_version > self._flows_version:
+            return FlowsDelta(self._flows_version, True, self._flows, [])
+
+        flows_df = self._flows.loc[self._flows.version > known_version]
+
+        removed_flow_indexes = [flow_index for flow_index,version in self._tombstones
+                                if version > known_version]
+
+        return FlowsDelta(self._flows_version, False, flows_df, removed_flow_indexes)
+
+
+    def _next_version(self):
+        self._flows_version += 1
+
+        return self._flows_version
+
+
+    def _add_tombstones(self, flow_indexes, version):
+        self._tombstones.extend([(int(flow_index), version) for flow_index in flow_indexes])
+
+        excess = len(self._tombstones) - TrafficManager.MAX_TOMBSTONES
+
+        if excess > 0:
+            # clients must have seen the last forgotten removal
+            self._tombstone_floor = self._tombstones[excess-1][1]
+
+            del self._tombstones[:excess]
+
+
     def _select_sources_and_destinations(self, sources, destinations):
         """ Ensure all sources and destinations (if any) match
             valid platform names.
@@ -211,6 +263,9 @@ class TrafficManager:
         if not valid_request:
             return False,message
 
+        if flow_on_requests:
+            self._next_version()
+
         for request in flow_on_requests:
             flow_name = request.flow_name
 
@@ -291,6 +346,7 @@ class TrafficManager:
 
                 self._flows = self._flows.append([
                     {'flow_index':self._next_flow_index(),
+                     'version':self._flows_version,
                      'flow_name':flow_name,
                      'active':True,
                      'flow_id':flow_id,
@@ -360,6 +416,7 @@ class TrafficManager:
 
             self._flows = self._flows.append([
                 {'flow_index':self._next_flow_index(),
+                 'version':self._flows_version,
                  'flow_name':flow_name,
                  'active':True,
                  'flow_id':flow_id,
@@ -403,6 +460,8 @@ class TrafficManager:
         if not self.connected:
             return False,'stop_flows called before connected'
 
+        version = self._next_version() if flow_off_requests else self._flows_version
+
         for request in flow_off_requests:
             # first insure that source and destination names are valid
             ok,message,flow_sources,flow_destinations = \
@@ -433,7 +492,8 @@ class TrafficManager:
 
                     self._send(row.destination, f'IGNORE {dst_port}')
 
-                    self._flows.loc[self._flows.flow_index == row.flow_index, 'active'] = False
+                    self._flows.loc[self._flows.flow_index == row.flow_index,
+                                    ['active', 'version']] = [False, version]
 
 
                 # For the case where only the flow_name is specified,
@@ -444,8 +504,13 @@ class TrafficManager:
                    not request.flow_ids and \
                    not request.sources and \
                    not request.destinations:
-                    self._flows.drop(self._flows.loc[self._flows.flow_name==request.flow_name].index,
-                                     inplace=True)
+                    removed = self._flows.flow_name == request.flow_name
+
+                    self._add_tombstones(self._flows.loc[removed].flow_index, version)
+
+                    # rows are appended without a unique index, select
+                    # the rows to keep rather than dropping by index
+                    self._flows = self._flows.loc[~removed]
 
         logging.info(self._flows)
 
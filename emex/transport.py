@@ -0,0 +1,208 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+
+"""Length prefixed message transport for emex client sockets.
+
+Messages are read with recv_into directly into preallocated
+bytearrays and written with sendmsg, so the length prefix and payload
+go out without being joined first. Short reads and partial writes are
+resumed. Blocking and non-blocking sockets are both supported; a
+non-blocking socket is waited on with a selector until it is ready
+rather than retried in a busy loop. FrameReader serves sockets that
+are polled by an event loop.
+"""
+
+import selectors
+import socket
+
+from emex.compression import DEFAULT_THRESHOLD,frame_buffers,decode_header,decode_payload,check_frame_size
+
+
+class TransportClosedError(ConnectionError):
+    """The peer closed the connection."""
+    pass
+
+
+def _wait(sock, events, timeout):
+    with selectors.DefaultSelector() as selector:
+        selector.register(sock, events)
+
+        if not selector.select(timeout):
+            raise socket.timeout(f'timed out after {timeout} seconds waiting on socket')
+
+
+def recv_into_exactly(sock, buf, timeout=None):
+    """Fill the writable buffer buf from sock.
+
+    timeout bounds each wait on a non-blocking socket, None waits
+    indefinitely."""
+    with memoryview(buf) as view:
+        offset = 0
+
+        while offset < len(view):
+            try:
+                received = sock.recv_into(view[offset:])
+
+            except (BlockingIOError, InterruptedError):
+                _wait(sock, selectors.EVENT_READ, timeout)
+
+                continue
+
+            if not received:
+                raise TransportClosedError(f'connection closed with '
+                                           f'{len(view) - offset} bytes outstanding')
+
+            offset += received
+
+
+def send_buffers(sock, buffers, timeout=None):
+    """Send all of buffers, in order, with sendmsg scatter-gather."""
+    views = [memoryview(buf).cast('B') for buf in buffers if len(buf)]
+
+    while views:
+        try:
+            sent = sock.sendmsg(views)
+
+        except (BlockingIOError, InterruptedError):
+            _wait(sock, selectors.EVENT_WRITE, timeout)
+
+            continue
+
+        # drop the buffers that were sent and trim a partially sent one
+        while sent:
+            if sent >= len(views[0]):
+                sent -= len(views[0])
+
+                views.pop(0)
+            else:
+                views[0] = views[0][sent:]
+
+                sent = 0
+
+
+def send_frame(sock, payload, codec=None, threshold=DEFAULT_THRESHOLD, timeout=None):
+    """Send payload as one frame, compressed with codec when it is at
+    least threshold bytes."""
+    send_buffers(sock, frame_buffers(payload, codec, threshold), timeout)
+
+
+def recv_frame(sock, timeout=None):
+    """Receive one frame from sock and return its message."""
+    header = bytearray(4)
+
+    recv_into_exactly(sock, header, timeout)
+
+    count,compressed = decode_header(header)
+
+    check_frame_size(count)
+
+    payload = bytearray(count)
+
+    recv_into_exactly(sock, payload, timeout)
+
+    return bytes(decode_payload(payload, compressed))
+
+
+class FrameReader:
+    """Reassemble frames from a socket that is polled by an event loop.
+
+    Call recv when the socket is readable. It reads the data available
+    into a buffer that grows to hold the largest frame seen and returns
+    the messages completed by it.
+    """
+    def __init__(self, size=65536):
+        self._buffer = bytearray(size)
+
+        self._length = 0
+
+
+    def recv(self, sock):
+        """Read from sock and return the list of complete messages.
+
+        A non-blocking socket is read until it has no more data, a
+        blocking socket is read once. Raises TransportClosedError when
+        the peer has closed the connection."""
+        while True:
+            if self._length == len(self._buffer):
+                self._buffer.extend(bytes(len(self._buffer)))
+
+            try:
+                with memoryview(self._buffer) as view:
+                    received = sock.recv_into(view[self._length:])
+
+            except (BlockingIOError, InterruptedError):
+                break
+
+            if not received:
+                raise TransportClosedError('connection closed')
+
+            self._length += received
+
+            if sock.getblocking():
+                break
+
+        return self._extract()
+
+
+    def _extract(self):
+        messages = []
+
+        offset = 0
+
+        with memoryview(self._buffer) as view:
+            while self._length - offset >= 4:
+                count,compressed = decode_header(view[offset:offset+4])
+
+                check_frame_size(count)
+
+                if count > self._length - offset - 4:
+                    break
+
+                messages.append(
+                    bytes(decode_payload(view[offset+4:offset+4+count], compressed)))
+
+                offset += count + 4
+
+            pending = count + 4 if self._length - offset >= 4 else 0
+
+        # move any partial frame to the front of the buffer, and make
+        # room for all of it
+        if offset:
+            self._buffer[:self._length-offset] = self._buffer[offset:self._length]
+
+            self._length -= offset
+
+        if pending > len(self._buffer):
+            self._buffer.extend(bytes(pending - len(self._buffer)))
+
+        return messages
@@ -34,10 +34,17 @@ from collections import defaultdict,namedtuple
 import logging
 import os
 
-from yaml import safe_load
+import yaml
+
+# libyaml is much faster than the pure python loader
+try:
+    from yaml import CSafeLoader as SafeLoader
+except ImportError:
+    from yaml import SafeLoader
 
 import emex.data.yml
-import emex.emexd_pb2 as emexd_pb2
+from emex.modelsnapshot import model_files,source_signature,default_snapshot_path
+from emex.modelsnapshot import load_snapshot,write_snapshot
 from emex.platformtemplate import PlatformTemplate
 from emex.antennatype import AntennaType
 from emex.platformtype import PlatformType
@@ -89,7 +96,9 @@ def platformtypes():
     return platformtypes_dict
 
 
-def _load_yml():
+def model_paths():
+    """Return the directories searched for yml model definitions:
+    EMEXPATH when set, otherwise the installed emex.data.yml."""
     emexpath = os.environ.get('EMEXPATH')
 
     platforms_paths = []
@@ -99,48 +108,101 @@ def _load_yml():
     else:
         platforms_paths.extend(emex.data.yml.__path__)
 
-    # Load all .yml/.yaml files found in the EMEXPATH tree and
-    # organize by type
-    ymls = defaultdict(lambda: {})
-
     logging.info(f'search platforms_paths {platforms_paths} for yml definitions')
 
     for platforms_path in platforms_paths:
         if not os.path.isdir(platforms_path):
             raise RuntimeError(f'Platforms path "{platforms_path}" does not exist or '
                                'is not a directory. Quitting.')
-        logging.debug(f'YML platforms_path={platforms_path}')
 
-        for dirname, _, filenames in os.walk(platforms_path):
-            yml_files = [os.path.join(dirname, f) for f in filenames
-                         if f.split('.')[-1].lower() in ['yml', 'yaml']]
+    return platforms_paths
+
+
+def _load_yml():
+    """
+    Load the models from the snapshot when it is current with
+    the yml files, otherwise parse the yml files and write a new
+    snapshot for the next start.
+    """
+    platforms_paths = model_paths()
+
+    yml_files = model_files(platforms_paths)
+
+    signature = source_signature(yml_files)
+
+    snapshot_path = default_snapshot_path(platforms_paths)
+
+    models = load_snapshot(snapshot_path, signature)
+
+    if not models:
+        models = _parse_yml(yml_files)
+
+        write_snapshot(snapshot_path, signature, models)
 
-            for yml_file in yml_files:
-                yml = safe_load(open(yml_file))
+    platformtemplates_dict.update(models['platformtemplates'])
+    platformtypes_dict.update(models['platformtypes'])
+    waveformtypes_dict.update(models['waveformtypes'])
+    antennatypes_dict.update(models['antennatypes'])
 
-                logging.debug(f'loading yml_file {yml_file}')
 
-                ymls[yml['type']][yml['name']] = yml
+def build_model_snapshot(snapshot_path=None):
+    """
+    Parse the model yml files and unconditionally write the snapshot.
+    Return the snapshot path and whether it was written.
+    """
+    platforms_paths = model_paths()
+
+    yml_files = model_files(platforms_paths)
+
+    if not snapshot_path:
+        snapshot_path = default_snapshot_path(platforms_paths)
+
+    models = _parse_yml(yml_files)
+
+    return snapshot_path,write_snapshot(snapshot_path, source_signature(yml_files), models)
+
+
+def _parse_yml(yml_files):
+    # Load all .yml/.yaml files found in the EMEXPATH tree and
+    # organize by type
+    ymls = defaultdict(lambda: {})
+
+    for yml_file in yml_files:
+        logging.debug(f'loading yml_file {yml_file}')
+
+        with open(yml_file) as yfd:
+            yml = yaml.load(yfd, Loader=SafeLoader)
+
+        ymls[yml['type']][yml['name']] = yml
+
+    models = {
+        'platformtemplates': {},
+        'platformtypes': {},
+        'waveformtypes': {},
+        'antennatypes': {}
+    }
 
     # instantiate antenna type classes
     for name, template_yml in ymls['antenna'].items():
-        antennatypes_dict[name] = AntennaType(template_yml)
+        models['antennatypes'][name] = AntennaType(template_yml)
 
     # instantiate waveformtypes from templates
     for name, waveform_yml in ymls['waveform'].items():
-        waveformtypes_dict[name] = WaveformType(waveform_yml)
+        models['waveformtypes'][name] = WaveformType(waveform_yml)
     for name, waveform_yml in ymls['host'].items():
-        waveformtypes_dict[name] = WaveformType(waveform_yml)
+        models['waveformtypes'][name] = WaveformType(waveform_yml)
 
     # instantiate platform template classes
     for name, template_yml in ymls['platform_template'].items():
-        platformtemplates_dict[name] = PlatformTemplate(template_yml)
+        models['platformtemplates'][name] = PlatformTemplate(template_yml)
 
     # instantiate platformtypes from templates
     for name, platform_yml in ymls['platform'].items():
         platform_template_name = platform_yml['from']['template']
 
-        template = platformtemplates_dict[platform_template_name]
+        template = models['platformtemplates'][platform_template_name]
 
-        platformtypes_dict[name] = \
+        models['platformtypes'][name] = \
             PlatformType(template.build_config(platform_yml, ymls))
+
+    return models
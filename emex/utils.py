@@ -31,14 +31,21 @@
 # See toplevel COPYING for more information.
 
 from collections import defaultdict,namedtuple
+import fcntl
 import importlib
 import os
 import pkgutil
+import shutil
 import socket
-import struct
 import logging
 
 import emex.data
+from emex.compression import DEFAULT_THRESHOLD
+from emex.transport import send_frame,recv_frame
+
+
+# linux ioctl request to clone (reflink) the data of one file to another
+FICLONE = 0x40049409
 
 
 def line_breaker(line, width):
@@ -241,29 +248,14 @@ def load_monitor(monitor_name):
     return None
 
 
-def sock_send_string(sock, in_string):
+def sock_send_string(sock, in_string, codec=None, threshold=DEFAULT_THRESHOLD):
     logging.debug(f'sock_send_string {len(in_string)}')
 
-    format_str = '!I%ds' % len(in_string)
-
-    bufstr = struct.pack(format_str, len(in_string), in_string)
-
-    sock.send(bufstr)
+    send_frame(sock, in_string, codec, threshold)
 
 
 def sock_recv_string(sock):
-    (count,) = struct.unpack('!I', sock.recv(4))
-
-    bufstr = bytes()
-
-    while len(bufstr) < count:
-        logging.debug(f'sock_recv_string {count-len(bufstr)}')
-        try:
-            bufstr += sock.recv(count-len(bufstr))
-        except BlockingIOError as be:
-            logging.error(f'BlockingIOError in sock_recv_string count={count}: "{be}"')
-
-    return struct.unpack(f'{count}s', bufstr)[0]
+    return recv_frame(sock)
 
 
 def get_emex_data_resource_file_path(resource):
@@ -278,3 +270,31 @@ def get_emex_data_resource_paths(resource):
     return list(
         filter(os.path.exists,
                [os.path.join(path, resource) for path in emex.data.__path__]))
+
+
+def link_or_copy(srcfile, dstfile):
+    """
+    Materialize srcfile at dstfile as cheaply as possible - as a hardlink
+    when srcfile and dstfile are on the same filesystem, as a reflink
+    (copy on write clone) where the filesystem supports it, and as
+    a full copy otherwise. Linked files share content with srcfile
+    and must not be modified in place.
+    """
+    try:
+        os.link(srcfile, dstfile)
+
+        return
+    except OSError:
+        pass
+
+    try:
+        with open(srcfile, 'rb') as sfd, open(dstfile, 'wb') as dfd:
+            fcntl.ioctl(dfd.fileno(), FICLONE, sfd.fileno())
+
+        shutil.copystat(srcfile, dstfile)
+
+        return
+    except OSError:
+        pass
+
+    shutil.copy2(srcfile, dstfile)
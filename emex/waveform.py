@@ -85,7 +85,7 @@ class Waveform:
     def to_protobuf(self, waveform_proto):
         waveform_proto.type = self.type
 
-        for group_name, param_group in self.user_config.items():
+        for group_name, param_group in self._user_config.items():
             param_group_proto = waveform_proto.param_groups.add()
 
             param_group_proto.group = group_name
@@ -105,7 +105,7 @@ class Waveform:
                 valuelist = param.default
 
                 if not valuelist:
-                    uservalue = self.user_config.get(group_name, {}).get(name, [])
+                    uservalue = self._user_config.get(group_name, {}).get(name, [])
 
                     if not uservalue:
                         raise ValueError(f'Error: {group_name} "{name}" parameter value '
@@ -126,7 +126,7 @@ class Waveform:
 
                 value_str = ",".join(map(str, values))
 
-                user_values = self.user_config.get(group_name, {}).get(param_name, [])
+                user_values = self._user_config.get(group_name, {}).get(param_name, [])
 
                 if user_values:
                     value_str = f'{",".join(user_values)}*'
@@ -30,7 +30,6 @@
 #
 # See toplevel COPYING for more information.
 
-import copy
 from emex.utils import line_breaker
 from emex.paramgrouptype import ParamGroupType
 
@@ -96,7 +95,7 @@ class WaveformType:
 
     @property
     def parameters(self):
-        return copy.deepcopy(self._parameters)
+        return dict(self._parameters)
 
 
     def to_protobuf(self, waveformtype_proto):
@@ -106,7 +105,7 @@ class WaveformType:
 
         waveformtype_proto.template = self.template
 
-        for group_name, param_group in self.parameters.items():
+        for group_name, param_group in self._parameters.items():
             paramgroup_type_proto = waveformtype_proto.paramgroup_types.add()
 
             paramgroup_type_proto.name = group_name
@@ -119,7 +118,7 @@ class WaveformType:
                 if paramtype:
                     param_default = paramtype.default
 
-                    if not isinstance(param_default, list):
+                    if not isinstance(param_default, (list, tuple)):
                         param_default = [param_default]
 
                     for default_value in param_default:
@@ -0,0 +1,297 @@
+# Copyright (c) 2023 - Adjacent Link LLC, Bridgewater, New Jersey
+# All rights reserved.
+#
+# Redistribution and use in source and binary forms, with or without
+# modification, are permitted provided that the following conditions
+# are met:
+#
+# * Redistributions of source code must retain the above copyright
+#   notice, this list of conditions and the following disclaimer.
+# * Redistributions in binary form must reproduce the above copyright
+#   notice, this list of conditions and the following disclaimer in
+#   the documentation and/or other materials provided with the
+#   distribution.
+# * Neither the name of Adjacent Link LLC nor the names of its
+#   contributors may be used to endorse or promote products derived
+#   from this software without specific prior written permission.
+#
+# THIS SOFTWARE IS PROVIDED BY THE COPYRIGHT HOLDERS AND CONTRIBUTORS
+# "AS IS" AND ANY EXPRESS OR IMPLIED WARRANTIES, INCLUDING, BUT NOT
+# LIMITED TO, THE IMPLIED WARRANTIES OF MERCHANTABILITY AND FITNESS
+# FOR A PARTICULAR PURPOSE ARE DISCLAIMED. IN NO EVENT SHALL THE
+# COPYRIGHT OWNER OR CONTRIBUTORS BE LIABLE FOR ANY DIRECT, INDIRECT,
+# INCIDENTAL, SPECIAL, EXEMPLARY, OR CONSEQUENTIAL DAMAGES (INCLUDING,
+# BUT NOT LIMITED TO, PROCUREMENT OF SUBSTITUTE GOODS OR SERVICES;
+# LOSS OF USE, DATA, OR PROFITS; OR BUSINESS INTERRUPTION) HOWEVER
+# CAUSED AND ON ANY THEORY OF LIABILITY, WHETHER IN CONTRACT, STRICT
+# LIABILITY, OR TORT (INCLUDING NEGLIGENCE OR OTHERWISE) ARISING IN
+# ANY WAY OUT OF THE USE OF THIS SOFTWARE, EVEN IF ADVISED OF THE
+# POSSIBILITY OF SUCH DAMAGE.
+#
+# See toplevel COPYING for more information.
+
+from queue import Queue
+import logging
+import os
+import shutil
+import stat
+import tarfile
+from threading import Thread
+import time
+import traceback
+
+
+def throttled_rmtree(path, rate_mbps=0):
+    """Remove the directory tree at path, bottom up, limiting the
+    removal rate to approximately rate_mbps megabytes per second.
+    A rate of 0 removes the tree without throttling.
+
+    Each removed entry is charged at least one filesystem block so
+    that trees with many small files are also paced.
+    """
+    if not rate_mbps:
+        shutil.rmtree(path, ignore_errors=True)
+
+        return
+
+    bytes_per_second = rate_mbps * 1024 * 1024
+
+    removed_bytes = 0
+
+    start_time = time.monotonic()
+
+    def _pace(num_bytes):
+        nonlocal removed_bytes
+
+        removed_bytes += max(num_bytes, 4096)
+
+        ahead = removed_bytes / bytes_per_second - (time.monotonic() - start_time)
+
+        if ahead > 0:
+            time.sleep(ahead)
+
+    for dirpath, dirnames, filenames in os.walk(path, topdown=False):
+        for filename in filenames:
+            filepath = os.path.join(dirpath, filename)
+
+            try:
+                num_bytes = os.lstat(filepath).st_size
+
+                os.unlink(filepath)
+
+                _pace(num_bytes)
+            except OSError as e:
+                logging.warning(f'unable to remove "{filepath}": {e}')
+
+        for dirname in dirnames:
+            dirpath_sub = os.path.join(dirpath, dirname)
+
+            try:
+                if os.path.islink(dirpath_sub):
+                    os.unlink(dirpath_sub)
+                else:
+                    os.rmdir(dirpath_sub)
+
+                _pace(0)
+            except OSError as e:
+                logging.warning(f'unable to remove "{dirpath_sub}": {e}')
+
+    try:
+        os.rmdir(path)
+    except OSError as e:
+        logging.warning(f'unable to remove "{path}": {e}')
+
+
+def hand_back_tree(path):
+    """Change the owner of every entry below path to the owner of path.
+
+    Run from within an EMOE container, where files are created
+    by root, to return ownership of the EMOE directory to the
+    emexd user so that it can be removed or archived later
+    without elevated privileges.
+    """
+    path_stat = os.stat(path)
+
+    uid = path_stat.st_uid
+
+    gid = path_stat.st_gid
+
+    for dirpath, dirnames, filenames in os.walk(path):
+        for name in dirnames + filenames:
+            entrypath = os.path.join(dirpath, name)
+
+            try:
+                entry_stat = os.lstat(entrypath)
+
+                if entry_stat.st_uid != uid or entry_stat.st_gid != gid:
+                    os.lchown(entrypath, uid, gid)
+
+                if not stat.S_ISLNK(entry_stat.st_mode):
+                    os.chmod(entrypath, entry_stat.st_mode | stat.S_IRUSR | stat.S_IWUSR)
+            except OSError as e:
+                logging.warning(f'unable to hand back "{entrypath}": {e}')
+
+
+class WorkdirCleaner(Thread):
+    """Delete or archive EMOE directories in a separate thread.
+
+    Removing a large EMOE directory can take seconds to minutes.
+    Doing so in the main emexd waveform_resource thread makes
+    emexd unresponsive to clients while the removal lasts. The
+    Manager queues finished EMOE directories here instead.
+
+    Deletion is paced by the emexdirectory-cleanup delete-rate.
+    When the emexdirectory action is "archive", each directory
+    is written to a single tar archive in the archive directory,
+    compressed with zstd when the zstandard module is available
+    and gzip otherwise, before it is removed. The oldest archives
+    are evicted whenever the total archive size exceeds the
+    configured limit.
+    """
+    ARCHIVE_SUFFIXES = ('.tar.zst', '.tar.gz')
+
+    def __init__(self, config):
+        super().__init__()
+        self._config = config
+        self._in_q = Queue()
+        self._zstd_warned = False
+
+
+    def delete(self, workdir):
+        self._in_q.put(('delete', workdir))
+
+
+    def archive(self, workdir):
+        self._in_q.put(('archive', workdir))
+
+
+    def run(self):
+        while True:
+            command,workdir = self._in_q.get()
+
+            logging.info(f'cleanup {command} {workdir} ({self._in_q.qsize()} queued)')
+
+            start_time = time.monotonic()
+
+            try:
+                if command == 'archive':
+                    if not self._archive(workdir):
+                        # leave the directory in place rather than lose it
+                        continue
+
+                throttled_rmtree(workdir, self._config.cleanup_delete_rate)
+
+                logging.info(f'cleanup {command} {workdir} done in '
+                             f'{time.monotonic()-start_time:.1f} seconds')
+            except:
+                logging.error(f'cleanup {command} {workdir} failed: '
+                              f'{traceback.format_exc()}')
+
+
+    def _archive(self, workdir):
+        archivedir = self._config.archive_directory
+
+        os.makedirs(archivedir, exist_ok=True)
+
+        name = os.path.basename(os.path.normpath(workdir))
+
+        compression = self._config.archive_compression
+
+        zstandard = None
+
+        if compression == 'zstd':
+            try:
+                import zstandard
+            except ImportError:
+                if not self._zstd_warned:
+                    logging.warning('zstandard module not found, '
+                                    'archiving EMOE directories with gzip')
+                    self._zstd_warned = True
+
+        suffix = '.tar.zst' if zstandard else '.tar.gz'
+
+        archivefile = os.path.join(archivedir, name + suffix)
+
+        tmpfile = archivefile + '.part'
+
+        try:
+            with open(tmpfile, 'wb') as fd:
+                if zstandard:
+                    with zstandard.ZstdCompressor().stream_writer(fd) as zfd:
+                        with tarfile.open(fileobj=zfd, mode='w|') as tar:
+                            self._add_tree(tar, workdir, name)
+                else:
+                    with tarfile.open(fileobj=fd, mode='w:gz') as tar:
+                        self._add_tree(tar, workdir, name)
+
+            os.rename(tmpfile, archivefile)
+
+        except OSError as e:
+            logging.error(f'failed to archive {workdir} to {archivefile}: {e}')
+
+            if os.path.exists(tmpfile):
+                os.remove(tmpfile)
+
+            return False
+
+        logging.info(f'archived {workdir} to {archivefile} '
+                     f'({os.path.getsize(archivefile)} bytes)')
+
+        self._evict_archives(archivefile)
+
+        return True
+
+
+    def _add_tree(self, tar, workdir, name):
+        for dirpath, dirnames, filenames in os.walk(workdir):
+            relpath = os.path.relpath(dirpath, workdir)
+
+            for entry in [''] + sorted(dirnames + filenames):
+                if not entry and not relpath == '.':
+                    continue
+
+                entrypath = os.path.join(dirpath, entry) if entry else dirpath
+
+                arcname = os.path.normpath(os.path.join(name, relpath, entry))
+
+                try:
+                    tar.add(entrypath, arcname=arcname, recursive=False)
+                except OSError as e:
+                    logging.warning(f'skipping "{entrypath}" in archive: {e}')
+
+
+    def _evict_archives(self, newest):
+        limit_bytes = self._config.archive_limit * 1024 * 1024
+
+        archives = []
+
+        total_bytes = 0
+
+        with os.scandir(self._config.archive_directory) as it:
+            for entry in it:
+                if not entry.is_file() or not entry.name.endswith(WorkdirCleaner.ARCHIVE_SUFFIXES):
+                    continue
+
+                entry_stat = entry.stat()
+
+                total_bytes += entry_stat.st_size
+
+                archives.append((entry_stat.st_mtime, entry.path, entry_stat.st_size))
+
+        # evict oldest first, always keeping the archive just written
+        for _,path,num_bytes in sorted(archives):
+            if total_bytes <= limit_bytes:
+                break
+
+            if path == newest:
+                continue
+
+            logging.info(f'archive size {total_bytes} exceeds limit {limit_bytes}, '
+                         f'evicting {path}')
+
+            try:
+                os.remove(path)
+
+                total_bytes -= num_bytes
+            except OSError as e:
+                logging.warning(f'unable to evict archive "{path}": {e}')
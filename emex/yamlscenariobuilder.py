@@ -217,6 +217,11 @@ class YamlScenarioBuilder:
                     rfpipe-001  90.0 0.0
                     rfpipe-003   0.0 0.0
                     rfpipe-004  45.0 0.0
+                pathloss_model: freespace 2347000000
+
+            pathloss_model (freespace or 2ray, and frequency in Hz)
+            is optional and assigns pathloss computed from the POVs
+            to every pair of platforms without a listed pathloss.
         """
         if not initial_conditions_dict:
             return {}
@@ -227,6 +232,11 @@ class YamlScenarioBuilder:
         # then initial Pathlosses
         pathlosses = self._unpack_pathlosses(initial_conditions_dict)
 
+        pathloss_model = initial_conditions_dict.get('pathloss_model', None)
+
+        if pathloss_model:
+            self._add_model_pathlosses(pathloss_model, povs, pathlosses)
+
         # and antenna pointings
         antenna_pointings = \
             self._unpack_antenna_pointings(initial_conditions_dict)
@@ -533,6 +543,56 @@ class YamlScenarioBuilder:
         return pathlosses
 
 
+    def _add_model_pathlosses(self, pathloss_model, povs, pathlosses):
+        # numpy is only needed when a scenario asks for model pathlosses
+        from emex.initialconditionmatrix import InitialConditionMatrix
+
+        toks = pathloss_model.split()
+
+        if not len(toks) == 2:
+            raise EmoeError(f'pathloss_model "{pathloss_model}" must be '
+                            f'"freespace|2ray FREQUENCY_HZ"')
+
+        model = toks[0]
+
+        frequency_hz = float(toks[1])
+
+        plt_names = sorted(povs.keys())
+
+        # a listed pathloss applies in both directions
+        listed_pairs = set([frozenset((plt_name,pl.remote_platform))
+                            for plt_name,entries in pathlosses.items()
+                            for pl in entries])
+
+        # one row per platform, the matrix ids are platform numbers
+        ic_matrix = \
+            InitialConditionMatrix({plt_name:[number]
+                                    for number,plt_name in enumerate(plt_names, start=1)},
+                                   [InitialCondition(plt_name, povs[plt_name])
+                                    for plt_name in plt_names])
+
+        try:
+            ic_matrix.pathloss_from_povs(model, frequency_hz)
+        except ValueError as ve:
+            raise EmoeError(str(ve))
+
+        for number,remote_numbers,values in ic_matrix.pathloss_rows():
+            plt_name = plt_names[number-1]
+
+            for remote_number,value in zip(remote_numbers, values):
+                rmt_plt_name = plt_names[remote_number-1]
+
+                # each pair once, in the same direction as listed pathlosses
+                if remote_number < number:
+                    continue
+
+                if frozenset((plt_name,rmt_plt_name)) in listed_pairs:
+                    continue
+
+                pathlosses.setdefault(plt_name, []).append(
+                    Pathloss(rmt_plt_name, round(value, 1)))
+
+
     def _parse_pathloss(self, tokens):
         """
             rfpipe-001  rfpipe-002:90 rfpipe-003:120 rfpipe-004:90  sensor-001:80
@@ -47,11 +47,23 @@ import subprocess
 import time
 
 
+from emex.compression import (
+    DEFAULT_THRESHOLD,
+    FrameError,
+    available_codecs,
+    parse_codecs,
+    negotiate,
+    encode_frame,
+    split_frames
+)
 from emex.emoestate import EmoeState
+from emex.emoemessages import ProgramRequestType,ProgramEventResult,ProgramStatus
 from emex.emexcontainer_pb2 import ContainerControlMessage,ContainerStateMessage
 from waveform_resource.interface.plugin import Plugin as BasePlugin
 from emex.scenarioservermessagehandler import ScenarioServerMessageHandler
 from emex.scenariomanager import ScenarioManager
+from emex.scenarioclients import ScenarioClients
+from emex.mgensocketwatcher import MgenSocketWatcher
 
 
 class Plugin(BasePlugin):
@@ -59,6 +71,12 @@ class Plugin(BasePlugin):
     DEFAULT_ETCE_STATUSMCAST_PORT = 48101
     DEFAULT_ETCE_STATUSMCAST_DEVICE = 'lo'
     DEFAULT_EMEX_SCENARIO_LISTEN_PORT = 3000
+    DEFAULT_HEARTBEAT_PERIOD = 5.0
+
+    # loopback endpoint where the MgenSocketWatcher reports new
+    # mgen sockets to the event loop
+    MGEN_WATCHER_ADDRESS = '127.0.0.1'
+    MGEN_WATCHER_PORT = 49903
 
 
     def initialize(self, ctx, configuration_file):
@@ -95,6 +113,10 @@ class Plugin(BasePlugin):
             int(os.environ.get('EMEX_SCENARIO_LISTEN_PORT',
                                Plugin.DEFAULT_EMEX_SCENARIO_LISTEN_PORT))
 
+        self._heartbeat_period = \
+            float(os.environ.get('EMEX_HEARTBEAT_PERIOD',
+                                 Plugin.DEFAULT_HEARTBEAT_PERIOD))
+
         self._service_endpoint = (emexd_address, int(emexd_port))
 
         self._emoe_id = os.environ['EMOE_ID']
@@ -113,7 +135,22 @@ class Plugin(BasePlugin):
 
         self._emexd_channel_id = None
 
-        self._cache_data = ''
+        # codecs this container may use to compress scenario replies
+        # and the minimum reply size that is compressed
+        self._compression_codecs = \
+            parse_codecs(os.environ.get('EMEX_COMPRESSION_CODECS',
+                                        ','.join(available_codecs())))
+
+        self._compression_threshold = \
+            int(os.environ.get('EMEX_COMPRESSION_THRESHOLD', DEFAULT_THRESHOLD))
+
+        self._scenario_clients = ScenarioClients()
+
+        # endpoints of scenario clients whose data could not be framed,
+        # their stream is out of sync so it is dropped until they close
+        self._failed_scenario_endpoints = set()
+
+        self._scenario_timer_pending = False
 
         logging.info(f'connecting to emexd at {emexd_address}:'
                      f'{emexd_port} with emoe_id {self._emoe_id}')
@@ -129,8 +166,6 @@ class Plugin(BasePlugin):
                                      device = etce_statusmcast_device,
                                      on_message = self._handle_etce_status_message)
 
-        self._scenario_channel_id = None
-
         ctx.create_channel_tcp_server(
             local=socket.gethostbyname(socket.gethostname()),
             local_port=emex_scenario_listen_port,
@@ -138,8 +173,24 @@ class Plugin(BasePlugin):
             on_message = self._handle_scenario_message,
             on_close = self._on_scenario_close)
 
+        ctx.create_channel_tcp_server(
+            local=Plugin.MGEN_WATCHER_ADDRESS,
+            local_port=Plugin.MGEN_WATCHER_PORT,
+            on_accept = self._log_mgen_watcher_accept,
+            on_message = self._handle_mgen_socket_event,
+            on_close = self._handle_mgen_watcher_close)
 
-        ctx.create_timer(time.time()+5, self._handle_heartbeat_timer)
+        ctx.create_timer(time.time()+self._heartbeat_period, self._handle_heartbeat_timer)
+
+        self._mgen_watcher = None
+
+        # (step, seconds) for each startup step after the START
+        # command, reported to emexd with the RUNNING state
+        self._startup_steps = []
+
+        self._startup_mark = None
+
+        self._startup_reported = False
 
         self._run_process = None
 
@@ -206,6 +257,16 @@ class Plugin(BasePlugin):
         if detail:
             message.message = detail
 
+        if self._state == EmoeState.RUNNING and not self._startup_reported:
+            for step,seconds in self._startup_steps:
+                startup_step = message.startup_steps.add()
+
+                startup_step.name = step
+
+                startup_step.seconds = seconds
+
+            self._startup_reported = True
+
         message_str = message.SerializeToString()
 
         format_str = '!I%ds' % len(message_str)
@@ -278,65 +339,257 @@ class Plugin(BasePlugin):
             return
 
 
-        if etce_step.upper() == 'TRAFFIC.RUN':
-            if self._state == EmoeState.STARTING:
-                if self._sm.connect():
-                    self.change_state(EmoeState.RUNNING)
+        # the mgen sockets may be ready after any step, don't wait
+        # for the heartbeat to check
+        if self._state == EmoeState.STARTING:
+            self._mark_startup_step(f'etce.{etce_step.lower()}')
 
+            self._try_connect()
 
-    def _process_scenario_client_accept(self, ctx, channel_id, client_endpoint, **kwargs):
-        logging.debug(f'_process_scenario_client_accept')
 
-        # only allow a single scenario client at a a time
-        if not self._scenario_channel_id:
-            self._scenario_channel_id = channel_id
+    def _log_mgen_watcher_accept(self, ctx, channel_id, watcher_endpoint, **kwargs):
+        logging.debug(f'_log_mgen_watcher_accept on {channel_id}')
 
-            ip,port = client_endpoint
 
-            self._cache_data = ''
+    def _handle_mgen_watcher_close(self, ctx, channel_id, watcher_endpoint):
+        logging.debug(f'mgen watcher connection closed on channel {channel_id}')
 
-            logging.info(f'accept scenario client on channel_id: {channel_id} ' \
-                         f'endpoint: {ip}:{port}')
-        else:
-            ip,port = client_endpoint
 
-            logging.error(f'received connect from a second client on channel_id: {channel_id} ' \
-                          f'from endpoint: {ip}:{port}. Quitting.')
+    def _handle_mgen_socket_event(self, ctx, channel_id, data, remote):
+        logging.info(f'mgen sockets created: {data.decode().split()}')
 
-            self._handle_stop()
+        if self._state == EmoeState.STARTING:
+            self._try_connect()
+
+
+    def _try_connect(self):
+        if self._sm.connect():
+            self._mark_startup_step('mgen.connect')
+
+            self._stop_mgen_watcher()
+
+            self.change_state(EmoeState.RUNNING)
+
+
+    def _mark_startup_step(self, step):
+        now = time.monotonic()
+
+        self._startup_steps.append((step, now - self._startup_mark))
+
+        self._startup_mark = now
+
+
+    def _start_mgen_watcher(self):
+        worker_socket = socket.socket(socket.AF_INET, socket.SOCK_STREAM)
+
+        worker_socket.connect((Plugin.MGEN_WATCHER_ADDRESS, Plugin.MGEN_WATCHER_PORT))
+
+        self._mgen_watcher = MgenSocketWatcher(worker_socket)
+
+        self._mgen_watcher.start()
+
+
+    def _stop_mgen_watcher(self):
+        if self._mgen_watcher:
+            self._mgen_watcher.stop()
+
+            self._mgen_watcher = None
+
+
+    def _process_scenario_client_accept(self, ctx, channel_id, client_endpoint, **kwargs):
+        ip,port = client_endpoint
+
+        self._failed_scenario_endpoints.discard(client_endpoint)
+
+        self._scenario_clients.add(client_endpoint, channel_id)
+
+        logging.info(f'accept scenario client on channel_id: {channel_id} ' \
+                     f'endpoint: {ip}:{port} ({len(self._scenario_clients)} connected)')
 
 
     def _handle_scenario_message(self, ctx, channel_id, data, remote):
+        receive_time = time.time()
+
         logging.debug(f'_handle_scenario_message channel_id={channel_id} len(data)={len(data)}')
 
-        if not channel_id == self._scenario_channel_id:
-            logging.error(f'New channel_id {channel_id} does not match current client {self._scenario_channel_id}.')
+        if remote in self._failed_scenario_endpoints:
+            logging.debug(f'dropping {len(data)} bytes from failed scenario client {remote}')
+
+            return
+
+        client = self._scenario_clients.get(remote)
+
+        if not client:
+            logging.error(f'received scenario message from unknown client {remote}. ignoring.')
+
+            return
+
+        try:
+            messages,client.cache_data = split_frames(client.cache_data + data)
+
+        except FrameError as e:
+            logging.error(f'discarding data from scenario client {remote} until it '
+                          f'closes, removing client: {e}')
 
-        if self._cache_data:
-            data = self._cache_data + data
-            self._cache_data = ''
+            # discards its pending requests and stops its program timers
+            self._scenario_clients.remove(remote)
 
-        while data:
-            if len(data) < 4:
-                self._cache_data = data
-                return
+            self._failed_scenario_endpoints.add(remote)
+
+            return
 
-            (count,) = struct.unpack('!I', data[:4])
+        for request_str in messages:
+            client_sequence,requests,compression_codecs = \
+                self._scenario_message_handler.parse_client_request(request_str, receive_time)
 
-            if count > len(data[4:]):
-                self._cache_data = data
-                return
+            if compression_codecs and not client.codec:
+                client.codec = negotiate(compression_codecs, self._compression_codecs)
 
-            (request_str,) = struct.unpack('%ds' % count, data[4:count+4])
+                if client.codec:
+                    logging.info(f'compressing scenario replies to {remote} '
+                                 f'with {client.codec.name}')
 
-            client_sequence,requests = \
-                self._scenario_message_handler.parse_client_request(request_str)
+            logging.debug(f'received scenario request: remote={remote} '
+                          f'client_sequence={client_sequence}')
 
-            logging.debug(f'received scenario request: client_sequence={client_sequence}')
+            self._scenario_clients.enqueue(remote, client_sequence, requests)
 
-            self._sm.handle_requests(remote, client_sequence, requests)
+        self._schedule_scenario_requests(ctx)
+
+
+    def _schedule_scenario_requests(self, ctx):
+        # process queued requests from the timer, one per call, so that
+        # messages from other clients are read and queued in between
+        if self._scenario_timer_pending or not self._scenario_clients.has_requests():
+            return
 
-            data = data[count+4:]
+        self._scenario_timer_pending = True
+
+        ctx.create_timer(time.time(), self._handle_scenario_timer)
+
+
+    def _handle_scenario_timer(self, ctx, timer_id):
+        self._scenario_timer_pending = False
+
+        next_request = self._scenario_clients.next_request()
+
+        if next_request:
+            client,client_sequence,requests = next_request
+
+            if requests['program']:
+                self._handle_program_request(ctx, client, client_sequence, requests['program'])
+            else:
+                self._sm.handle_requests(client.endpoint, client_sequence, requests)
+
+        self._schedule_scenario_requests(ctx)
+
+
+    def _handle_program_request(self, ctx, client, client_sequence, program_request):
+        request_type,events = program_request
+
+        program = client.program
+
+        ok = True
+
+        if request_type == ProgramRequestType.LOAD:
+            program.load(client_sequence, events)
+
+            message = f'loaded {len(events)} events'
+
+        elif request_type == ProgramRequestType.MERGE:
+            program.merge(client_sequence, events)
+
+            message = f'merged {len(events)} events'
+
+        elif request_type == ProgramRequestType.PAUSE:
+            ok = program.pause()
+
+            message = f'paused at {program.elapsed():0.3f}'
+
+        elif request_type == ProgramRequestType.RESUME:
+            ok = program.resume()
+
+            message = f'resumed at {program.elapsed():0.3f}'
+
+        else:
+            pending = program.pending
+
+            ok = program.abort()
+
+            message = f'aborted with {pending} events pending'
+
+        if not ok:
+            message = f'cannot {request_type.name} program in state {program.state.name}'
+
+        logging.info(f'program {request_type.name} from {client.endpoint}: {message}')
+
+        self.send_result(client.endpoint,
+                         client_sequence,
+                         ok,
+                         message,
+                         None,
+                         ProgramStatus(program.state, [], program.pending))
+
+        self._schedule_program(ctx, client)
+
+
+    def _schedule_program(self, ctx, client):
+        delay = client.program.next_delay()
+
+        if delay is None:
+            return
+
+        generation = client.program.generation
+
+        ctx.create_timer(time.time()+delay,
+                         lambda ctx,timer_id: self._handle_program_timer(ctx, client, generation))
+
+
+    def _handle_program_timer(self, ctx, client, generation):
+        # ignore timers of closed clients and timers set before the
+        # program last changed, a newer timer is pending for those
+        if not self._scenario_clients.get(client.endpoint) is client or \
+           not client.program.generation == generation:
+            return
+
+        event = client.program.pop_due()
+
+        if event:
+            self._execute_program_event(client, event)
+
+        self._schedule_program(ctx, client)
+
+
+    def _execute_program_event(self, client, event):
+        program = client.program
+
+        executed_time = program.elapsed()
+
+        # the wall clock time the event was due, for its EventTiming
+        event.requests['scheduled_time'] = \
+            time.time() - (executed_time - event.scheduled_time)
+
+        event.requests['known_flows_version'] = client.flows_version
+
+        ok,message,flows,timing = self._sm.execute_requests(event.client_sequence, event.requests)
+
+        if not ok:
+            logging.warning(f'program event {event.event_index} from {client.endpoint} '
+                            f'failed: {message}')
+
+        event_result = ProgramEventResult(event.event_index,
+                                          ok,
+                                          message,
+                                          event.scheduled_time,
+                                          executed_time)
+
+        self.send_result(client.endpoint,
+                         event.client_sequence,
+                         ok,
+                         message,
+                         flows,
+                         ProgramStatus(program.state, [event_result], program.pending),
+                         timing)
 
 
     def _handle_start(self):
@@ -347,6 +600,10 @@ class Plugin(BasePlugin):
 
             return
 
+        self._startup_mark = time.monotonic()
+
+        self._start_mgen_watcher()
+
         # start containers and applications
         # etce-test run --kill none emex /tmp/etce/config/doc/hostfile /tmp/etce/config
         self._run_process = subprocess.Popen(shlex.split('/opt/run-etce.sh'),
@@ -371,6 +628,8 @@ class Plugin(BasePlugin):
         if self._state == EmoeState.STARTING or \
            self._state == EmoeState.RUNNING or \
            self._state == EmoeState.UPDATNG:
+            self._stop_mgen_watcher()
+
             self._stop_emulation()
 
             self.change_state(EmoeState.STOPPED)
@@ -386,8 +645,7 @@ class Plugin(BasePlugin):
         logging.info('heartbeat')
 
         if self._state == EmoeState.STARTING:
-            if self._sm.connect():
-                self.change_state(EmoeState.RUNNING)
+            self._try_connect()
 
         elif self._state == EmoeState.STOPPED:
             logging.info('heartbeat timer stopped on STOPPED')
@@ -397,36 +655,53 @@ class Plugin(BasePlugin):
         else:
             self._send_state()
 
-        ctx.create_timer(time.time()+5, self._handle_heartbeat_timer)
+        ctx.create_timer(time.time()+self._heartbeat_period, self._handle_heartbeat_timer)
 
 
-    def send_result(self, client_endpoint, client_sequence, result, message, flows_df):
+    def send_result(self, client_endpoint, client_sequence, result, message, flows,
+                    program_status=None, timing=None):
         logging.debug(f'send_traffic_result result={result} message={message}')
 
+        client = self._scenario_clients.get(client_endpoint)
+
+        if not client:
+            logging.info(f'scenario client {client_endpoint} closed before result for '
+                         f'client_sequence={client_sequence}. dropping.')
+
+            return
+
         reply_str =\
             self._scenario_message_handler.build_result(client_sequence,
                                                         result,
                                                         message,
-                                                        flows_df)
+                                                        flows,
+                                                        client.codec,
+                                                        client.next_sequence(),
+                                                        program_status,
+                                                        timing)
 
-        self._send_scenario_reply(client_endpoint, reply_str)
+        if flows:
+            client.flows_version = flows.version
 
+        self._send_scenario_reply(client, reply_str)
 
-    def _send_scenario_reply(self, client_endpoint, reply_str):
-        logging.debug(f'_send_scenario_reply {client_endpoint}')
 
-        format_str = '!I%ds' % len(reply_str)
+    def _send_scenario_reply(self, client, reply_str):
+        logging.debug(f'_send_scenario_reply {client.endpoint}')
 
-        message = struct.pack(format_str, len(reply_str), reply_str)
+        message = encode_frame(reply_str,
+                               client.codec,
+                               self._compression_threshold)
 
-        self._ctx.channel_send(self._scenario_channel_id, message, remote=client_endpoint)
+        self._ctx.channel_send(client.channel_id, message, remote=client.endpoint)
 
-        logging.debug(f'_send_scenario_reply {client_endpoint} sent')
+        logging.debug(f'_send_scenario_reply {client.endpoint} sent')
 
 
     def _on_scenario_close(self, ctx, channel_id, client_endpoint):
-        if self._scenario_channel_id:
-            logging.info(f'_on_scenario_close close channel_id={self._scenario_channel_id} '
-                         f'client_endpoint={client_endpoint}')
+        logging.info(f'_on_scenario_close close channel_id={channel_id} '
+                     f'client_endpoint={client_endpoint}')
+
+        self._failed_scenario_endpoints.discard(client_endpoint)
 
-            self._scenario_channel_id = None
+        self._scenario_clients.remove(client_endpoint)
@@ -38,7 +38,6 @@ of an EMEX client.
 from __future__ import absolute_import, division, print_function
 
 from collections import namedtuple
-import copy
 import logging
 import multiprocessing
 import os
@@ -51,10 +50,10 @@ from waveform_resource.interface.plugin import Plugin as BasePlugin
 
 import emex
 from emex.common_pb2 import PASS,FAIL
+from emex.compression import DEFAULT_THRESHOLD,FrameError,parse_codecs,negotiate,encode_frame,split_frames
 from emex import emexd_pb2
 from emex import emexcontainer_pb2
 from emex.manager import Manager
-from emex.emoe import Emoe
 from emex.emoestate import EmoeState
 from emex.utils import numstr_to_numlist
 
@@ -63,6 +62,9 @@ class Plugin(BasePlugin):
     CONTAINER_WORKER_ADDRESS = '127.0.0.1'
     CONTAINER_WORKER_PORT = 49900
 
+    BUILD_WORKER_ADDRESS = '127.0.0.1'
+    BUILD_WORKER_PORT = 49899
+
     # emexd will look at this location when the user does not specify a
     # configuration file. No configuration file is required.
     DEFAULT_CONFIGURATION_FILE = '/etc/emexd.xml'
@@ -98,6 +100,37 @@ class Plugin(BasePlugin):
 
     DEFAULT_NUM_CONTAINER_WORKERS = 1
 
+    # Default rate, in megabytes per second, at which EMOE directories
+    # are deleted. 0 deletes without throttling.
+    DEFAULT_CLEANUP_DELETE_RATE = 0
+
+    # Default location, compression and total size limit (megabytes)
+    # of EMOE directory archives.
+    DEFAULT_ARCHIVE_DIRECTORY = '/tmp/emex-archive'
+
+    DEFAULT_ARCHIVE_COMPRESSION = 'zstd'
+
+    DEFAULT_ARCHIVE_LIMIT = 10240
+
+    # Default number of processes used to render EMOE platform
+    # configurations. 1 renders in the emexd process.
+    DEFAULT_NUM_RENDER_WORKERS = 4
+
+    # Default number of threads that unpack and build EMOE
+    # configurations off of the event loop.
+    DEFAULT_NUM_BUILD_WORKERS = 2
+
+    # Default codecs, in order of preference, that emexd and
+    # emexcontainerd may negotiate to compress messages to clients
+    # that offer them, and the minimum size of a compressed message.
+    DEFAULT_COMPRESSION_CODECS = 'zstd,lz4,zlib'
+
+    DEFAULT_COMPRESSION_THRESHOLD = DEFAULT_THRESHOLD
+
+    # Default period, in seconds, of the EMOE container heartbeat. The
+    # container reports its state to emexd on each heartbeat.
+    DEFAULT_CONTAINER_HEARTBEAT_PERIOD = 5.0
+
     Config = namedtuple('Config', ['client_listen_address',
                                    'client_listen_port',
                                    'container_listen_address',
@@ -110,7 +143,16 @@ class Plugin(BasePlugin):
                                    'stop_all_containers',
                                    'emexdirectory_action',
                                    'container_datetime_tag_format',
-                                   'num_container_workers'])
+                                   'num_container_workers',
+                                   'cleanup_delete_rate',
+                                   'archive_directory',
+                                   'archive_compression',
+                                   'archive_limit',
+                                   'num_render_workers',
+                                   'num_build_workers',
+                                   'compression_codecs',
+                                   'compression_threshold',
+                                   'container_heartbeat_period'])
 
     def initialize(self, ctx, configuration_file):
         """Initializes the container daemon.
@@ -143,6 +185,13 @@ class Plugin(BasePlugin):
 
         self._client_cache_data = {}
 
+        # compression codec negotiated by each client
+        self._client_codecs = {}
+
+        # clients whose data could not be framed, their stream is out
+        # of sync so everything they send is dropped until they close
+        self._failed_clients = set()
+
         self._client_sockets = {}
 
         ctx.create_channel_tcp_server(
@@ -173,9 +222,17 @@ class Plugin(BasePlugin):
             on_message = self._process_container_worker_event,
             on_close = self._handle_container_worker_close)
 
+        ctx.create_channel_tcp_server(
+            local=Plugin.BUILD_WORKER_ADDRESS,
+            local_port=Plugin.BUILD_WORKER_PORT,
+            on_accept = self._log_build_worker_accept,
+            on_message = self._process_build_worker_event,
+            on_close = self._handle_build_worker_close)
+
         self._m = Manager(self,
                           self._config,
-                          (Plugin.CONTAINER_WORKER_ADDRESS, Plugin.CONTAINER_WORKER_PORT))
+                          (Plugin.CONTAINER_WORKER_ADDRESS, Plugin.CONTAINER_WORKER_PORT),
+                          (Plugin.BUILD_WORKER_ADDRESS, Plugin.BUILD_WORKER_PORT))
 
 
     def start(self,ctx):
@@ -236,34 +293,34 @@ class Plugin(BasePlugin):
 
         client_id = (channel_id, remote)
 
-        cache_data = self._client_cache_data.get(client_id, '')
+        if client_id in self._failed_clients:
+            logging.debug(f'dropping {len(data)} bytes from failed client {ip}:{port}')
 
-        if cache_data:
-            data = cache_data + data
-            self._client_cache_data[client_id] = ''
+            return
 
-        while data:
-            if len(data) < 4:
-                self._client_cache_data[client_id] = copy.copy(data)
+        cache_data = self._client_cache_data.get(client_id, b'')
 
-                return
+        try:
+            messages,self._client_cache_data[client_id] = split_frames(cache_data + data)
 
-            (count,) = struct.unpack('!I', data[:4])
+        except FrameError as e:
+            logging.error(f'discarding data from client {ip}:{port} until it '
+                          f'closes, resetting client: {e}')
 
-            if count > len(data[4:]):
-                self._client_cache_data[client_id] = copy.copy(data)
+            self._reset_client(ctx, channel_id, remote)
 
-                return
+            self._failed_clients.add(client_id)
 
-            (request_str,) = struct.unpack('%ds' % count, data[4:count+4])
+            return
 
+        for request_str in messages:
             request = emexd_pb2.ClientMessage()
 
             request.ParseFromString(request_str)
 
             logging.debug(f'process request channel_id: {channel_id} ' \
-                          f'remote: {ip}:{port} of {count} bytes and ' \
-                          f'message type {emexd_pb2.ClientMessage.MODEL_TYPES_REQUEST_TYPE}')
+                          f'remote: {ip}:{port} of {len(request_str)} bytes and ' \
+                          f'message type {request.type}')
 
             if request.type == emexd_pb2.ClientMessage.MODEL_TYPES_REQUEST_TYPE:
                 reply = self._handle_models_request()
@@ -280,20 +337,43 @@ class Plugin(BasePlugin):
             elif request.type == emexd_pb2.ClientMessage.STOP_EMOE_REQUEST_TYPE:
                 reply = self._handle_stop_emoe(client_id, request)
 
+            if request.compression_codecs:
+                self._negotiate_compression(client_id, request, reply)
+
             reply_str = reply.SerializeToString()
 
-            format_str = '!I%ds' % len(reply_str)
+            ctx.channel_send(channel_id,
+                             self._encode_client_frame(client_id, reply_str),
+                             remote=remote)
+
+
+    def _negotiate_compression(self, client_id, request, reply):
+        codec = negotiate(request.compression_codecs,
+                          self._config.compression_codecs)
 
-            bufstr = struct.pack(format_str, len(reply_str), reply_str)
+        if codec:
+            logging.info(f'compressing messages to client {client_id} with {codec.name}')
 
-            ctx.channel_send(channel_id, bufstr, remote=remote)
+            self._client_codecs[client_id] = codec
 
-            data = data[count+4:]
+            reply.compression_codec = codec.name
+
+
+    def _encode_client_frame(self, client_id, message_str):
+        return encode_frame(message_str,
+                            self._client_codecs.get(client_id),
+                            self._config.compression_threshold)
 
 
     def _reset_client(self, ctx, channel_id, client_endpoint):
         client_id = (channel_id, client_endpoint)
 
+        self._client_cache_data.pop(client_id, None)
+
+        self._client_codecs.pop(client_id, None)
+
+        self._failed_clients.discard(client_id)
+
         self._m.reset_client(client_id)
 
 
@@ -331,6 +411,24 @@ class Plugin(BasePlugin):
 
         num_container_workers = Plugin.DEFAULT_NUM_CONTAINER_WORKERS
 
+        cleanup_delete_rate = Plugin.DEFAULT_CLEANUP_DELETE_RATE
+
+        archive_directory = Plugin.DEFAULT_ARCHIVE_DIRECTORY
+
+        archive_compression = Plugin.DEFAULT_ARCHIVE_COMPRESSION
+
+        archive_limit = Plugin.DEFAULT_ARCHIVE_LIMIT
+
+        num_render_workers = Plugin.DEFAULT_NUM_RENDER_WORKERS
+
+        num_build_workers = Plugin.DEFAULT_NUM_BUILD_WORKERS
+
+        compression_codecs = parse_codecs(Plugin.DEFAULT_COMPRESSION_CODECS)
+
+        compression_threshold = Plugin.DEFAULT_COMPRESSION_THRESHOLD
+
+        container_heartbeat_period = Plugin.DEFAULT_CONTAINER_HEARTBEAT_PERIOD
+
         if not configuration_file:
             config = Plugin.Config(client_listen_address,
                                    client_listen_port,
@@ -344,7 +442,16 @@ class Plugin(BasePlugin):
                                    stop_all_containers,
                                    emexdirectory_action,
                                    container_datetime_tag_format,
-                                   num_container_workers)
+                                   num_container_workers,
+                                   cleanup_delete_rate,
+                                   archive_directory,
+                                   archive_compression,
+                                   archive_limit,
+                                   num_render_workers,
+                                   num_build_workers,
+                                   compression_codecs,
+                                   compression_threshold,
+                                   container_heartbeat_period)
 
             self._log_config(config)
 
@@ -460,6 +567,47 @@ class Plugin(BasePlugin):
         if num_container_workers_elems:
             num_container_workers = int(num_container_workers_elems[0].get('count'))
 
+        cleanup_elems = root.xpath('/emexd/emexdirectory-cleanup')
+
+        if cleanup_elems:
+            cleanup_delete_rate = \
+                int(cleanup_elems[0].get('delete-rate', cleanup_delete_rate))
+
+            archive_directory = \
+                cleanup_elems[0].get('archive-directory', archive_directory)
+
+            archive_compression = \
+                cleanup_elems[0].get('archive-compression', archive_compression)
+
+            archive_limit = \
+                int(cleanup_elems[0].get('archive-limit', archive_limit))
+
+        num_render_workers_elems = root.xpath('/emexd/render-workers')
+
+        if num_render_workers_elems:
+            num_render_workers = int(num_render_workers_elems[0].get('count'))
+
+        num_build_workers_elems = root.xpath('/emexd/build-workers')
+
+        if num_build_workers_elems:
+            num_build_workers = int(num_build_workers_elems[0].get('count'))
+
+        compression_elems = root.xpath('/emexd/compression')
+
+        if compression_elems:
+            compression_codecs = \
+                parse_codecs(compression_elems[0].get('codecs',
+                                                      Plugin.DEFAULT_COMPRESSION_CODECS))
+
+            compression_threshold = \
+                int(compression_elems[0].get('threshold', compression_threshold))
+
+        container_heartbeat_elems = root.xpath('/emexd/container-heartbeat')
+
+        if container_heartbeat_elems:
+            container_heartbeat_period = \
+                float(container_heartbeat_elems[0].get('period'))
+
         config = Plugin.Config(client_listen_address,
                                client_listen_port,
                                container_listen_address,
@@ -472,7 +620,16 @@ class Plugin(BasePlugin):
                                stop_all_containers,
                                emexdirectory_action,
                                container_datetime_tag_format,
-                               num_container_workers)
+                               num_container_workers,
+                               cleanup_delete_rate,
+                               archive_directory,
+                               archive_compression,
+                               archive_limit,
+                               num_render_workers,
+                               num_build_workers,
+                               compression_codecs,
+                               compression_threshold,
+                               container_heartbeat_period)
 
         self._log_config(config)
 
@@ -508,16 +665,27 @@ class Plugin(BasePlugin):
 
         logging.info(f'num_container_workers={config.num_container_workers}')
 
+        logging.info(f'cleanup_delete_rate={config.cleanup_delete_rate}')
 
-    def _unpack_emoe(self, emoe_proto):
-        platformtypes,antennatypes = self._m.get_models()
+        logging.info(f'archive_directory={config.archive_directory}')
+
+        logging.info(f'archive_compression={config.archive_compression}')
 
-        # this implicitly checks that
-        # all platforms have an ok number of waveforms
-        # all waveform parameters have an assigned value
-        return Emoe.from_protobuf(emoe_proto,
-                                  antennatypes,
-                                  platformtypes)
+        logging.info(f'archive_limit={config.archive_limit}')
+
+        logging.info(f'num_render_workers={config.num_render_workers}')
+
+        logging.info(f'num_build_workers={config.num_build_workers}')
+
+        logging.info(f'compression_codecs={config.compression_codecs}')
+
+        logging.info(f'compression_threshold={config.compression_threshold}')
+
+        logging.info(f'container_heartbeat_period={config.container_heartbeat_period}')
+
+
+    def _unpack_emoe(self, emoe_proto):
+        return self._m.unpack_emoe(emoe_proto)
 
 
     def _handle_models_request(self):
@@ -588,21 +756,10 @@ class Plugin(BasePlugin):
 
         reply.type = emexd_pb2.ServerMessage.START_EMOE_REPLY_TYPE
 
-        ok = True
-
-        message = 'ok'
-
-        try:
-            emoe = self._unpack_emoe(request.startEmoeRequest.emoe)
-
-            ok,message,emoe_rt = self._m.start_emoe(client_id,
-                                                    emoe,
-                                                    self._config.container_listen_address,
-                                                    self._config.container_listen_port)
-        except Exception as e:
-            ok = False
-            logging.error(traceback.format_exc())
-            message = str(e)
+        # the emoe is unpacked and built on a build worker thread, the
+        # outcome is reported through subsequent state transitions
+        ok,message,emoe_id = self._m.queue_emoe(client_id,
+                                                request.startEmoeRequest.emoe)
 
         reply.startEmoeReply.emoe_name = emoe_name
 
@@ -611,10 +768,12 @@ class Plugin(BasePlugin):
         reply.startEmoeReply.message = message
 
         if ok:
-            reply.startEmoeReply.handle = str(emoe_rt.emoe_id)
+            reply.startEmoeReply.handle = str(emoe_id)
+
+            reply.startEmoeReply.state = EmoeState.QUEUED.value
 
             logging.info(f'sending startEmoeReply PASS for emoe '
-                         f'name:{emoe_rt.emoe.name} handle:{emoe_rt.emoe_id}')
+                         f'name:{emoe_name} handle:{emoe_id}')
         else:
             logging.info(f'sending startEmoeReply FAIL for emoe '
                          f'name:{emoe_name}')
@@ -655,10 +814,37 @@ class Plugin(BasePlugin):
 
                 emoe_accessor_proto.port = host_port
 
+        # emoes still building, or that failed to build, have no
+        # cpus or accessors yet
+        for build in self._m.emoe_builds_by_client_id(client_id):
+            entry = reply.listEmoesReply.entries.add()
+
+            entry.handle = build.emoe_id
+
+            entry.emoe_name = build.emoe_name
+
+            entry.state = build.state.value
+
+            entry.assigned_cpus = 0
+
+        # failed builds are listed once
+        self._m.clear_failed_builds(client_id)
+
         reply.listEmoesReply.total_cpus = self._m.total_cpus
 
         reply.listEmoesReply.available_cpus = self._m.available_cpus
 
+        for name,count,total,maximum in self._m.build_metrics.stages:
+            metric = reply.listEmoesReply.build_stage_metrics.add()
+
+            metric.name = name
+
+            metric.count = count
+
+            metric.total_seconds = total
+
+            metric.max_seconds = maximum
+
         return reply
 
 
@@ -725,6 +911,14 @@ class Plugin(BasePlugin):
 
         state = EmoeState(message.state)
 
+        if message.startup_steps:
+            steps = ' '.join([f'{step.name}={step.seconds:.2f}s'
+                              for step in message.startup_steps])
+
+            total = sum([step.seconds for step in message.startup_steps])
+
+            logging.info(f'emoe_id {message.emoe_id} startup {total:.2f}s: {steps}')
+
         container_id = (channel_id, remote)
 
         self._m.handle_container_state_message(container_id,
@@ -756,6 +950,42 @@ class Plugin(BasePlugin):
     def send_container_state_message_to_client(self,
                                                emoe_rt,
                                                detail=None):
+        accessors = []
+
+        # no accessors for EMOEs that have advances past the UPDATING state
+        if emoe_rt.state > EmoeState.UPDATING:
+            accessors = [(service_name,host_port)
+                         for host_port,(service_name,_) in emoe_rt.host_port_mappings.items()]
+
+        self._send_state_transition_event(emoe_rt.client_id,
+                                          emoe_rt.emoe_id,
+                                          emoe_rt.emoe.name,
+                                          emoe_rt.state,
+                                          accessors,
+                                          emoe_rt.emoe.cpus,
+                                          detail)
+
+
+    def send_build_state_message_to_client(self,
+                                           build,
+                                           detail=None):
+        self._send_state_transition_event(build.client_id,
+                                          build.emoe_id,
+                                          build.emoe_name,
+                                          build.state,
+                                          [],
+                                          0,
+                                          detail)
+
+
+    def _send_state_transition_event(self,
+                                     client_id,
+                                     emoe_id,
+                                     emoe_name,
+                                     state,
+                                     accessors,
+                                     assigned_cpus,
+                                     detail):
         # Only send unsolicited container state messages when
         # enabled to do so
         if not self._config.state_messages_enable:
@@ -772,36 +1002,32 @@ class Plugin(BasePlugin):
         # repeated EmoeAccessor emoe_accessors = 4;
         # optional uint32 assigned_cpus = 5;
         # optional string message = 6;
-        reply.emoeStateTransitionEvent.handle = str(emoe_rt.emoe_id)
-        reply.emoeStateTransitionEvent.emoe_name = emoe_rt.emoe.name
-        reply.emoeStateTransitionEvent.state = emoe_rt.state.value
+        reply.emoeStateTransitionEvent.handle = str(emoe_id)
+        reply.emoeStateTransitionEvent.emoe_name = emoe_name
+        reply.emoeStateTransitionEvent.state = state.value
 
-        # no accessors for EMOEs that have advances past the UPDATING state
-        if emoe_rt.state > EmoeState.UPDATING:
-            for host_port,(service_name,_) in emoe_rt.host_port_mappings.items():
-                emoe_accessor_proto = reply.emoeStateTransitionEvent.emoe_accessors.add()
+        for service_name,host_port in accessors:
+            emoe_accessor_proto = reply.emoeStateTransitionEvent.emoe_accessors.add()
 
-                emoe_accessor_proto.service_name = service_name
+            emoe_accessor_proto.service_name = service_name
 
-                emoe_accessor_proto.ip_address = self._config.client_listen_address
+            emoe_accessor_proto.ip_address = self._config.client_listen_address
 
-                emoe_accessor_proto.port = host_port
+            emoe_accessor_proto.port = host_port
 
-        reply.emoeStateTransitionEvent.assigned_cpus = emoe_rt.emoe.cpus
+        reply.emoeStateTransitionEvent.assigned_cpus = assigned_cpus
 
         if detail:
             reply.emoeStateTransitionEvent.message = detail
 
-        logging.info(f'sending emoeStateTransitionEvent for emoe name: {emoe_rt.emoe.name} ' \
-                     f'id: {emoe_rt.emoe_id} state: {emoe_rt.state.name}')
+        logging.info(f'sending emoeStateTransitionEvent for emoe name: {emoe_name} ' \
+                     f'id: {emoe_id} state: {state.name}')
 
         reply_str = reply.SerializeToString()
 
-        format_str = '!I%ds' % len(reply_str)
-
-        bufstr = struct.pack(format_str, len(reply_str), reply_str)
+        bufstr = self._encode_client_frame(client_id, reply_str)
 
-        channel_id, remote = emoe_rt.client_id
+        channel_id, remote = client_id
 
         try:
             self._ctx.channel_send(channel_id, bufstr, remote=remote)
@@ -826,3 +1052,16 @@ class Plugin(BasePlugin):
     def _handle_container_worker_close(self, ctx, channel_id, container_endpoint):
         self._m.handle_container_worker_close()
 
+
+    def _log_build_worker_accept(self, ctx, channel_id, build_endpoint, **kwargs):
+        ip,port = build_endpoint
+
+        logging.debug(f'_log_build_worker_accept on {channel_id} from {ip}:{port}')
+
+
+    def _process_build_worker_event(self, ctx, channel_id, data, remote):
+        self._m.handle_build_worker_event(data)
+
+
+    def _handle_build_worker_close(self, ctx, channel_id, build_endpoint):
+        logging.info(f'build worker connection closed on channel {channel_id}')